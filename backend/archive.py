@@ -0,0 +1,230 @@
+"""
+Cold-data archival to compressed NDJSON segments
+
+Append-only history (reward distributions, stake rewards) is only read in
+full for audits, but left in MongoDB it competes with the hot
+collections for the WiredTiger cache. archive_collection() streams records
+older than a retention window into gzip-compressed NDJSON segment files, adds
+each segment to a small per-collection index.json (time range, record count
+and the set of key values it holds, e.g. stake account ids), and only then
+deletes the archived records from MongoDB in batches.
+
+History endpoints read archived records lazily with iter_archived(), which
+opens only the segments that overlap the requested time range and, when the
+match names the policy's key field, hold that key - newest first.
+
+Layout:
+    ARCHIVE_DIR/<collection>/index.json
+    ARCHIVE_DIR/<collection>/<first>-<last>-<id>.ndjson.gz
+
+The referral ledger is not archived: its unique dedupe_key index is what stops
+a replayed referral or commission from being credited twice, and balances are
+rebuilt from it, so every entry has to stay in MongoDB.
+
+If the job is interrupted between writing a segment and deleting its records,
+the next run archives those records again; readers skip duplicate _ids.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import json_util
+from bson.json_util import JSONOptions, JSONMode
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", Path(__file__).parent / "archive_data"))
+RETENTION_DAYS = int(os.environ.get("ARCHIVE_RETENTION_DAYS", "180"))
+
+SEGMENT_SIZE = 50_000
+DELETE_BATCH_SIZE = 1000
+
+JSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=True, tzinfo=timezone.utc)
+
+
+@dataclass
+class ArchivePolicy:
+    collection: str
+    time_field: str
+    database: str = "main"  # main or treasury (bbc_staking)
+    key_field: Optional[str] = None  # Recorded per segment so keyed reads skip segments
+
+
+ARCHIVE_POLICIES = [
+    ArchivePolicy("stake_rewards", "calculated_at", key_field="stake_account_id"),
+    ArchivePolicy("reward_distributions", "distribution_time", database="treasury"),
+]
+
+
+# Index file
+def _index_path(collection: str) -> Path:
+    return ARCHIVE_DIR / collection / "index.json"
+
+
+def load_index(collection: str) -> List[Dict[str, Any]]:
+    """Segments of a collection, oldest first"""
+    path = _index_path(collection)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        segments = json.load(f)
+    for segment in segments:
+        segment["first"] = datetime.fromisoformat(segment["first"])
+        segment["last"] = datetime.fromisoformat(segment["last"])
+    return segments
+
+
+def _add_to_index(collection: str, segment: Dict[str, Any]):
+    segments = [
+        {**existing, "first": existing["first"].isoformat(), "last": existing["last"].isoformat()}
+        for existing in load_index(collection)
+    ]
+    segments.append({**segment, "first": segment["first"].isoformat(), "last": segment["last"].isoformat()})
+    segments.sort(key=lambda s: s["first"])
+
+    path = _index_path(collection)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(segments, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Segment files
+def _as_utc(timestamp: datetime) -> datetime:
+    # Clients without tz_aware return naive UTC datetimes
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def _write_segment(collection: str, documents: List[dict], time_field: str,
+                   key_field: Optional[str] = None) -> Dict[str, Any]:
+    """Write one compressed segment and register it in the index"""
+    first, last = (_as_utc(documents[0][time_field]), _as_utc(documents[-1][time_field]))
+    name = f"{first:%Y%m%dT%H%M%S}-{last:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+    directory = ARCHIVE_DIR / collection
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = directory / f"{name}.tmp"
+    with gzip.open(tmp_path, "wt", compresslevel=6) as f:
+        for document in documents:
+            f.write(json_util.dumps(document, json_options=JSON_OPTIONS))
+            f.write("\n")
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, directory / name)
+
+    segment = {"file": name, "first": first, "last": last, "count": len(documents)}
+    if key_field is not None:
+        segment["key_field"] = key_field
+        segment["keys"] = sorted({str(document.get(key_field)) for document in documents})
+    _add_to_index(collection, segment)
+    return segment
+
+
+def _read_segment(collection: str, name: str) -> List[dict]:
+    with gzip.open(ARCHIVE_DIR / collection / name, "rt") as f:
+        return [json_util.loads(line, json_options=JSON_OPTIONS) for line in f if line.strip()]
+
+
+async def _flush(collection, policy: ArchivePolicy, documents: List[dict]) -> int:
+    """Archive one segment's worth of documents, then delete them from MongoDB"""
+    await asyncio.to_thread(_write_segment, policy.collection, documents, policy.time_field, policy.key_field)
+    deleted = 0
+    for start in range(0, len(documents), DELETE_BATCH_SIZE):
+        ids = [document["_id"] for document in documents[start:start + DELETE_BATCH_SIZE]]
+        result = await collection.delete_many({"_id": {"$in": ids}})
+        deleted += result.deleted_count
+    return deleted
+
+
+async def archive_collection(database, policy: ArchivePolicy, retention_days: int = RETENTION_DAYS,
+                             now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Move records older than the retention window into archive segments"""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    collection = database[policy.collection]
+
+    archived = 0
+    deleted = 0
+    batch: List[dict] = []
+    cursor = collection.find({policy.time_field: {"$lt": cutoff}}).sort(policy.time_field, 1).allow_disk_use(True)
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= SEGMENT_SIZE:
+            deleted += await _flush(collection, policy, batch)
+            archived += len(batch)
+            batch = []
+    if batch:
+        deleted += await _flush(collection, policy, batch)
+        archived += len(batch)
+
+    if archived:
+        logger.info(f"Archived {archived} {policy.collection} records older than {cutoff:%Y-%m-%d}")
+    return {"collection": policy.collection, "cutoff": cutoff, "archived": archived, "deleted": deleted}
+
+
+async def run_archival(database, treasury_database, retention_days: int = RETENTION_DAYS) -> List[Dict[str, Any]]:
+    """Archive every collection in ARCHIVE_POLICIES"""
+    results = []
+    for policy in ARCHIVE_POLICIES:
+        target = treasury_database if policy.database == "treasury" else database
+        results.append(await archive_collection(target, policy, retention_days))
+    return results
+
+
+async def iter_archived(collection: str, time_field: str, match: Optional[Dict[str, Any]] = None,
+                        before: Optional[datetime] = None, after: Optional[datetime] = None) -> AsyncIterator[dict]:
+    """Archived records newest first, optionally filtered by exact field values and a time range
+
+    Segments are decompressed one at a time, only when the caller gets that far.
+    Segments whose recorded keys can't match are never opened.
+    """
+    match = match or {}
+    before = _as_utc(before) if before is not None else None
+    after = _as_utc(after) if after is not None else None
+    seen = set()
+    for segment in reversed(load_index(collection)):
+        if before is not None and segment["first"] >= before:
+            continue
+        if after is not None and segment["last"] <= after:
+            continue
+        key_field = segment.get("key_field")
+        if key_field in match and str(match[key_field]) not in segment["keys"]:
+            continue
+        documents = await asyncio.to_thread(_read_segment, collection, segment["file"])
+        for document in reversed(documents):
+            timestamp = document.get(time_field)
+            if before is not None and timestamp >= before:
+                continue
+            if after is not None and timestamp <= after:
+                continue
+            if any(document.get(field) != value for field, value in match.items()):
+                continue
+            if document["_id"] in seen:
+                continue
+            seen.add(document["_id"])
+            yield document
+
+
+async def main():
+    from server import client, db
+    from rewards_treasury import TREASURY_DB_NAME
+
+    try:
+        for result in await run_archival(db, client[TREASURY_DB_NAME]):
+            print(f"✅ {result['collection']}: {result['archived']} archived, {result['deleted']} deleted")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,258 @@
+"""
+Coherent in-process caches invalidated from MongoDB change streams
+
+Each worker keeps rarely-changing collections (menu, locations, events,
+members) in memory. An InvalidationBus owns one watcher per process that turns
+every write to a watched collection into an Invalidation and hands it to the
+caches registered for that collection, so all workers drop stale entries as
+soon as any of them (or an admin script) writes.
+
+Change streams need a replica set. On a standalone mongod the watcher falls
+back to polling the server's per-collection write counters (the `top`
+command's writeLock count), an in-memory lookup that doesn't touch the data,
+and invalidates a collection within one poll interval of any write to it.
+`top` needs the clusterMonitor role; without it every poll clears the caches.
+
+Pre-images of changed documents (MongoDB 6.0+) are requested only from
+servers that support them.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = {40573}
+# fullDocumentBeforeChange was added in MongoDB 6.0; older servers reject it
+PRE_IMAGES_MIN_VERSION = (6, 0)
+UNAUTHORIZED = 13
+
+DEFAULT_POLL_INTERVAL = 5.0
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+
+@dataclass
+class Invalidation:
+    collection: str
+    operation: str
+    # Post-image of inserted/updated documents, None when unknown (deletes, polling)
+    document: Optional[Dict[str, Any]] = None
+    # Pre-image, only when the collection records them (changeStreamPreAndPostImages)
+    previous: Optional[Dict[str, Any]] = None
+    # Fields an update set or removed, None when unknown
+    updated_fields: Optional[List[str]] = None
+
+
+class CollectionCache:
+    """Cache of query results over one collection
+
+    With key_field set, a change to a document only drops the entries stored
+    under its old and new key_field values. When the old value can't be known
+    (no pre-image and an update that may have changed the key, a replace, a
+    delete, polling) the whole cache is cleared.
+    """
+
+    def __init__(self, collection: str, key_field: Optional[str] = None):
+        self.collection = collection
+        self.key_field = key_field
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, Any] = {}
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for key, calling load() on a miss"""
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        version = self.version
+        value = await load()
+        # Don't store a result that an invalidation raced with
+        if value is not None and version == self.version:
+            self._entries[key] = value
+        return value
+
+    def invalidate(self, event: Optional[Invalidation] = None):
+        self.version += 1
+        keys = self._changed_keys(event)
+        if keys is None:
+            self._entries.clear()
+            return
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def _changed_keys(self, event: Optional[Invalidation]) -> Optional[set]:
+        """Keys of the entries a change can affect, None when it may be any of them"""
+        if not self.key_field or event is None:
+            return None
+        images = [image for image in (event.previous, event.document) if image is not None]
+        if not images or any(self.key_field not in image for image in images):
+            return None
+        keys = {image[self.key_field] for image in images}
+        if event.previous is not None or event.operation == "insert":
+            return keys
+        # Post-image only: the old key is the new one if the update didn't touch it
+        if event.updated_fields is not None and not any(
+            field == self.key_field or field.startswith(f"{self.key_field}.") for field in event.updated_fields
+        ):
+            return keys
+        return None
+
+    def discard(self, key: Hashable):
+        """Drop one entry after a local write"""
+        self.version += 1
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "version": self.version, "hits": self.hits, "misses": self.misses}
+
+
+class InvalidationBus:
+    def __init__(self, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self._subscribers: Dict[str, List[Callable[[Invalidation], None]]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self._retry_delay = RETRY_DELAY
+        self._pre_images: Optional[bool] = None
+
+    @property
+    def collections(self) -> List[str]:
+        return sorted(self._subscribers)
+
+    def subscribe(self, collection: str, callback: Callable[[Invalidation], None]):
+        self._subscribers[collection].append(callback)
+
+    def register(self, cache: CollectionCache) -> CollectionCache:
+        self.subscribe(cache.collection, cache.invalidate)
+        return cache
+
+    def publish(self, event: Invalidation):
+        for callback in self._subscribers.get(event.collection, []):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Invalidation callback for {event.collection} failed: {e}")
+
+    def invalidate(self, collections: Iterable[str]):
+        """Publish a whole-collection invalidation for writes made in this process"""
+        for collection in collections:
+            self.publish(Invalidation(collection, "local"))
+
+    # Watcher lifecycle
+    def start(self, database):
+        if self._task is None and self._subscribers:
+            self._task = asyncio.ensure_future(self._run(database))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, database):
+        """Watch until stopped; any failure clears the caches and retries with backoff"""
+        self._retry_delay = RETRY_DELAY
+        while True:
+            try:
+                await self._watch(database)
+                # The stream was invalidated (database dropped), start a fresh one
+                self._resume_token = None
+                self.invalidate(self.collections)
+                continue
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.info("Change streams unavailable (standalone mongod), polling for cache invalidation")
+                    await self._poll(database)
+                    return
+                logger.error(f"Change stream failed, invalidating caches: {e}")
+            except PyMongoError as e:
+                # Anything may have changed while we were disconnected
+                logger.warning(f"Change stream interrupted, invalidating caches: {e}")
+            except Exception as e:
+                logger.error(f"Cache invalidation watcher failed, invalidating caches: {e}")
+            self.mode = None
+            self._resume_token = None
+            self.invalidate(self.collections)
+            await asyncio.sleep(self._retry_delay)
+            self._retry_delay = min(self._retry_delay * 2, MAX_RETRY_DELAY)
+
+    async def _watch(self, database):
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections}}}]
+        options = {"full_document": "updateLookup", "resume_after": self._resume_token}
+        if await self._supports_pre_images(database):
+            options["full_document_before_change"] = "whenAvailable"
+        async with database.watch(pipeline, **options) as stream:
+            self.mode = "change_stream"
+            self._retry_delay = RETRY_DELAY
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                self.publish(self._to_invalidation(change))
+
+    async def _supports_pre_images(self, database) -> bool:
+        if self._pre_images is None:
+            info = await database.client.server_info()
+            self._pre_images = tuple(info.get("versionArray", [0])[:2]) >= PRE_IMAGES_MIN_VERSION
+        return self._pre_images
+
+    @staticmethod
+    def _to_invalidation(change: Dict[str, Any]) -> Invalidation:
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll", "")
+        updated_fields = None
+        if operation == "update":
+            description = change.get("updateDescription", {})
+            updated_fields = [*description.get("updatedFields", {}), *description.get("removedFields", [])]
+        return Invalidation(
+            collection, operation, change.get("fullDocument"), change.get("fullDocumentBeforeChange"), updated_fields
+        )
+
+    async def _poll(self, database):
+        self.mode = "polling"
+        markers = None
+        unauthorized_reported = False
+        while True:
+            try:
+                current = await self._write_markers(database)
+            except Exception as e:
+                # Writes may be missed while polling fails, so don't trust the cache meanwhile
+                if isinstance(e, OperationFailure) and e.code == UNAUTHORIZED:
+                    if not unauthorized_reported:
+                        logger.error(
+                            "Cache invalidation polling needs the clusterMonitor role to run `top`; "
+                            f"caches are cleared on every poll until it is granted: {e}"
+                        )
+                        unauthorized_reported = True
+                else:
+                    logger.warning(f"Cache invalidation poll failed, invalidating caches: {e}")
+                self.invalidate(self.collections)
+                current = None
+            if markers is not None and current is not None:
+                self.invalidate([name for name in self.collections if current.get(name) != markers.get(name)])
+            markers = current
+            await asyncio.sleep(self.poll_interval)
+
+    async def _write_markers(self, database) -> Dict[str, int]:
+        """Writes each watched collection has seen since the server started"""
+        result = await database.client.admin.command("top")
+        totals = result.get("totals", {})
+        return {
+            name: totals.get(f"{database.name}.{name}", {}).get("writeLock", {}).get("count", 0)
+            for name in self.collections
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "collections": self.collections}
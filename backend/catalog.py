@@ -0,0 +1,168 @@
+"""
+Versioned in-process catalog of menu items, locations and events
+
+The catalog keeps snapshots of each catalog collection in memory with a
+version number that is bumped whenever the collection changes. A snapshot is
+loaded per membership tier, so the loader can filter by tier in the database
+query. Endpoints are registered as views: a function from the snapshots (and
+the caller's tier) to response data. A view is validated and serialized to
+JSON bytes once, then served from memory for every request until a snapshot
+it depends on changes.
+
+Snapshots change when the InvalidationBus reports a write (admin seeding,
+event joins, writes from other workers) and on a refresh timer, which reloads
+every collection and only bumps the version if the contents differ.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 300.0
+
+Snapshots = Dict[str, List[dict]]
+
+
+@dataclass(frozen=True)
+class RenderedView:
+    body: bytes
+    etag: str
+    version: Tuple[int, ...]
+
+
+def render_json(data: Any) -> RenderedView:
+    """Serialize response data the way FastAPI would, with a strong ETag over the bytes"""
+    body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode()
+    return RenderedView(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', version=())
+
+
+def render_object(members: Dict[str, bytes]) -> bytes:
+    """A JSON object from already-serialized member values, without re-encoding them"""
+    return b"{" + b",".join(json.dumps(key).encode() + b":" + value for key, value in members.items()) + b"}"
+
+
+class Catalog:
+    def __init__(self, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.versions: Dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.renders = 0
+        self._loaders: Dict[str, Callable[[Optional[Hashable]], Awaitable[List[dict]]]] = {}
+        self._snapshots: Dict[Tuple[str, Optional[Hashable]], List[dict]] = {}
+        self._load_locks: Dict[Tuple[str, Optional[Hashable]], asyncio.Lock] = {}
+        self._views: Dict[str, Tuple[Tuple[str, ...], Callable[[Snapshots, Optional[Hashable]], Any], bool]] = {}
+        self._rendered: Dict[Tuple[str, Optional[Hashable]], RenderedView] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # Registration
+    def add_collection(self, collection: str, load: Callable[[Optional[Hashable]], Awaitable[List[dict]]]):
+        """load(tier) returns the documents visible to tier, or all of them for None"""
+        self._loaders[collection] = load
+
+    def add_view(self, name: str, collections: Tuple[str, ...], build: Callable[[Snapshots, Optional[Hashable]], Any],
+                 tiered: bool = True):
+        """build(snapshots, tier) returns the response data of the view
+
+        Tiered views read the snapshots loaded for the caller's tier, others
+        read the full collections.
+        """
+        self._views[name] = (tuple(collections), build, tiered)
+
+    def attach(self, bus):
+        """Invalidate snapshots on every write the bus reports"""
+        for collection in self._loaders:
+            bus.subscribe(collection, lambda event, collection=collection: self.invalidate(collection))
+
+    # Snapshots
+    def invalidate(self, collection: Optional[str] = None):
+        for name in [collection] if collection else list(self._loaders):
+            self.versions[name] += 1
+            for key in [key for key in self._snapshots if key[0] == name]:
+                del self._snapshots[key]
+
+    async def snapshot(self, collection: str, tier: Optional[Hashable] = None) -> List[dict]:
+        """Current documents of a catalog collection visible to tier, loaded once per version"""
+        key = (collection, tier)
+        if key in self._snapshots:
+            return self._snapshots[key]
+        async with self._load_locks.setdefault(key, asyncio.Lock()):
+            if key in self._snapshots:
+                return self._snapshots[key]
+            version = self.versions[collection]
+            documents = await self._loaders[collection](tier)
+            # Don't keep a load that an invalidation raced with
+            if version == self.versions[collection]:
+                self._snapshots[key] = documents
+            return documents
+
+    async def refresh(self):
+        """Reload every loaded snapshot, bumping versions only where contents changed"""
+        for collection, load in self._loaders.items():
+            version = self.versions[collection]
+            keys = [key for key in self._snapshots if key[0] == collection]
+            reloaded = {key: await load(key[1]) for key in keys}
+            if version != self.versions[collection]:
+                continue
+            if any(self._snapshots.get(key) != documents for key, documents in reloaded.items()):
+                self.versions[collection] += 1
+                self._snapshots.update(reloaded)
+
+    # Views
+    async def render(self, view: str, tier: Optional[Hashable] = None) -> RenderedView:
+        """Serialized response of a view for a tier, rebuilt only when its snapshots change"""
+        collections, build, tiered = self._views[view]
+        version = tuple(self.versions[collection] for collection in collections)
+        rendered = self._rendered.get((view, tier))
+        if rendered is not None and rendered.version == version:
+            self.hits += 1
+            return rendered
+
+        snapshot_tier = tier if tiered else None
+        snapshots = {collection: await self.snapshot(collection, snapshot_tier) for collection in collections}
+        self.renders += 1
+        rendered = render_json(build(snapshots, tier))
+        rendered = RenderedView(rendered.body, rendered.etag, version)
+        if version == tuple(self.versions[collection] for collection in collections):
+            self._rendered[(view, tier)] = rendered
+        return rendered
+
+    # Refresh timer
+    def start(self):
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Catalog refresh failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "versions": dict(self.versions),
+            "snapshots": {
+                f"{collection}:{tier or 'all'}": len(documents) for (collection, tier), documents in self._snapshots.items()
+            },
+            "rendered_views": len(self._rendered),
+            "hits": self.hits,
+            "renders": self.renders,
+        }
@@ -0,0 +1,231 @@
+"""
+MongoDB index registry for the Burger Bus Club API
+
+Every query path in server.py and rewards_treasury.py is backed by one of the
+indexes declared here. The registry is applied at startup with
+ensure_indexes(), which is idempotent: indexes that already exist with the same
+spec are left alone, and a conflicting or failing index is logged without
+blocking the rest of the bootstrap.
+"""
+
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Only enforce uniqueness on populated values - wallet-only members have an
+# empty email and email-registered members have an empty wallet_address.
+NON_EMPTY_STRING = {"$type": "string", "$gt": ""}
+
+# Main application database (DB_NAME)
+INDEXES: Dict[str, List[IndexModel]] = {
+    "members": [
+        IndexModel([("id", ASCENDING)], name="members_id_unique", unique=True),
+        IndexModel(
+            [("email", ASCENDING)],
+            name="members_email_unique",
+            unique=True,
+            partialFilterExpression={"email": NON_EMPTY_STRING},
+        ),
+        IndexModel(
+            [("wallet_address", ASCENDING)],
+            name="members_wallet_address_unique",
+            unique=True,
+            partialFilterExpression={"wallet_address": NON_EMPTY_STRING},
+        ),
+        IndexModel(
+            [("referral_code", ASCENDING)],
+            name="members_referral_code_unique",
+            unique=True,
+            partialFilterExpression={"referral_code": NON_EMPTY_STRING},
+        ),
+        # Pending-payment listing, keyset-paginated newest first
+        IndexModel(
+            [("payment_pending", ASCENDING), ("account_status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="members_pending_payment_created",
+        ),
+        # Affiliate payout report - only members that are owed commissions
+        IndexModel(
+            [("email", ASCENDING), ("unpaid_commissions", ASCENDING)],
+            name="members_unpaid_commissions",
+            partialFilterExpression={"unpaid_commissions": {"$gt": 0}},
+        ),
+    ],
+    "stake_accounts": [
+        IndexModel(
+            [("stake_account_pubkey", ASCENDING)],
+            name="stake_accounts_pubkey_unique",
+            unique=True,
+        ),
+        IndexModel([("member_wallet", ASCENDING)], name="stake_accounts_member_wallet"),
+        # Admin listing, keyset-paginated newest first
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="stake_accounts_created"),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)], name="orders_id_unique", unique=True),
+        # Order history, keyset-paginated newest first per member
+        IndexModel(
+            [("wallet_address", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="orders_wallet_created",
+        ),
+    ],
+    "menu_items": [
+        IndexModel([("id", ASCENDING)], name="menu_items_id_unique", unique=True),
+        # Member menus read only the items a tier may order
+        IndexModel([("tier_rank", ASCENDING)], name="menu_items_tier_rank"),
+        # One copy per seeded document, however many workers seed at once
+        IndexModel(
+            [("seed_key", ASCENDING)],
+            name="menu_items_seed_key_unique",
+            unique=True,
+            partialFilterExpression={"seed_key": NON_EMPTY_STRING},
+        ),
+    ],
+    "locations": [
+        IndexModel([("is_member_exclusive", ASCENDING)], name="locations_member_exclusive"),
+        IndexModel([("tier_rank", ASCENDING)], name="locations_tier_rank"),
+        # Nearest stops ($geoNear), narrowed by date and tier in the same index
+        IndexModel(
+            [("location", GEOSPHERE), ("date", ASCENDING), ("tier_rank", ASCENDING)],
+            name="locations_location_2dsphere",
+        ),
+        # Schedule range scans by start time
+        IndexModel([("starts_at", ASCENDING), ("tier_rank", ASCENDING)], name="locations_starts_at"),
+        IndexModel(
+            [("seed_key", ASCENDING)],
+            name="locations_seed_key_unique",
+            unique=True,
+            partialFilterExpression={"seed_key": NON_EMPTY_STRING},
+        ),
+    ],
+    "events": [
+        IndexModel([("id", ASCENDING)], name="events_id_unique", unique=True),
+        IndexModel([("tier_rank", ASCENDING)], name="events_tier_rank"),
+        IndexModel([("starts_at", ASCENDING), ("tier_rank", ASCENDING)], name="events_starts_at"),
+        IndexModel(
+            [("seed_key", ASCENDING)],
+            name="events_seed_key_unique",
+            unique=True,
+            partialFilterExpression={"seed_key": NON_EMPTY_STRING},
+        ),
+    ],
+    "payments": [
+        IndexModel([("payment_id", ASCENDING)], name="payments_payment_id_unique", unique=True),
+        # Pending-payment listing, keyset-paginated newest first
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("payment_id", DESCENDING)],
+            name="payments_status_created",
+        ),
+    ],
+    "event_attendees": [
+        IndexModel(
+            [("event_id", ASCENDING), ("member_id", ASCENDING)],
+            name="event_attendees_event_member_unique",
+            unique=True,
+        ),
+    ],
+    "referral_ledger": [
+        IndexModel([("id", ASCENDING)], name="referral_ledger_id_unique", unique=True),
+        # One referral and one commission per referred member and affiliate
+        IndexModel([("dedupe_key", ASCENDING)], name="referral_ledger_dedupe_unique", unique=True),
+        # Commissions since the last payout, per-affiliate history
+        IndexModel(
+            [("affiliate_id", ASCENDING), ("entry_type", ASCENDING), ("created_at", DESCENDING)],
+            name="referral_ledger_affiliate_type_created",
+        ),
+    ],
+    "stake_rewards": [
+        IndexModel(
+            [("stake_account_id", ASCENDING), ("calculated_at", DESCENDING)],
+            name="stake_rewards_account_time",
+        ),
+        # Archival scan of records past the retention window
+        IndexModel([("calculated_at", ASCENDING)], name="stake_rewards_time"),
+    ],
+}
+
+# Rewards treasury database (bbc_staking)
+TREASURY_INDEXES: Dict[str, List[IndexModel]] = {
+    "treasury": [
+        IndexModel([("treasury_id", ASCENDING)], name="treasury_id_unique", unique=True),
+    ],
+    "stakes": [
+        IndexModel([("stake_id", ASCENDING)], name="stakes_stake_id_unique", unique=True),
+        IndexModel([("status", ASCENDING)], name="stakes_status"),
+    ],
+    "reward_distributions": [
+        IndexModel([("distribution_time", DESCENDING)], name="reward_distributions_time"),
+        IndexModel(
+            [("stake_id", ASCENDING), ("distribution_time", DESCENDING)],
+            name="reward_distributions_stake_time",
+        ),
+    ],
+}
+
+# Append-only, time-keyed history lives in time-series collections (MongoDB
+# 5.0+), bucketed per metaField value and compressed column-wise. They have to
+# be created before the first insert, which ensure_time_series() does.
+TIME_SERIES: Dict[str, Dict[str, str]] = {
+    "stake_rewards": {"timeField": "calculated_at", "metaField": "stake_account_id", "granularity": "hours"},
+}
+
+TREASURY_TIME_SERIES: Dict[str, Dict[str, str]] = {
+    # Funding events have no stake_id, so they share the null-meta buckets
+    "reward_distributions": {"timeField": "distribution_time", "metaField": "stake_id", "granularity": "hours"},
+}
+
+
+async def ensure_time_series(database, specs: Dict[str, Dict[str, str]]) -> Dict[str, List[str]]:
+    """Create missing time-series collections.
+
+    Existing regular collections are left alone and reported under
+    needs_migration; migrations.py time-series moves their documents over.
+    """
+    created: List[str] = []
+    needs_migration: List[str] = []
+    existing = {
+        info["name"]: info.get("type", "collection")
+        async for info in await database.list_collections(filter={"name": {"$in": list(specs)}})
+    }
+
+    for name, spec in specs.items():
+        if name not in existing:
+            try:
+                await database.create_collection(name, timeseries=spec)
+                created.append(name)
+            except CollectionInvalid:
+                # Created concurrently by another worker
+                pass
+        elif existing[name] != "timeseries":
+            logger.warning(f"{name} is a regular collection, run 'python migrations.py time-series'")
+            needs_migration.append(name)
+
+    return {"created": created, "needs_migration": needs_migration}
+
+
+async def ensure_indexes(database, registry: Dict[str, List[IndexModel]]) -> Dict[str, List[str]]:
+    """Create every index in the registry on the given database.
+
+    Returns the names of the indexes that were applied and the ones that
+    failed, so the caller can report them.
+    """
+    applied: List[str] = []
+    failed: List[str] = []
+
+    for collection_name, models in registry.items():
+        collection = database[collection_name]
+        for model in models:
+            name = model.document["name"]
+            try:
+                await collection.create_indexes([model])
+                applied.append(f"{collection_name}.{name}")
+            except OperationFailure as e:
+                # Usually duplicate data under a unique index or an existing
+                # index with the same keys but different options.
+                logger.error(f"Index {collection_name}.{name} could not be created: {e}")
+                failed.append(f"{collection_name}.{name}")
+
+    return {"applied": applied, "failed": failed}
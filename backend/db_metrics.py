@@ -0,0 +1,194 @@
+"""
+MongoDB connection pool and command metrics
+
+MongoMetrics is registered as a pymongo event listener on the Motor client. It
+aggregates pool checkout latency, pool saturation, connection churn, in-flight
+operations and per-collection operation counts, and exposes them as a plain
+dict for the admin metrics endpoint.
+
+pymongo publishes these events from Motor's worker threads, so all counters
+are guarded by a lock.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+# Driver housekeeping commands that are not application operations
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+class MongoMetrics(monitoring.ConnectionPoolListener, monitoring.CommandListener):
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._checkout_started = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Clear all counters (current pool gauges are kept)"""
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self.open_connections = getattr(self, "open_connections", 0)
+            self.in_use = getattr(self, "in_use", 0)
+            self.waiting = getattr(self, "waiting", 0)
+            self.in_flight = getattr(self, "in_flight", 0)
+            self.peak_in_use = self.in_use
+            self.peak_waiting = self.waiting
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.close_reasons = defaultdict(int)
+            self.pool_clears = 0
+            self.checkouts = 0
+            self.checkout_failures = defaultdict(int)
+            self.checkout_time_total = 0.0
+            self.checkout_time_max = 0.0
+            self.operations = defaultdict(lambda: defaultdict(int))
+            self.command_count = defaultdict(int)
+            self.command_failures = defaultdict(int)
+            self.command_time_total = defaultdict(float)
+            self.command_time_max = defaultdict(float)
+            self._collections = getattr(self, "_collections", {})
+
+    # Connection pool events
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            self.open_connections = max(0, self.open_connections - 1)
+            self.close_reasons[event.reason] += 1
+
+    def connection_check_out_started(self, event):
+        # Checkout start and result are published on the same worker thread
+        self._checkout_started.value = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures[event.reason] += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._checkout_started, "value", None)
+        elapsed = getattr(event, "duration", None)
+        if elapsed is None:
+            elapsed = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.checkouts += 1
+            self.checkout_time_total += elapsed
+            self.checkout_time_max = max(self.checkout_time_max, elapsed)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    # Command events
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "$cmd"
+        collection = f"{event.database_name}.{collection}"
+        with self._lock:
+            self.in_flight += 1
+            self.operations[collection][event.command_name] += 1
+            self._collections[(event.request_id, event.connection_id)] = collection
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        elapsed = event.duration_micros / 1_000_000
+        name = event.command_name
+        with self._lock:
+            if self._collections.pop((event.request_id, event.connection_id), None) is None:
+                return
+            self.in_flight = max(0, self.in_flight - 1)
+            self.command_count[name] += 1
+            self.command_time_total[name] += elapsed
+            self.command_time_max[name] = max(self.command_time_max[name], elapsed)
+            if failed:
+                self.command_failures[name] += 1
+
+    def snapshot(self, pool_options: Optional[Dict] = None) -> Dict:
+        """Current metrics as a JSON-serializable dict"""
+        with self._lock:
+            avg_checkout = self.checkout_time_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "since": self.started_at.isoformat(),
+                "pool": {
+                    "options": pool_options or {"max_pool_size": self.max_pool_size},
+                    "open_connections": self.open_connections,
+                    "in_use": self.in_use,
+                    "waiting": self.waiting,
+                    "saturation": round(self.in_use / self.max_pool_size, 4) if self.max_pool_size else 0.0,
+                    "peak_in_use": self.peak_in_use,
+                    "peak_saturation": round(self.peak_in_use / self.max_pool_size, 4) if self.max_pool_size else 0.0,
+                    "peak_waiting": self.peak_waiting,
+                    "clears": self.pool_clears,
+                },
+                "connections": {
+                    "created": self.connections_created,
+                    "closed": self.connections_closed,
+                    "close_reasons": dict(self.close_reasons),
+                },
+                "checkout": {
+                    "count": self.checkouts,
+                    "avg_ms": round(avg_checkout * 1000, 3),
+                    "max_ms": round(self.checkout_time_max * 1000, 3),
+                    "failures": dict(self.checkout_failures),
+                },
+                "commands": {
+                    "in_flight": self.in_flight,
+                    "by_name": {
+                        name: {
+                            "count": count,
+                            "failures": self.command_failures.get(name, 0),
+                            "avg_ms": round(self.command_time_total[name] / count * 1000, 3),
+                            "max_ms": round(self.command_time_max[name] * 1000, 3),
+                        }
+                        for name, count in self.command_count.items()
+                    },
+                    "by_collection": {
+                        collection: dict(counts) for collection, counts in self.operations.items()
+                    },
+                },
+            }
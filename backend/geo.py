@@ -0,0 +1,92 @@
+"""
+Truck stop coordinates and nearest-stop queries
+
+Locations carry a GeoJSON point in `location`, served by a 2dsphere index.
+Addresses are geocoded once, when a location is written (the sample data
+carries its coordinates; `python migrations.py geocode-locations` backfills
+older documents), so reads never call the geocoder.
+
+find_nearby() runs $geoNear on MongoDB: the index walk returns stops in
+distance order and applies the date and tier filter as it goes. The SQLite
+backend has no spatial index; it reads the filtered stops and sorts them by
+great-circle distance, which is fine for the handful of stops a small
+deployment has.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_USER_AGENT = os.environ.get("GEOCODER_USER_AGENT", "burger-bus-club/1.0")
+EARTH_RADIUS_M = 6371008.8
+MAX_RADIUS_M = 200_000
+
+
+def geojson_point(lng: float, lat: float) -> Dict[str, Any]:
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def distance_m(a: List[float], b: List[float]) -> float:
+    """Great-circle distance in meters between two [lng, lat] pairs"""
+    lng1, lat1, lng2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+
+def _geocode_sync(address: str) -> Optional[Tuple[float, float]]:
+    response = requests.get(
+        GEOCODER_URL,
+        params={"q": address, "format": "json", "limit": 1},
+        headers={"User-Agent": GEOCODER_USER_AGENT},
+        timeout=10,
+    )
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        return None
+    return float(results[0]["lon"]), float(results[0]["lat"])
+
+
+async def geocode(address: str) -> Optional[Dict[str, Any]]:
+    """GeoJSON point for an address, or None if the geocoder can't place it"""
+    try:
+        coordinates = await asyncio.to_thread(_geocode_sync, address)
+    except Exception as e:
+        logger.warning(f"Geocoding failed for {address!r}: {e}")
+        return None
+    return geojson_point(*coordinates) if coordinates else None
+
+
+async def find_nearby(collection, point: Dict[str, Any], max_distance_m: float, query: Dict[str, Any],
+                      projection: Dict[str, Any], limit: int) -> List[dict]:
+    """Documents matching query within max_distance_m of point, nearest first, with distance_m set"""
+    from storage import SQLiteRepository
+
+    if isinstance(collection, SQLiteRepository):
+        fetched = {**projection, "location": 1}
+        documents = await collection.find({**query, "location": {"$exists": True}}, fetched).to_list(None)
+        for document in documents:
+            location = document["location"] if "location" in projection else document.pop("location")
+            document["distance_m"] = distance_m(point["coordinates"], location["coordinates"])
+        nearby = [document for document in documents if document["distance_m"] <= max_distance_m]
+        return sorted(nearby, key=lambda document: document["distance_m"])[:limit]
+
+    pipeline = [
+        {"$geoNear": {
+            "near": point,
+            "distanceField": "distance_m",
+            "maxDistance": max_distance_m,
+            "query": query,
+            "spherical": True,
+        }},
+        {"$limit": limit},
+        {"$project": {**projection, "distance_m": 1}},
+    ]
+    return await collection.aggregate(pipeline).to_list(length=None)
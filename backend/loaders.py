@@ -0,0 +1,70 @@
+"""
+Request-scoped batch loaders (DataLoader pattern)
+
+Handlers that enrich a list of documents with related records call
+loader.load(key) for every document. All keys requested in the same event
+loop tick are collected and resolved with a single $in query, so enriching N
+documents costs one round trip instead of N. Loaded values are cached for the
+lifetime of the loader, which is one request.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+# Upper bound on keys per $in query
+MAX_BATCH_SIZE = 1000
+
+
+class BatchLoader:
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]], max_batch_size: int = MAX_BATCH_SIZE):
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self.batches_dispatched = 0
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        """Return a future for the value of key, batching it with other pending keys"""
+        if key in self._cache:
+            return self._cache[key]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        self._queue.append(key)
+        if len(self._queue) == 1:
+            # First key of a new batch - dispatch once the current tick has queued the rest
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        return future
+
+    async def load_many(self, keys: List[Hashable]) -> List[Optional[Any]]:
+        """Load several keys at once, preserving order"""
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self._max_batch_size):
+            batch = keys[start:start + self._max_batch_size]
+            self.batches_dispatched += 1
+            try:
+                results = await self._batch_fn(batch)
+            except Exception as e:
+                for key in batch:
+                    if not self._cache[key].done():
+                        self._cache[key].set_exception(e)
+                continue
+            for key in batch:
+                if not self._cache[key].done():
+                    self._cache[key].set_result(results.get(key))
+
+
+def document_loader(collection, key_field: str, projection: Optional[Dict[str, int]] = None) -> BatchLoader:
+    """BatchLoader resolving documents of a collection by a (unique) field"""
+    if projection is not None and projection.get(key_field) != 1:
+        projection = {**projection, key_field: 1}
+
+    async def batch_fn(keys: List[Hashable]) -> Dict[Hashable, Any]:
+        documents = await collection.find({key_field: {"$in": keys}}, projection).to_list(length=None)
+        return {document[key_field]: document for document in documents}
+
+    return BatchLoader(batch_fn)
@@ -0,0 +1,536 @@
+"""
+One-off data migrations for the Burger Bus Club database
+
+Each migration is idempotent and streams its source collections in batches, so
+it can be re-run safely after an interruption. Run from the backend directory:
+
+    python migrations.py referral-ledger
+    python migrations.py datetimes
+    python migrations.py time-series
+    python migrations.py decimal-amounts
+    python migrations.py tier-ranks
+    python migrations.py dedupe-catalog
+    python migrations.py geocode-locations
+    python migrations.py schedule-times
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from bson.decimal128 import Decimal128
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+async def _insert_ignoring_duplicates(collection, documents: List[dict]) -> int:
+    """Insert a batch, skipping documents already present under a unique index"""
+    if not documents:
+        return 0
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+
+async def _batches(cursor):
+    """Stream a cursor in lists of BATCH_SIZE documents"""
+    while True:
+        documents = await cursor.to_list(BATCH_SIZE)
+        if not documents:
+            return
+        yield documents
+
+
+# Referral ledger
+async def _legacy_ledger_entries(database):
+    """Translate affiliate_referrals, referrals and affiliate_commissions into ledger entries"""
+    from loaders import document_loader
+    from server import AFFILIATE_COMMISSION_USD, ReferralLedgerEntry
+
+    members_by_email = document_loader(database.members, "email", {"_id": 0, "id": 1, "email": 1})
+    members_by_id = document_loader(database.members, "id", {"_id": 0, "id": 1, "email": 1})
+
+    # process_referral
+    async for batch in _batches(database.affiliate_referrals.find({}, {"_id": 0})):
+        affiliates = await members_by_email.load_many([old["referrer_email"] for old in batch])
+        for old, affiliate in zip(batch, affiliates):
+            if not affiliate:
+                continue
+            for entry in _affiliate_referral_entries(old, affiliate):
+                yield entry
+
+    # register_member: referral only
+    async for batch in _batches(database.referrals.find({}, {"_id": 0})):
+        affiliates = await members_by_id.load_many([old["referrer_id"] for old in batch])
+        referred_members = await members_by_id.load_many([old["referred_id"] for old in batch])
+        for old, affiliate, referred in zip(batch, affiliates, referred_members):
+            if not affiliate:
+                continue
+            yield ReferralLedgerEntry(
+                entry_type="referral",
+                affiliate_id=affiliate["id"],
+                affiliate_email=affiliate["email"],
+                referred_member_id=old["referred_id"],
+                referred_email=(referred or {}).get("email", ""),
+                created_at=old["created_at"],
+            )
+
+    # activate_member_payment: commission only
+    async for batch in _batches(database.affiliate_commissions.find({}, {"_id": 0})):
+        referred_members = await members_by_id.load_many([old["referred_member_id"] for old in batch])
+        for old, referred in zip(batch, referred_members):
+            yield ReferralLedgerEntry(
+                entry_type="commission",
+                affiliate_id=old["affiliate_id"],
+                affiliate_email=old.get("affiliate_email", ""),
+                referred_member_id=old["referred_member_id"],
+                referred_email=(referred or {}).get("email", ""),
+                amount=old.get("commission_amount", AFFILIATE_COMMISSION_USD),
+                created_at=old["created_at"],
+            )
+
+
+def _affiliate_referral_entries(old: dict, affiliate: dict) -> list:
+    """process_referral recorded the referral and commission at once and marked it paid in place"""
+    from server import AFFILIATE_COMMISSION_USD, ReferralLedgerEntry
+
+    common = dict(
+        affiliate_id=affiliate["id"],
+        affiliate_email=affiliate["email"],
+        referral_code=old.get("referrer_code", ""),
+        referred_email=old.get("new_member_email", ""),
+    )
+    amount = old.get("commission_amount", AFFILIATE_COMMISSION_USD)
+    entries = [
+        ReferralLedgerEntry(entry_type="referral", created_at=old["created_at"], **common),
+        ReferralLedgerEntry(entry_type="commission", amount=amount, created_at=old["created_at"], **common),
+    ]
+    if old.get("status") == "paid":
+        entries.append(ReferralLedgerEntry(
+            entry_type="payout",
+            amount=-amount,
+            payment_method=old.get("payment_method"),
+            transaction_id=old.get("transaction_id"),
+            created_at=old.get("paid_at") or old["created_at"],
+            dedupe_key=f"payout:legacy:{old['id']}",
+            **common,
+        ))
+    return entries
+
+
+REFERRAL_BALANCE_PIPELINE = [
+    {"$group": {
+        "_id": "$affiliate_id",
+        "total_referrals": {"$sum": {"$cond": [{"$eq": ["$entry_type", "referral"]}, 1, 0]}},
+        "total_commissions_earned": {"$sum": {"$cond": [{"$eq": ["$entry_type", "commission"]}, "$amount", 0]}},
+        "unpaid_commissions": {"$sum": {"$cond": [{"$ne": ["$entry_type", "referral"]}, "$amount", 0]}},
+        "last_payout_at": {"$max": {"$cond": [{"$eq": ["$entry_type", "payout"]}, "$created_at", None]}},
+    }},
+]
+
+
+async def rebuild_referral_balances(database) -> int:
+    """Recompute every affiliate's materialized balance from the ledger, which is never archived"""
+    requests = [
+        UpdateOne({"id": balance.pop("_id")}, {"$set": balance})
+        async for balance in database.referral_ledger.aggregate(REFERRAL_BALANCE_PIPELINE, allowDiskUse=True)
+    ]
+
+    updated = 0
+    for start in range(0, len(requests), BATCH_SIZE):
+        result = await database.members.bulk_write(requests[start:start + BATCH_SIZE], ordered=False)
+        updated += result.modified_count
+    return updated
+
+
+async def migrate_referral_ledger(database) -> Dict[str, int]:
+    """Copy the three legacy referral collections into referral_ledger and rebuild balances"""
+    from db_indexes import INDEXES, ensure_indexes
+    from server import referral_dedupe_key
+
+    # The dedupe index is what makes re-runs safe
+    await ensure_indexes(database, {"referral_ledger": INDEXES["referral_ledger"]})
+
+    inserted = 0
+    batch = []
+    async for entry in _legacy_ledger_entries(database):
+        if not entry.dedupe_key:
+            entry.dedupe_key = referral_dedupe_key(entry)
+        batch.append(entry.dict())
+        if len(batch) >= BATCH_SIZE:
+            inserted += await _insert_ignoring_duplicates(database.referral_ledger, batch)
+            batch = []
+    inserted += await _insert_ignoring_duplicates(database.referral_ledger, batch)
+
+    balances = await rebuild_referral_balances(database)
+    logger.info(f"Referral ledger: {inserted} entries migrated, {balances} balances rebuilt")
+    return {"entries_inserted": inserted, "balances_updated": balances}
+
+
+# Native BSON dates
+# Timestamp fields that used to be written as ISO strings, per database
+DATETIME_FIELDS = {
+    "members": ["created_at", "last_login", "updated_at", "payment_verified_at", "last_payout_at"],
+    "stake_accounts": ["created_at", "activated_at", "deactivated_at", "last_reward_calculation"],
+    "stake_rewards": ["calculated_at"],
+    "orders": ["created_at"],
+    "event_attendees": ["joined_at"],
+    "referral_ledger": ["created_at"],
+}
+
+TREASURY_DATETIME_FIELDS = {
+    "treasury": ["created_at", "last_updated"],
+    "stakes": ["created_at", "last_reward_time"],
+    "reward_distributions": ["distribution_time", "timestamp"],
+}
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """ISO string as an aware UTC datetime (naive strings were written as UTC)"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def convert_string_timestamps(database, registry: Dict[str, List[str]]) -> Dict[str, int]:
+    """Rewrite string timestamp fields as BSON dates, one batched bulk_write per BATCH_SIZE documents
+
+    Only documents that still hold a string in one of the fields are read, so a
+    re-run picks up where an interrupted one stopped.
+    """
+    converted = {}
+    for collection_name, field_names in registry.items():
+        collection = database[collection_name]
+        query = {"$or": [{name: {"$type": "string"}} for name in field_names]}
+        projection = {name: 1 for name in field_names}
+        converted[collection_name] = 0
+
+        async for batch in _batches(collection.find(query, projection)):
+            requests = []
+            for document in batch:
+                values = {}
+                for name in field_names:
+                    if isinstance(document.get(name), str):
+                        parsed = parse_timestamp(document[name])
+                        if parsed is None:
+                            logger.warning(f"{collection_name} {document['_id']}: unparseable {name} {document[name]!r}")
+                            continue
+                        values[name] = parsed
+                if values:
+                    requests.append(UpdateOne({"_id": document["_id"]}, {"$set": values}))
+            if requests:
+                result = await collection.bulk_write(requests, ordered=False)
+                converted[collection_name] += result.modified_count
+    return converted
+
+
+async def migrate_datetimes(database) -> Dict[str, Dict[str, int]]:
+    """Convert string timestamps in the main and treasury databases to BSON dates"""
+    from rewards_treasury import TREASURY_DB_NAME
+
+    main = await convert_string_timestamps(database, DATETIME_FIELDS)
+    treasury = await convert_string_timestamps(database.client[TREASURY_DB_NAME], TREASURY_DATETIME_FIELDS)
+    logger.info(f"Datetimes: converted {main} in {database.name}, {treasury} in {TREASURY_DB_NAME}")
+    return {database.name: main, TREASURY_DB_NAME: treasury}
+
+
+# Time-series collections
+def _time_series_document(document: dict, time_field: str) -> Optional[dict]:
+    """Legacy document with a BSON date in the time field, or None if it has no usable time"""
+    value = document.get(time_field)
+    if value is None:
+        # Funding events used to be stamped with "timestamp"
+        value = document.pop("timestamp", None)
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    if not isinstance(value, datetime):
+        return None
+    document[time_field] = value
+    return document
+
+
+async def _resume_query(legacy, target) -> dict:
+    """Legacy documents still to copy after an interrupted run
+
+    Batches are copied in _id order, so everything before the batch that holds
+    the last copied document is in the target; only that batch can be partial.
+    """
+    last = await target.find({}, {"_id": 1}).sort("_id", -1).to_list(1)
+    if not last:
+        return {}
+    tail = await legacy.find({"_id": {"$lte": last[0]["_id"]}}, {"_id": 1}).sort("_id", -1).to_list(BATCH_SIZE)
+    tail_ids = [document["_id"] for document in tail]
+    present = await target.find({"_id": {"$in": tail_ids}}, {"_id": 1}).to_list(None)
+    present_ids = {document["_id"] for document in present}
+    missing = [_id for _id in tail_ids if _id not in present_ids]
+    return {"$or": [{"_id": {"$gt": last[0]["_id"]}}, {"_id": {"$in": missing}}]}
+
+
+async def convert_to_time_series(database, specs: Dict[str, Dict[str, str]]) -> Dict[str, int]:
+    """Move regular collections into freshly created time-series collections
+
+    The old collection is renamed to <name>_legacy and copied over in batches;
+    drop it once the copy has been checked. A re-run after an interruption
+    finds <name>_legacy still there and copies only what is not yet in <name>.
+    """
+    copied = {}
+    names = [*specs, *(f"{name}_legacy" for name in specs)]
+    existing = {
+        info["name"]: info.get("type", "collection")
+        async for info in await database.list_collections(filter={"name": {"$in": names}})
+    }
+
+    for name, spec in specs.items():
+        legacy_name = f"{name}_legacy"
+        if legacy_name not in existing:
+            if existing.get(name) != "collection":
+                continue
+            await database[name].rename(legacy_name)
+            existing.pop(name)
+            query = {}
+        elif existing.get(name, "timeseries") != "timeseries":
+            raise RuntimeError(
+                f"Both {name} ({existing[name]}) and {legacy_name} exist; move the documents of one "
+                f"into the other and drop it before converting {name} to a time-series collection"
+            )
+        else:
+            logger.info(f"{name}: resuming the copy from {legacy_name}")
+            query = await _resume_query(database[legacy_name], database[name]) if name in existing else {}
+        if name not in existing:
+            await database.create_collection(name, timeseries=spec)
+
+        copied[name] = 0
+        skipped = 0
+        async for batch in _batches(database[legacy_name].find(query).sort("_id", 1)):
+            documents = []
+            for document in batch:
+                converted = _time_series_document(document, spec["timeField"])
+                if converted is None:
+                    skipped += 1
+                else:
+                    documents.append(converted)
+            if documents:
+                await database[name].insert_many(documents, ordered=False)
+                copied[name] += len(documents)
+        logger.info(f"{name}: {copied[name]} documents copied into the time-series collection, "
+                    f"{skipped} without a {spec['timeField']} left in {legacy_name}")
+    return copied
+
+
+async def migrate_time_series(database) -> Dict[str, Dict[str, int]]:
+    """Convert stake_rewards and the treasury's reward_distributions to time-series collections"""
+    from db_indexes import INDEXES, TIME_SERIES, TREASURY_INDEXES, TREASURY_TIME_SERIES, ensure_indexes
+    from rewards_treasury import TREASURY_DB_NAME
+
+    treasury_db = database.client[TREASURY_DB_NAME]
+    main = await convert_to_time_series(database, TIME_SERIES)
+    treasury = await convert_to_time_series(treasury_db, TREASURY_TIME_SERIES)
+    await ensure_indexes(database, {name: INDEXES[name] for name in TIME_SERIES})
+    await ensure_indexes(treasury_db, {name: TREASURY_INDEXES[name] for name in TREASURY_TIME_SERIES})
+    return {database.name: main, TREASURY_DB_NAME: treasury}
+
+
+# Decimal128 amounts
+# Token amounts in the treasury database that used to be written as floats
+TREASURY_AMOUNT_FIELDS = {
+    "treasury": ["total_funded", "total_distributed", "available_balance", "reserved_for_rewards"],
+    "stakes": ["amount_staked", "total_rewards_earned", "last_reward_amount"],
+    "reward_distributions": ["amount", "treasury_balance_after"],
+}
+
+NUMERIC_TYPES = ["double", "int", "long"]
+
+
+async def convert_float_amounts(database, registry: Dict[str, List[str]]) -> Dict[str, int]:
+    """Rewrite float amount fields as Decimal128 at ledger precision, in batched bulk_writes
+
+    Only documents that still hold a binary number in one of the fields are
+    read, so a re-run picks up where an interrupted one stopped.
+    """
+    from rewards_treasury import to_amount
+
+    converted = {}
+    for collection_name, field_names in registry.items():
+        collection = database[collection_name]
+        query = {"$or": [{name: {"$type": NUMERIC_TYPES}} for name in field_names]}
+        projection = {name: 1 for name in field_names}
+        converted[collection_name] = 0
+
+        try:
+            async for batch in _batches(collection.find(query, projection)):
+                requests = []
+                for document in batch:
+                    values = {
+                        name: Decimal128(to_amount(document[name]))
+                        for name in field_names
+                        if isinstance(document.get(name), (int, float)) and not isinstance(document[name], bool)
+                    }
+                    if values:
+                        requests.append(UpdateOne({"_id": document["_id"]}, {"$set": values}))
+                if requests:
+                    result = await collection.bulk_write(requests, ordered=False)
+                    converted[collection_name] += result.modified_count
+        except OperationFailure as e:
+            # Older servers reject updates to time-series measurements; readers
+            # accept the remaining floats
+            logger.warning(f"{collection_name}: amounts left as floats ({e})")
+    return converted
+
+
+async def migrate_decimal_amounts(database) -> Dict[str, Dict[str, int]]:
+    """Convert float token amounts in bbc_staking to Decimal128"""
+    from rewards_treasury import TREASURY_DB_NAME
+
+    treasury = await convert_float_amounts(database.client[TREASURY_DB_NAME], TREASURY_AMOUNT_FIELDS)
+    logger.info(f"Decimal amounts: converted {treasury} in {TREASURY_DB_NAME}")
+    return {TREASURY_DB_NAME: treasury}
+
+
+# Tier ranks
+# Default tier_required of each catalog collection's model, for documents without one
+TIER_DEFAULTS = {"menu_items": "basic", "locations": "basic", "events": "premium"}
+
+
+async def set_tier_ranks(database) -> Dict[str, int]:
+    """Store the numeric rank of tier_required as tier_rank on catalog documents
+
+    One update_many per tier, only touching documents whose rank is missing or
+    stale, so re-runs are no-ops.
+    """
+    from server import TIER_HIERARCHY
+
+    updated = {}
+    for collection_name, default_tier in TIER_DEFAULTS.items():
+        collection = database[collection_name]
+        updated[collection_name] = 0
+        for tier, rank in TIER_HIERARCHY.items():
+            tier_match = {"tier_required": tier}
+            if tier == default_tier:
+                tier_match = {"$or": [tier_match, {"tier_required": {"$exists": False}}]}
+            result = await collection.update_many(
+                {"$and": [tier_match, {"tier_rank": {"$ne": rank}}]},
+                {"$set": {"tier_rank": rank}},
+            )
+            updated[collection_name] += result.modified_count
+    return updated
+
+
+async def migrate_tier_ranks(database) -> Dict[str, int]:
+    """Backfill tier_rank on menu items, locations and events"""
+    updated = await set_tier_ranks(database)
+    logger.info(f"Tier ranks: updated {updated}")
+    return updated
+
+
+# Catalog duplicates
+async def migrate_dedupe_catalog(database) -> Dict[str, Dict[str, int]]:
+    """Remove copies left by re-seeding with fresh ids, keeping the oldest of each"""
+    from seeding import content_key, dedupe_collection
+    from server import SAMPLE_DATA
+
+    result = {}
+    for collection_name, documents in SAMPLE_DATA.items():
+        seed_keys = [content_key(document) for document in documents]
+        result[collection_name] = await dedupe_collection(database[collection_name], seed_keys)
+    logger.info(f"Catalog dedupe: {result}")
+    return result
+
+
+# Location coordinates
+async def migrate_geocode_locations(database) -> Dict[str, int]:
+    """Geocode locations stored without coordinates, once per distinct address"""
+    from geo import geocode
+
+    addresses = await database.locations.distinct("address", {"location": {"$exists": False}})
+    updated = failed = 0
+    for address in addresses:
+        point = await geocode(address)
+        if point is None:
+            failed += 1
+            continue
+        result = await database.locations.update_many(
+            {"address": address, "location": {"$exists": False}}, {"$set": {"location": point}}
+        )
+        updated += result.modified_count
+    logger.info(f"Geocoded {updated} locations, {failed} addresses could not be placed")
+    return {"updated": updated, "failed": failed}
+
+
+# Schedule times
+async def set_schedule_times(database) -> Dict[str, int]:
+    """Store starts_at/ends_at on stops and events that only have date and time strings"""
+    from schedule import with_schedule_times
+
+    updated = {}
+    for collection_name in ("locations", "events"):
+        collection = database[collection_name]
+        projection = {"date": 1, "time": 1, "start_time": 1, "end_time": 1}
+        updated[collection_name] = 0
+        async for batch in _batches(collection.find({"starts_at": {"$exists": False}, "date": {"$type": "string"}}, projection)):
+            requests = []
+            for document in batch:
+                try:
+                    timed = with_schedule_times(document)
+                except ValueError as e:
+                    logger.warning(f"{collection_name} {document['_id']}: unparseable schedule ({e})")
+                    continue
+                if "starts_at" in timed:
+                    requests.append(UpdateOne(
+                        {"_id": document["_id"]},
+                        {"$set": {"starts_at": timed["starts_at"], "ends_at": timed["ends_at"]}},
+                    ))
+            if requests:
+                result = await collection.bulk_write(requests, ordered=False)
+                updated[collection_name] += result.modified_count
+    return updated
+
+
+async def migrate_schedule_times(database) -> Dict[str, int]:
+    """Backfill starts_at/ends_at on truck stops and member events"""
+    updated = await set_schedule_times(database)
+    logger.info(f"Schedule times: updated {updated}")
+    return updated
+
+
+MIGRATIONS = {
+    "referral-ledger": migrate_referral_ledger,
+    "datetimes": migrate_datetimes,
+    "time-series": migrate_time_series,
+    "decimal-amounts": migrate_decimal_amounts,
+    "tier-ranks": migrate_tier_ranks,
+    "dedupe-catalog": migrate_dedupe_catalog,
+    "geocode-locations": migrate_geocode_locations,
+    "schedule-times": migrate_schedule_times,
+}
+
+
+async def main(name: str):
+    from server import client, db
+
+    try:
+        result = await MIGRATIONS[name](db)
+        print(f"✅ {name}: {result}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2 or sys.argv[1] not in MIGRATIONS:
+        print(f"Usage: python migrations.py [{'|'.join(MIGRATIONS)}]")
+        sys.exit(1)
+    asyncio.run(main(sys.argv[1]))
@@ -0,0 +1,84 @@
+"""
+Opaque cursors for keyset pagination
+
+A cursor carries the sort-key values of the last document on a page. The next
+page matches strictly after those values on an indexed sort key, so every page
+costs the same no matter how deep it is. Values are serialized with BSON
+extended JSON so datetimes and ObjectIds survive the round trip.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import Decimal128, ObjectId, json_util
+from bson.errors import InvalidBSON
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sort-key values a cursor may carry; anything else (an operator dict, a list)
+# would be spliced into the page query as-is. None is what next_cursor writes
+# for a document without the field.
+CURSOR_VALUE_TYPES = (str, int, float, datetime, ObjectId, Decimal128, type(None))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the sort-key values of the last returned document"""
+    raw = json_util.dumps(values, json_options=json_util.CANONICAL_JSON_OPTIONS).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json_util.loads(raw, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    except (binascii.Error, ValueError, InvalidBSON, UnicodeDecodeError):
+        raise InvalidCursor("Invalid pagination cursor")
+    if not isinstance(values, dict):
+        raise InvalidCursor("Invalid pagination cursor")
+    return values
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_filter(sort: List[Tuple[str, int]], cursor: Optional[str]) -> Dict[str, Any]:
+    """MongoDB filter selecting documents strictly after the cursor for the given sort
+
+    For sort [(a, 1), (b, 1)] this is {a > x} OR {a == x AND b > y}.
+    """
+    if not cursor:
+        return {}
+    values = decode_cursor(cursor)
+    if set(values) != {field for field, _ in sort}:
+        raise InvalidCursor("Cursor does not match this listing")
+    if not all(isinstance(value, CURSOR_VALUE_TYPES) for value in values.values()):
+        raise InvalidCursor("Invalid pagination cursor")
+
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        clause = {prior: values[prior] for prior, _ in sort[:position]}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[field]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def next_cursor(documents: List[Dict[str, Any]], sort: List[Tuple[str, int]], limit: int) -> Optional[str]:
+    """Cursor for the page after documents, or None when this is the last page
+
+    Callers fetch limit + 1 documents; the extra one only signals that more exist
+    and is removed from the list here.
+    """
+    if len(documents) <= limit:
+        return None
+    del documents[limit:]
+    last = documents[-1]
+    return encode_cursor({field: last.get(field) for field, _ in sort})
@@ -0,0 +1,175 @@
+"""
+Batch repricing of menu crypto prices from live BCH and BBC prices
+
+Menu items are priced in USD; their BCH and BBC prices are derived from the
+USD prices and stored on the items, so menu reads never call a price API.
+The engine polls the cached prices and, when one has moved more than the
+threshold since the menu was last priced, recomputes that currency for the
+whole menu in one vectorized pass, rounds with the currency's rule, and
+writes only the changed items with one bulk_write. Items added since then
+have no crypto prices yet; each check prices just those at the prices the
+menu is priced with, whether or not anything moved. on_repriced is then
+called so the catalog bumps its menu version and caches re-render.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.02
+DEFAULT_INTERVAL = 300.0
+
+USD_FIELDS = ("price", "member_price")
+# Stored price fields per currency, in USD_FIELDS order
+CURRENCY_FIELDS = {
+    "bch": ("price_bch", "member_price_bch"),
+    "bbc": ("price_bbc", "member_price_bbc"),
+}
+REPRICE_FIELDS = {"_id": 0, "id": 1, **{name: 1 for name in USD_FIELDS}, **{
+    name: 1 for names in CURRENCY_FIELDS.values() for name in names
+}}
+
+
+@dataclass(frozen=True)
+class RoundingRule:
+    """Round up to a number of decimals, so a crypto price never undercuts its USD price"""
+    decimals: int
+
+    def apply(self, amounts: np.ndarray) -> np.ndarray:
+        scale = 10.0 ** self.decimals
+        # Round away float noise first so 2.0000000001 units don't round up to 3
+        return np.ceil(np.round(amounts * scale, 6)) / scale
+
+
+ROUNDING_RULES = {
+    "bch": RoundingRule(decimals=4),
+    "bbc": RoundingRule(decimals=0),
+}
+
+
+def price_updates(items: List[dict], prices: Dict[str, float],
+                  rules: Dict[str, RoundingRule] = ROUNDING_RULES) -> List[UpdateOne]:
+    """UpdateOne requests setting each item's crypto prices for prices (USD per coin)
+
+    Items whose rounded prices are unchanged get no request.
+    """
+    if not items:
+        return []
+    usd = np.array([[item[name] for name in USD_FIELDS] for item in items], dtype=float)
+    changes: List[Dict[str, float]] = [{} for _ in items]
+    for currency, price in prices.items():
+        names = CURRENCY_FIELDS[currency]
+        repriced = rules[currency].apply(usd / price)
+        current = np.array([[item.get(name) for name in names] for item in items], dtype=float)
+        # Missing prices are NaN, which never compares equal
+        changed = ~np.isclose(repriced, current, rtol=0, atol=0.5 * 10.0 ** -rules[currency].decimals)
+        for row, column in zip(*np.nonzero(changed)):
+            changes[row][names[column]] = float(repriced[row, column])
+    return [UpdateOne({"id": item["id"]}, {"$set": change}) for item, change in zip(items, changes) if change]
+
+
+class RepricingEngine:
+    def __init__(self, collection: Callable[[], Any], fetch_prices: Callable[[], Awaitable[Dict[str, float]]],
+                 on_repriced: Optional[Callable[[], None]] = None, threshold: float = DEFAULT_THRESHOLD,
+                 interval: float = DEFAULT_INTERVAL, rules: Dict[str, RoundingRule] = ROUNDING_RULES):
+        self.collection = collection
+        self.fetch_prices = fetch_prices
+        self.on_repriced = on_repriced
+        self.threshold = threshold
+        self.interval = interval
+        self.rules = rules
+        # Prices the menu is currently priced with
+        self.priced_with: Dict[str, float] = {}
+        self.last_repriced_at: Optional[datetime] = None
+        self.runs = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def moved(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """Prices that moved more than the threshold since the menu was priced (all of them the first time)"""
+        return {
+            currency: price for currency, price in prices.items()
+            if currency in CURRENCY_FIELDS and price > 0 and (
+                currency not in self.priced_with
+                or abs(price - self.priced_with[currency]) > self.threshold * self.priced_with[currency]
+            )
+        }
+
+    async def _price(self, query: Dict[str, Any], prices: Dict[str, float]) -> Tuple[int, int]:
+        """Price the items matching query in one bulk_write; returns items changed and items read"""
+        collection = self.collection()
+        items = await collection.find(query, REPRICE_FIELDS).to_list(length=None)
+        requests = price_updates(items, prices, self.rules)
+        modified = 0
+        if requests:
+            result = await collection.bulk_write(requests, ordered=False)
+            modified = result.modified_count
+        if modified and self.on_repriced is not None:
+            self.on_repriced()
+        return modified, len(items)
+
+    async def reprice(self, prices: Dict[str, float]) -> int:
+        """Reprice the menu for prices in one bulk_write; returns the number of items changed"""
+        modified, read = await self._price({}, prices)
+        self.priced_with.update(prices)
+        self.last_repriced_at = datetime.now(timezone.utc)
+        self.runs += 1
+        logger.info(f"Repriced menu at {prices}: {modified} of {read} items changed")
+        return modified
+
+    async def price_unpriced(self, prices: Dict[str, float]) -> int:
+        """Price only the items missing a price field of these currencies"""
+        missing = [{name: None} for currency in prices for name in CURRENCY_FIELDS[currency]]
+        if not missing:
+            return 0
+        modified, _ = await self._price({"$or": missing}, prices)
+        if modified:
+            logger.info(f"Priced {modified} new menu items at {prices}")
+        return modified
+
+    async def check(self) -> int:
+        """Fetch prices, reprice the currencies that moved and price new items in the others"""
+        prices = await self.fetch_prices()
+        moved = self.moved(prices)
+        modified = await self.reprice(moved) if moved else 0
+        unmoved = {
+            currency: self.priced_with[currency] for currency in prices
+            if currency in self.priced_with and currency not in moved
+        }
+        return modified + await self.price_unpriced(unmoved)
+
+    # Poll timer
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Menu repricing failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "priced_with": dict(self.priced_with),
+            "last_repriced_at": self.last_repriced_at,
+            "runs": self.runs,
+            "threshold": self.threshold,
+        }
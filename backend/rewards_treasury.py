@@ -15,7 +15,10 @@ from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional
 import os
+from bson.codec_options import CodecOptions, TypeCodec, TypeRegistry
+from bson.decimal128 import Decimal128
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 
 # Treasury Configuration
 TREASURY_WALLET_ADDRESS = os.getenv("TREASURY_WALLET_ADDRESS", "Er3xC3Ue31QB3KghoUEVTTLBHvGYgnfB3hFUy2g3fdpr")
@@ -27,9 +30,47 @@ MEMBER_BONUS_APY = Decimal("0.02")  # 2% member bonus
 COMPOUND_FREQUENCY = 365  # Daily compounding
 MIN_REWARD_CLAIM = Decimal("1000")  # Minimum 1000 BBC tokens to claim
 
+# Token amounts are kept at the token's 9 decimals
+AMOUNT_QUANTUM = Decimal("0.000000001")
+ZERO = Decimal("0")
+MICROSECONDS_PER_DAY = Decimal(86400 * 10**6)
+
+TREASURY_DB_NAME = "bbc_staking"
+
+class DecimalCodec(TypeCodec):
+    """Money fields are stored as BSON Decimal128 and read back as Decimal"""
+    python_type = Decimal
+    bson_type = Decimal128
+
+    def transform_python(self, value):
+        return Decimal128(value)
+
+    def transform_bson(self, value):
+        return value.to_decimal()
+
+TREASURY_CODEC_OPTIONS = CodecOptions(
+    type_registry=TypeRegistry([DecimalCodec()]), tz_aware=True, tzinfo=timezone.utc
+)
+
+def to_amount(value) -> Decimal:
+    """Token amount at ledger precision"""
+    if not isinstance(value, Decimal):
+        # Documents written before the Decimal128 migration still hold floats
+        value = Decimal(str(value))
+    return value.quantize(AMOUNT_QUANTUM)
+
+def to_timestamp(value) -> datetime:
+    """Aware UTC datetime from a stored timestamp"""
+    if isinstance(value, str):
+        # Stakes written before the datetime migration still hold ISO strings
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"not a timestamp: {value!r}")
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
 class RewardsTreasury:
-    def __init__(self, db_client: AsyncIOMotorClient):
-        self.db = db_client.get_database("bbc_staking")
+    def __init__(self, db_client: AsyncIOMotorClient, database_name: str = TREASURY_DB_NAME):
+        self.db = db_client.get_database(database_name, codec_options=TREASURY_CODEC_OPTIONS)
         self.treasury_collection = self.db.treasury
         self.rewards_collection = self.db.reward_distributions
         self.stakes_collection = self.db.stakes
@@ -41,12 +82,12 @@ class RewardsTreasury:
                 "treasury_id": "main_treasury",
                 "wallet_address": TREASURY_WALLET_ADDRESS,
                 "token_mint": REWARDS_TOKEN_MINT,
-                "total_funded": float(initial_funding),
-                "total_distributed": 0.0,
-                "available_balance": float(initial_funding),
-                "reserved_for_rewards": 0.0,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "last_updated": datetime.now(timezone.utc).isoformat(),
+                "total_funded": to_amount(initial_funding),
+                "total_distributed": ZERO,
+                "available_balance": to_amount(initial_funding),
+                "reserved_for_rewards": ZERO,
+                "created_at": datetime.now(timezone.utc),
+                "last_updated": datetime.now(timezone.utc),
                 "status": "active"
             }
             
@@ -67,36 +108,34 @@ class RewardsTreasury:
     async def add_funding(self, amount: Decimal, funding_source: str) -> Dict:
         """Add funding to the rewards treasury"""
         try:
-            treasury = await self.treasury_collection.find_one({"treasury_id": "main_treasury"})
-            if not treasury:
-                return {"success": False, "error": "Treasury not initialized"}
-            
-            # Update treasury balances
-            new_funded = treasury["total_funded"] + float(amount)
-            new_available = treasury["available_balance"] + float(amount)
+            amount = to_amount(amount)
             
-            await self.treasury_collection.update_one(
+            # Update treasury balances server-side, so concurrent funding cannot lose an update
+            treasury = await self.treasury_collection.find_one_and_update(
                 {"treasury_id": "main_treasury"},
                 {
-                    "$set": {
-                        "total_funded": new_funded,
-                        "available_balance": new_available,
-                        "last_updated": datetime.now(timezone.utc).isoformat()
-                    }
-                }
+                    "$inc": {"total_funded": amount, "available_balance": amount},
+                    "$set": {"last_updated": datetime.now(timezone.utc)}
+                },
+                projection={"_id": 0, "available_balance": 1},
+                return_document=ReturnDocument.AFTER
             )
+            if not treasury:
+                return {"success": False, "error": "Treasury not initialized"}
+            new_available = treasury["available_balance"]
             
             # Record funding transaction
             funding_record = {
                 "funding_id": f"funding_{int(datetime.now(timezone.utc).timestamp())}",
-                "amount": float(amount),
+                "amount": amount,
                 "funding_source": funding_source,
                 "transaction_type": "funding",
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "distribution_time": datetime.now(timezone.utc),
                 "treasury_balance_after": new_available
             }
             
             await self.rewards_collection.insert_one(funding_record)
+            funding_record.pop("_id", None)
             
             logging.info(f"Added {amount} BBC funding from {funding_source}")
             return {"success": True, "funding": funding_record, "new_balance": new_available}
@@ -111,19 +150,30 @@ class RewardsTreasury:
             current_time = datetime.now(timezone.utc)
             
             # Get all active stakes
-            stakes = await self.stakes_collection.find({"status": "active"}).to_list(length=None)
+            stakes = await self.stakes_collection.find(
+                {"status": "active"},
+                {"_id": 0, "stake_id": 1, "staker_wallet": 1, "amount_staked": 1, "is_member": 1, "created_at": 1, "last_reward_time": 1}
+            ).to_list(length=None)
             
             total_rewards_owed = Decimal("0")
             staker_rewards = []
+            skipped_stakes = []
             
             for stake in stakes:
+                try:
+                    last_reward_time = to_timestamp(stake.get("last_reward_time") or stake["created_at"])
+                    stake_amount = to_amount(stake["amount_staked"])
+                except (KeyError, ValueError, ArithmeticError) as e:
+                    # One malformed stake must not hold up everyone else's rewards
+                    logging.warning(f"Skipping stake {stake.get('stake_id')} in reward calculation: {e!r}")
+                    skipped_stakes.append(stake.get("stake_id"))
+                    continue
+                
                 # Calculate time since last reward distribution
-                last_reward_time = datetime.fromisoformat(stake.get("last_reward_time", stake["created_at"]))
                 time_diff = current_time - last_reward_time
-                days_elapsed = Decimal(str(time_diff.total_seconds() / 86400))  # Convert to days
+                days_elapsed = Decimal(time_diff // timedelta(microseconds=1)) / MICROSECONDS_PER_DAY
                 
                 # Get staker member status for bonus calculation
-                stake_amount = Decimal(str(stake["amount_staked"]))
                 is_member = stake.get("is_member", False)
                 
                 # Calculate APY (base + member bonus if applicable)
@@ -142,17 +192,17 @@ class RewardsTreasury:
                 # Compound interest calculation
                 compound_factor = (1 + rate / n) ** (n * t)
                 new_amount = principal * compound_factor
-                reward_amount = new_amount - principal
+                reward_amount = to_amount(new_amount - principal)
                 
-                if reward_amount > Decimal("0"):
+                if reward_amount > ZERO:
                     staker_reward = {
                         "stake_id": stake["stake_id"],
                         "staker_wallet": stake["staker_wallet"],
-                        "stake_amount": float(stake_amount),
+                        "stake_amount": stake_amount,
                         "is_member": is_member,
-                        "apy_applied": float(total_apy),
+                        "apy_applied": total_apy,
                         "days_elapsed": float(days_elapsed),
-                        "reward_amount": float(reward_amount),
+                        "reward_amount": reward_amount,
                         "calculation_time": current_time.isoformat()
                     }
                     
@@ -161,9 +211,10 @@ class RewardsTreasury:
             
             return {
                 "success": True,
-                "total_rewards_owed": float(total_rewards_owed),
+                "total_rewards_owed": total_rewards_owed,
                 "staker_count": len(staker_rewards),
                 "staker_rewards": staker_rewards,
+                "skipped_stakes": skipped_stakes,
                 "calculation_time": current_time.isoformat()
             }
             
@@ -179,7 +230,7 @@ class RewardsTreasury:
             if not rewards_calculation["success"]:
                 return rewards_calculation
             
-            total_rewards_owed = Decimal(str(rewards_calculation["total_rewards_owed"]))
+            total_rewards_owed = rewards_calculation["total_rewards_owed"]
             staker_rewards = rewards_calculation["staker_rewards"]
             
             # Check treasury balance
@@ -187,7 +238,7 @@ class RewardsTreasury:
             if not treasury:
                 return {"success": False, "error": "Treasury not found"}
             
-            available_balance = Decimal(str(treasury["available_balance"]))
+            available_balance = to_amount(treasury["available_balance"])
             
             if available_balance < total_rewards_owed:
                 return {
@@ -202,7 +253,7 @@ class RewardsTreasury:
             
             for reward in staker_rewards:
                 try:
-                    reward_amount = Decimal(str(reward["reward_amount"]))
+                    reward_amount = reward["reward_amount"]
                     
                     # Only distribute if above minimum claim threshold
                     if reward_amount >= MIN_REWARD_CLAIM:
@@ -210,10 +261,10 @@ class RewardsTreasury:
                         await self.stakes_collection.update_one(
                             {"stake_id": reward["stake_id"]},
                             {
-                                "$inc": {"total_rewards_earned": float(reward_amount)},
+                                "$inc": {"total_rewards_earned": reward_amount},
                                 "$set": {
-                                    "last_reward_time": datetime.now(timezone.utc).isoformat(),
-                                    "last_reward_amount": float(reward_amount)
+                                    "last_reward_time": datetime.now(timezone.utc),
+                                    "last_reward_amount": reward_amount
                                 }
                             }
                         )
@@ -223,10 +274,10 @@ class RewardsTreasury:
                             "distribution_id": f"dist_{reward['stake_id']}_{int(datetime.now(timezone.utc).timestamp())}",
                             "stake_id": reward["stake_id"],
                             "staker_wallet": reward["staker_wallet"],
-                            "amount": float(reward_amount),
+                            "amount": reward_amount,
                             "apy_applied": reward["apy_applied"],
                             "is_member_bonus": reward["is_member"],
-                            "distribution_time": datetime.now(timezone.utc).isoformat(),
+                            "distribution_time": datetime.now(timezone.utc),
                             "status": "distributed"
                         }
                         
@@ -241,26 +292,22 @@ class RewardsTreasury:
                     })
             
             # Update treasury balance
-            new_balance = available_balance - total_distributed
-            new_total_distributed = treasury["total_distributed"] + float(total_distributed)
-            
-            await self.treasury_collection.update_one(
+            treasury = await self.treasury_collection.find_one_and_update(
                 {"treasury_id": "main_treasury"},
                 {
-                    "$set": {
-                        "available_balance": float(new_balance),
-                        "total_distributed": new_total_distributed,
-                        "last_updated": datetime.now(timezone.utc).isoformat()
-                    }
-                }
+                    "$inc": {"available_balance": -total_distributed, "total_distributed": total_distributed},
+                    "$set": {"last_updated": datetime.now(timezone.utc)}
+                },
+                projection={"_id": 0, "available_balance": 1},
+                return_document=ReturnDocument.AFTER
             )
             
             return {
                 "success": True,
-                "total_distributed": float(total_distributed),
+                "total_distributed": total_distributed,
                 "successful_distributions": len(successful_distributions),
                 "failed_distributions": len(failed_distributions),
-                "remaining_treasury_balance": float(new_balance),
+                "remaining_treasury_balance": treasury["available_balance"],
                 "distribution_time": datetime.now(timezone.utc).isoformat()
             }
             
@@ -275,9 +322,10 @@ class RewardsTreasury:
             if not treasury:
                 return {"success": False, "error": "Treasury not initialized"}
             
-            # Get recent distribution stats
+            # Get recent distribution stats (funding events carry no stake_id)
             recent_distributions = await self.rewards_collection.find(
-                {"transaction_type": {"$ne": "funding"}},
+                {"stake_id": {"$ne": None}},
+                {"_id": 0},
                 sort=[("distribution_time", -1)]
             ).limit(10).to_list(length=None)
             
@@ -285,13 +333,15 @@ class RewardsTreasury:
             total_active_stakes = await self.stakes_collection.count_documents({"status": "active"})
             rewards_calculation = await self.calculate_rewards_owed()
             
+            total_funded = to_amount(treasury["total_funded"])
+            total_distributed = to_amount(treasury["total_distributed"])
             status = {
                 "treasury": {
                     "wallet_address": treasury["wallet_address"],
-                    "total_funded": treasury["total_funded"],
-                    "total_distributed": treasury["total_distributed"],
-                    "available_balance": treasury["available_balance"],
-                    "utilization_rate": (treasury["total_distributed"] / treasury["total_funded"] * 100) if treasury["total_funded"] > 0 else 0
+                    "total_funded": total_funded,
+                    "total_distributed": total_distributed,
+                    "available_balance": to_amount(treasury["available_balance"]),
+                    "utilization_rate": float(total_distributed / total_funded * 100) if total_funded > 0 else 0
                 },
                 "staking_metrics": {
                     "total_active_stakes": total_active_stakes,
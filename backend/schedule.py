@@ -0,0 +1,59 @@
+"""
+Start and end times of truck stops and member events
+
+Stops and events are entered as a local date plus HH:MM strings. When one is
+written, those are converted once to UTC datetimes in `starts_at` and
+`ends_at` (`python migrations.py schedule-times` backfills older documents),
+so "what's on between two instants" is a range scan over an index instead of
+string parsing on every read. Local times are in TRUCK_TIMEZONE.
+"""
+
+import heapq
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+TRUCK_TIMEZONE = ZoneInfo(os.environ.get("TRUCK_TIMEZONE", "UTC"))
+
+
+def local_datetime(day: str, clock: str) -> datetime:
+    """UTC instant of a local YYYY-MM-DD date and HH:MM time"""
+    local = datetime.combine(date.fromisoformat(day), time.fromisoformat(clock), tzinfo=TRUCK_TIMEZONE)
+    return local.astimezone(timezone.utc)
+
+
+def schedule_times(day: str, start: str, end: Optional[str] = None) -> Tuple[datetime, Optional[datetime]]:
+    """starts_at and ends_at for a local date and times; an end before the start is on the next day"""
+    starts_at = local_datetime(day, start)
+    if end is None:
+        return starts_at, None
+    ends_at = local_datetime(day, end)
+    if ends_at <= starts_at:
+        ends_at += timedelta(days=1)
+    return starts_at, ends_at
+
+
+def with_schedule_times(document: dict) -> dict:
+    """A stop (start_time/end_time) or event (time) with starts_at and ends_at set"""
+    start = document.get("start_time", document.get("time"))
+    if "date" not in document or start is None:
+        return document
+    starts_at, ends_at = schedule_times(document["date"], start, document.get("end_time"))
+    return {**document, "starts_at": starts_at, "ends_at": ends_at}
+
+
+def local_day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """UTC instants at which a local day starts and ends"""
+    start = datetime.combine(day, time.min, tzinfo=TRUCK_TIMEZONE)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=TRUCK_TIMEZONE)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def local_today() -> date:
+    return datetime.now(TRUCK_TIMEZONE).date()
+
+
+def merge_by_start(*entries: Iterable) -> List:
+    """Merge lists already sorted by starts_at into one sorted list in a single pass"""
+    return list(heapq.merge(*entries, key=lambda entry: entry.starts_at))
@@ -0,0 +1,109 @@
+"""
+Idempotent seeding of sample catalog documents
+
+Every seeded document is keyed by a hash of its content. Seeding is one
+unordered bulk_write per collection: an upsert per document that only inserts
+when no document carries its seed_key, plus a delete of seeded documents whose
+content is no longer in the sample set. Re-running with unchanged data writes
+nothing, and a seeded document keeps its id for as long as its content does,
+so orders and event joins that reference it stay valid. A unique index on
+seed_key keeps workers seeding at the same time from inserting a document
+twice; the worker that loses the race finds it already seeded.
+
+dedupe_collection() is the repair for collections that were re-seeded with
+fresh ids before this: it keeps the oldest copy of each document and stamps
+it with its seed_key so the next seed run matches it. seed_collection() runs
+it, limited to sample content, whenever the collection holds unstamped
+documents, so legacy copies are adopted instead of seeded again.
+"""
+
+import hashlib
+import json
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# Identity, derived and mutable fields that don't make two documents different
+CONTENT_IGNORED_FIELDS = (
+    "_id", "id", "seed_key", "tier_rank", "starts_at", "ends_at", "current_attendees",
+    "price_bch", "member_price_bch", "price_bbc", "member_price_bbc",
+)
+
+# Namespace for the stable uuid5 ids of seeded documents
+SEED_ID_NAMESPACE = uuid.UUID("5b1d2f6e-3c4a-4e8b-9a7d-b0b5b0b5b0b5")
+
+BATCH_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+
+def content_key(document: dict) -> str:
+    """Hash of a document's content, independent of field order and identity"""
+    content = {key: value for key, value in document.items() if key not in CONTENT_IGNORED_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def seed_requests(documents: List[dict], prepare: Optional[Callable[[dict], dict]] = None) -> list:
+    """bulk_write requests that make the seeded documents of a collection equal documents"""
+    requests = []
+    keys = []
+    for document in documents:
+        key = content_key(document)
+        keys.append(key)
+        seeded = prepare(document) if prepare else dict(document)
+        seeded.update(id=str(uuid.uuid5(SEED_ID_NAMESPACE, key)), seed_key=key)
+        requests.append(UpdateOne({"seed_key": key}, {"$setOnInsert": seeded}, upsert=True))
+    requests.append(DeleteMany({"seed_key": {"$exists": True, "$nin": keys}}))
+    return requests
+
+
+async def seed_collection(collection, documents: List[dict], prepare: Optional[Callable[[dict], dict]] = None) -> Dict[str, int]:
+    """Upsert documents by content hash in one bulk_write; counts are zero when nothing changed"""
+    if await collection.find_one({"seed_key": {"$exists": False}}, {"_id": 1}):
+        await dedupe_collection(collection, [content_key(document) for document in documents], seeded_only=True)
+    requests = seed_requests(documents, prepare)
+    try:
+        result = await collection.bulk_write(requests, ordered=False)
+    except BulkWriteError as e:
+        # Another worker inserted some of the documents first; its copies stand
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+        return {"inserted": e.details["nUpserted"], "deleted": e.details["nRemoved"]}
+    except DuplicateKeyError:
+        # SQLite rolled the whole batch back; the retry matches the other worker's documents
+        result = await collection.bulk_write(requests, ordered=False)
+    return {"inserted": result.upserted_count, "deleted": result.deleted_count}
+
+
+async def dedupe_collection(collection, seed_keys=(), seeded_only: bool = False) -> Dict[str, int]:
+    """Delete all but the oldest copy of each document
+
+    Survivors whose content is in seed_keys are stamped with their seed_key,
+    so the next seed run matches them instead of inserting another copy.
+    Other documents are left unstamped, out of reach of the seed's delete,
+    and with seeded_only they are not deduplicated either.
+    """
+    seed_keys = set(seed_keys)
+    survivors = set()
+    duplicates = []
+    stamps = []
+    async for document in collection.find({}).sort("_id", 1):
+        key = content_key(document)
+        if seeded_only and key not in seed_keys:
+            continue
+        if key in survivors:
+            duplicates.append(document["_id"])
+            continue
+        survivors.add(key)
+        if key in seed_keys and document.get("seed_key") != key:
+            stamps.append(UpdateOne({"_id": document["_id"]}, {"$set": {"seed_key": key}}))
+
+    deleted = 0
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        result = await collection.delete_many({"_id": {"$in": duplicates[start:start + BATCH_SIZE]}})
+        deleted += result.deleted_count
+    for start in range(0, len(stamps), BATCH_SIZE):
+        await collection.bulk_write(stamps[start:start + BATCH_SIZE], ordered=False)
+    return {"kept": len(survivors), "deleted": deleted}
@@ -1,14 +1,18 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Header
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Header, Query, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 import secrets
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -20,6 +24,21 @@ import base64 as b64
 # Solana imports for staking integration
 import base58
 
+from db_metrics import MongoMetrics
+from cache_invalidation import CollectionCache, InvalidationBus
+from catalog import Catalog, RenderedView, render_json, render_object
+from conditional import CachePolicy, ConditionalGetMiddleware
+from loaders import BatchLoader, document_loader
+from archive import iter_archived
+from storage import open_repositories
+from seeding import seed_collection
+from geo import MAX_RADIUS_M, find_nearby, geojson_point
+from schedule import local_day_bounds, local_today, merge_by_start, with_schedule_times
+from repricing import RepricingEngine
+from pagination import DEFAULT_PAGE_SIZE, InvalidCursor, clamp_limit, keyset_filter, next_cursor
+
+logger = logging.getLogger(__name__)
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -79,8 +98,9 @@ PAYMENT_METHODS = {
     }
 }
 
-# Simple payment tracking
-payment_requests_db = {}
+# Payment instructions are persisted in the payments repository
+PAYMENT_FIELDS = {"_id": 0}
+PENDING_PAYMENT_FIELDS = {"_id": 0, "payment_id": 1, "user_address": 1, "amount": 1, "amount_bch": 1, "created_at": 1, "expires_at": 1}
 
 class PaymentRequest(BaseModel):
     payment_id: str
@@ -97,22 +117,26 @@ class PaymentRequest(BaseModel):
     verified_at: Optional[str] = None
     verified_by: Optional[str] = None
 
-async def get_bch_price_usd() -> float:
-    """Get current BCH price from CoinGecko API"""
+async def fetch_bch_price_usd() -> Optional[float]:
+    """Get current BCH price from CoinGecko API, None if it is unavailable"""
     try:
-        response = requests.get(
+        response = await asyncio.to_thread(
+            requests.get,
             'https://api.coingecko.com/api/v3/simple/price?ids=bitcoin-cash&vs_currencies=usd',
             timeout=10
         )
         if response.status_code == 200:
             data = response.json()
             return float(data['bitcoin-cash']['usd'])
-        else:
-            print(f"CoinGecko API error: {response.status_code}")
-            return 300.00  # Fallback price
+        print(f"CoinGecko API error: {response.status_code}")
     except Exception as e:
         print(f"Failed to fetch BCH price: {e}")
-        return 300.00  # Fallback price
+    return None
+
+async def get_bch_price_usd() -> float:
+    """Get current BCH price, falling back to a fixed price"""
+    price = await fetch_bch_price_usd()
+    return price if price is not None else 300.00  # Fallback price
 
 def generate_qr_code(bch_address: str, amount_bch: float, label: str = "Membership Payment") -> str:
     """Generate QR code for BCH payment"""
@@ -153,8 +177,20 @@ JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 30
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 db_name = os.environ.get('DB_NAME', 'bitcoin_bens_burger_club')
 
+# Connection pool tuning (defaults sized for a Raspberry Pi 5 single-node deployment)
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "20")),
+    "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+}
+
+mongo_metrics = MongoMetrics(max_pool_size=MONGO_POOL_OPTIONS["maxPoolSize"])
+
 try:
-    client = AsyncIOMotorClient(mongo_url)
+    # Timestamps are stored as BSON dates and read back as aware UTC datetimes
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[mongo_metrics], **MONGO_POOL_OPTIONS)
     db = client[db_name]
     print(f"✅ MongoDB connected to database: {db_name}")
     print(f"✅ Using MongoDB URL: {mongo_url[:20]}..." if mongo_url.startswith('mongodb+srv') else f"✅ Using MongoDB URL: {mongo_url}")
@@ -162,6 +198,11 @@ except Exception as e:
     print(f"❌ MongoDB connection failed: {e}")
     raise e
 
+# Handlers reach members, menu, locations, events, orders, payments and stakes
+# through repositories; STORAGE_BACKEND=sqlite keeps them in a local SQLite file
+repos = open_repositories(db)
+print(f"✅ Repository backend: {repos.backend}")
+
 # Create the main app
 app = FastAPI(title="Bitcoin Ben's Burger Bus Club API")
 
@@ -190,15 +231,20 @@ class MemberProfile(BaseModel):
     total_commissions_earned: float = 0.0
     unpaid_commissions: float = 0.0
 
-class AffiliateReferral(BaseModel):
+class ReferralLedgerEntry(BaseModel):
+    """Append-only referral ledger row; amount is the change to the affiliate's unpaid balance"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    referrer_email: str
-    referrer_code: str  
-    new_member_email: str
-    commission_amount: float = AFFILIATE_COMMISSION_USD
-    status: str = "pending"  # pending, paid
-    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
-    paid_at: Optional[str] = None
+    entry_type: str  # referral, commission, payout
+    affiliate_id: str
+    affiliate_email: str = ""
+    referral_code: str = ""
+    referred_member_id: str = ""
+    referred_email: str = ""
+    amount: float = 0.0
+    payment_method: Optional[str] = None
+    transaction_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    dedupe_key: str = ""
 
 class MenuItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -215,26 +261,53 @@ class MenuItem(BaseModel):
     is_available: bool = True
     tier_required: str = "basic"  # basic, premium, vip
 
+class GeoPoint(BaseModel):
+    """GeoJSON point, coordinates as [longitude, latitude]"""
+    type: str = "Point"
+    coordinates: List[float]
+
 class TruckLocation(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     address: str
+    location: Optional[GeoPoint] = None  # geocoded from address when written
     date: str
     start_time: str
     end_time: str
+    starts_at: Optional[datetime] = None  # UTC, from date/start_time when written
+    ends_at: Optional[datetime] = None
     is_member_exclusive: bool = False
     tier_required: str = "basic"
 
+class NearbyLocation(TruckLocation):
+    distance_m: float
+
 class PreOrder(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     wallet_address: str
     items: List[dict]  # [{item_id, quantity, special_instructions}]
     total_amount: float
+    total_cents: int = 0  # Exact total in cents, total_amount is derived from it
     pickup_location: str
     pickup_time: str
     status: str = "pending"  # pending, confirmed, ready, completed
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class OrderSummary(BaseModel):
+    """Order history row - everything but the line items"""
+    id: str
+    total_amount: float
+    total_cents: int = 0
+    item_count: int = 0
+    pickup_location: str
+    pickup_time: str
+    status: str
+    created_at: datetime
+
+class OrderHistoryPage(BaseModel):
+    orders: List[OrderSummary]
+    next_cursor: Optional[str] = None
+
 class MemberEvent(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str
@@ -242,10 +315,45 @@ class MemberEvent(BaseModel):
     date: str
     time: str
     location: str
+    starts_at: Optional[datetime] = None  # UTC, from date/time when written
+    ends_at: Optional[datetime] = None
     tier_required: str = "premium"
     max_attendees: int
     current_attendees: int = 0
 
+class ScheduleEntry(BaseModel):
+    """A truck stop or member event on the schedule"""
+    kind: str  # stop, event
+    id: str
+    title: str
+    place: str
+    starts_at: datetime
+    ends_at: Optional[datetime] = None
+    tier_required: str
+
+    @classmethod
+    def from_stop(cls, stop: dict) -> "ScheduleEntry":
+        return cls(
+            kind="stop", id=stop["id"], title=stop["name"], place=stop["address"],
+            starts_at=stop["starts_at"], ends_at=stop.get("ends_at"), tier_required=stop.get("tier_required", "basic")
+        )
+
+    @classmethod
+    def from_event(cls, event: dict) -> "ScheduleEntry":
+        return cls(
+            kind="event", id=event["id"], title=event["title"], place=event["location"],
+            starts_at=event["starts_at"], ends_at=event.get("ends_at"), tier_required=event.get("tier_required", "premium")
+        )
+
+class MemberBootstrap(BaseModel):
+    """Everything the member dashboard needs on load"""
+    profile: MemberProfile
+    menu: List[MenuItem]
+    locations: List[TruckLocation]
+    events: List[MemberEvent]
+    orders: OrderHistoryPage
+    stakes: Dict[str, Any]
+
 # Solana Staking Models
 class StakeAccount(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -255,10 +363,10 @@ class StakeAccount(BaseModel):
     stake_amount_sol: float  # Amount staked in SOL
     stake_amount_lamports: int  # Amount staked in lamports
     status: str = "pending"  # pending, active, deactivating, inactive
-    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
-    activated_at: Optional[str] = None
-    deactivated_at: Optional[str] = None
-    last_reward_calculation: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    activated_at: Optional[datetime] = None
+    deactivated_at: Optional[datetime] = None
+    last_reward_calculation: Optional[datetime] = None
     total_rewards_earned: float = 0.0
     member_bonus_earned: float = 0.0
 
@@ -270,7 +378,7 @@ class StakeReward(BaseModel):
     base_reward_sol: float
     member_bonus_sol: float
     total_reward_sol: float
-    calculated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    calculated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     distributed_at: Optional[str] = None
     transaction_signature: Optional[str] = None
 
@@ -312,9 +420,114 @@ class BBCStakingPaymentRequest(BaseModel):
     wallet_address: str
     bbc_tokens_staked: float
 
+# Per-route field projections - each handler declares the fields it returns so
+# MongoDB only sends (and we only decode and validate) what is actually used
+def fields(*names: str) -> Dict[str, int]:
+    """Build a MongoDB projection returning only the given fields, without _id"""
+    projection = {"_id": 0}
+    projection.update({name: 1 for name in names})
+    return projection
+
+MEMBER_PROFILE_FIELDS = fields(*MemberProfile.model_fields)
+MEMBER_JWT_FIELDS = fields("id", "wallet_address", "membership_tier", "name", "email", "phone", "pma_agreed", "dues_paid", "favorite_items")
+MEMBER_LOGIN_FIELDS = fields("id", "email", "name", "password", "temp_password", "pma_agreed", "dues_paid", "wallet_address", "referral_code")
+MEMBER_PENDING_FIELDS = fields("id", "name", "email", "phone", "created_at", "referral_code", "referred_by")
+MEMBER_ACTIVATION_FIELDS = fields("id", "name", "email", "referred_by")
+MEMBER_CASHSTAMP_FIELDS = fields("id", "name", "full_name", "email", "wallet_address", "dues_paid", "pma_agreed")
+MEMBER_REFERRER_FIELDS = fields("id", "email", "full_name")
+MEMBER_COMMISSION_FIELDS = fields("id", "email", "full_name", "unpaid_commissions")
+MEMBER_AFFILIATE_FIELDS = fields("referral_code", "total_referrals", "total_commissions_earned", "unpaid_commissions", "last_payout_at")
+MEMBER_STATUS_FIELDS = fields("email", "dues_paid", "pma_agreed")
+EXISTS_FIELDS = {"_id": 1}
+
+MENU_ITEM_FIELDS = fields(*MenuItem.model_fields)
+MENU_PRICE_FIELDS = fields("id", "name", "member_price", "is_available")
+LOCATION_FIELDS = fields(*TruckLocation.model_fields)
+EVENT_FIELDS = fields(*MemberEvent.model_fields)
+ORDER_FIELDS = fields(*PreOrder.model_fields)
+ORDER_SUMMARY_FIELDS = {**fields(*OrderSummary.model_fields), "item_count": {"$size": {"$ifNull": ["$items", []]}}}
+STAKE_ACCOUNT_FIELDS = fields(*StakeAccount.model_fields)
+STAKE_REWARD_FIELDS = fields(*StakeReward.model_fields)
+
 # Database helper functions
+# In-process caches of rarely-changing collections. The invalidation bus keeps
+# them coherent across workers by watching the collections for writes.
+invalidation_bus = InvalidationBus(poll_interval=float(os.environ.get("CACHE_POLL_INTERVAL_SECONDS", "5")))
+member_cache = invalidation_bus.register(CollectionCache("members", key_field="wallet_address"))
+# Today's schedule per (tier, local date), dropped on any stop or event write
+today_schedule_cache = invalidation_bus.register(CollectionCache("locations"))
+invalidation_bus.subscribe("events", today_schedule_cache.invalidate)
+# SQLite writes cannot be watched, so the repositories report them directly
+repos.on_write(lambda collection: invalidation_bus.invalidate([collection]))
+
+# Menu, locations and events are served from versioned in-memory snapshots;
+# catalog endpoints are rendered to JSON bytes once per version and tier
+catalog = Catalog(refresh_interval=float(os.environ.get("CATALOG_REFRESH_SECONDS", "300")))
+
+# Snapshot key of what non-members may see, next to the membership tiers
+PUBLIC_TIER = "public"
+
+def catalog_loader(collection: str, projection: dict, member_filter=None, public_filter=None):
+    """Snapshot loader: the whole collection, only what a tier may see, or only what the public may see"""
+    async def load(tier: Optional[str]):
+        if tier is None:
+            query = {}
+        elif tier == PUBLIC_TIER and public_filter is not None:
+            query = public_filter
+        else:
+            query = (member_filter or tier_rank_filter)(tier)
+        return await getattr(repos, collection).find(query, projection).to_list(None)
+    return load
+
+def member_locations_filter(tier: str) -> dict:
+    # Public stops are listed for every member, exclusive ones by tier
+    return {"$or": [{"is_member_exclusive": False}, tier_rank_filter(tier)]}
+
+catalog.add_collection("menu_items", catalog_loader("menu_items", MENU_ITEM_FIELDS))
+catalog.add_collection("locations", catalog_loader(
+    "locations", LOCATION_FIELDS, member_locations_filter, public_filter={"is_member_exclusive": False}
+))
+catalog.add_collection("events", catalog_loader("events", EVENT_FIELDS))
+catalog.attach(invalidation_bus)
+
+# Menu BCH/BBC prices follow live prices; a repricing bumps the menu's catalog version
+async def fetch_menu_prices() -> Dict[str, float]:
+    """USD prices of the menu's crypto currencies, leaving out any we only have fallback data for"""
+    prices = {}
+    bch_price = await fetch_bch_price_usd()
+    if bch_price:
+        prices["bch"] = bch_price
+    token = await get_pump_token_price()
+    if token.get("source") != "mock_data" and token.get("price_usd"):
+        prices["bbc"] = float(token["price_usd"])
+    return prices
+
+repricing = RepricingEngine(
+    lambda: repos.menu_items,
+    fetch_menu_prices,
+    on_repriced=lambda: catalog.invalidate("menu_items"),
+    threshold=float(os.environ.get("REPRICE_THRESHOLD", "0.02")),
+    interval=float(os.environ.get("REPRICE_INTERVAL_SECONDS", "300")),
+)
+
+async def cached_menu_items() -> List[dict]:
+    return await catalog.snapshot("menu_items")
+
+async def cached_locations() -> List[dict]:
+    return await catalog.snapshot("locations")
+
+async def cached_events() -> List[dict]:
+    return await catalog.snapshot("events")
+
+def catalog_response(rendered: RenderedView) -> Response:
+    """Pre-serialized catalog view, sent without re-validating it"""
+    return Response(content=rendered.body, media_type="application/json", headers={"ETag": rendered.etag})
+
 async def get_or_create_member(wallet_address: str) -> MemberProfile:
-    member = await db.members.find_one({"wallet_address": wallet_address})
+    member = await member_cache.get(
+        wallet_address,
+        lambda: repos.members.find_one({"wallet_address": wallet_address}, MEMBER_PROFILE_FIELDS)
+    )
     if not member:
         new_member = MemberProfile(
             wallet_address=wallet_address,
@@ -325,22 +538,32 @@ async def get_or_create_member(wallet_address: str) -> MemberProfile:
             dues_paid=False,
             payment_amount=0.0
         )
-        member_dict = new_member.dict()
-        # Convert datetime to string for MongoDB storage
-        if 'joined_at' in member_dict and isinstance(member_dict['joined_at'], datetime):
-            member_dict['joined_at'] = member_dict['joined_at'].isoformat()
-        await db.members.insert_one(member_dict)
+        await repos.members.insert_one(new_member.dict())
         return new_member
     
-    # Handle datetime conversion when retrieving from MongoDB
-    if 'joined_at' in member and isinstance(member['joined_at'], str):
-        member['joined_at'] = datetime.fromisoformat(member['joined_at'].replace('Z', '+00:00'))
-    
     return MemberProfile(**member)
 
-async def check_tier_access(required_tier: str, user_tier: str) -> bool:
-    tier_hierarchy = {"basic": 1, "premium": 2, "vip": 3}
-    return tier_hierarchy.get(user_tier, 0) >= tier_hierarchy.get(required_tier, 0)
+def get_member_loader() -> BatchLoader:
+    """Request-scoped loader resolving members by wallet address in one $in query"""
+    return document_loader(repos.members, "wallet_address", MEMBER_STATUS_FIELDS)
+
+TIER_HIERARCHY = {"basic": 1, "premium": 2, "vip": 3}
+
+def tier_rank(tier: Optional[str]) -> int:
+    return TIER_HIERARCHY.get(tier, 0)
+
+def with_tier_rank(document: dict) -> dict:
+    """Menu items, locations and events carry the numeric rank of tier_required
+    so tier access is a single indexed range condition"""
+    return {**document, "tier_rank": tier_rank(document["tier_required"])}
+
+def tier_rank_filter(user_tier: str) -> dict:
+    """Query condition matching documents a member of user_tier may access"""
+    return {"tier_rank": {"$lte": tier_rank(user_tier)}}
+
+def catalog_document(document: dict) -> dict:
+    """Derived fields stored with a menu item, location or event when it is written"""
+    return with_schedule_times(with_tier_rank(document))
 
 # BCH Authentication Helper Functions
 security = HTTPBearer()
@@ -392,7 +615,7 @@ async def get_authenticated_member_jwt(credentials: HTTPAuthorizationCredentials
             raise credentials_exception
         
         # Find member by email
-        member = await db.members.find_one({"email": email, "id": member_id})
+        member = await repos.members.find_one({"email": email, "id": member_id}, MEMBER_JWT_FIELDS)
         if not member:
             raise credentials_exception
             
@@ -400,7 +623,7 @@ async def get_authenticated_member_jwt(credentials: HTTPAuthorizationCredentials
         member_profile = MemberProfile(
             id=member.get("id", ""),
             wallet_address=member.get("wallet_address", ""),
-            membership_tier="basic",
+            membership_tier=member.get("membership_tier") or "basic",
             full_name=member.get("name", ""),
             email=member.get("email", ""),
             phone=member.get("phone", ""),
@@ -704,15 +927,15 @@ async def create_p2p_payment(request: P2PPaymentRequest):
         "instructions": method["instructions"],
         "user_email": request.user_email,
         "user_address": request.user_address,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "expires_at": (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat(),
+        "created_at": datetime.now(timezone.utc),
+        "expires_at": datetime.now(timezone.utc) + timedelta(hours=24),
         "status": "pending",
         "qr_code": qr_code_data if request.payment_method == "bch" else None,
         "cashstamp_bonus": method.get("cashstamp", 0)
     }
     
     # Store payment instruction for admin tracking
-    payment_requests_db[payment_id] = payment_instruction
+    await repos.payments.insert_one(dict(payment_instruction))
     
     return {
         "success": True,
@@ -732,15 +955,14 @@ async def create_membership_payment(user_address: str = None):
 @api_router.get("/payments/status/{payment_id}")
 async def get_payment_status(payment_id: str):
     """Get payment status"""
-    if payment_id not in payment_requests_db:
+    payment = await repos.payments.find_one({"payment_id": payment_id}, PAYMENT_FIELDS)
+    if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    payment = payment_requests_db[payment_id]
-    
     # Check if payment expired
-    expires_at = datetime.fromisoformat(payment["expires_at"].replace('Z', '+00:00'))
-    if datetime.now(timezone.utc) > expires_at and payment["status"] == "pending":
+    if payment["status"] == "pending" and payment.get("expires_at") and datetime.now(timezone.utc) > payment["expires_at"]:
         payment["status"] = "expired"
+        await repos.payments.update_one({"payment_id": payment_id, "status": "pending"}, {"$set": {"status": "expired"}})
     
     return {
         "payment_id": payment_id,
@@ -748,7 +970,7 @@ async def get_payment_status(payment_id: str):
         "amount_usd": payment.get("amount", 0.0),  # Use "amount" field from P2P payment
         "amount_bch": payment.get("amount_bch", 0.0),  # May not exist for non-BCH payments
         "receiving_address": payment.get("handle", ""),  # Use "handle" field from P2P payment
-        "expires_at": payment["expires_at"],
+        "expires_at": payment.get("expires_at"),
         "created_at": payment["created_at"],
         "verified_at": payment.get("verified_at"),
         "transaction_id": payment.get("transaction_id")
@@ -762,19 +984,23 @@ class AdminVerifyPaymentRequest(BaseModel):
 @api_router.post("/admin/verify-payment")
 async def admin_verify_payment(request: AdminVerifyPaymentRequest):
     """Admin endpoint to manually verify payment"""
-    if request.payment_id not in payment_requests_db:
+    payment = await repos.payments.find_one({"payment_id": request.payment_id}, PAYMENT_FIELDS)
+    if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    payment = payment_requests_db[request.payment_id]
-    
     if payment["status"] == "verified":
         return {"message": "Payment already verified", "payment": payment}
     
     # Update payment status
-    payment["status"] = "verified"
-    payment["transaction_id"] = request.transaction_id
-    payment["verified_at"] = datetime.now(timezone.utc).isoformat()
-    payment["verified_by"] = "admin"  # In real system, would be admin user ID
+    await repos.payments.update_one(
+        {"payment_id": request.payment_id},
+        {"$set": {
+            "status": "verified",
+            "transaction_id": request.transaction_id,
+            "verified_at": datetime.now(timezone.utc),
+            "verified_by": "admin"  # In real system, would be admin user ID
+        }}
+    )
     
     # Here you would typically:
     # 1. Activate the member's account
@@ -789,31 +1015,41 @@ async def admin_verify_payment(request: AdminVerifyPaymentRequest):
         "cashstamp_pending": True
     }
 
+PENDING_PAYMENT_SORT = [("created_at", -1), ("payment_id", -1)]
+
 @api_router.get("/admin/pending-payments")
-async def get_pending_payments():
-    """Admin endpoint to get all pending payments"""
-    pending_payments = []
-    
-    for payment_id, payment in payment_requests_db.items():
-        if payment["status"] == "pending":
-            # Check if expired
-            expires_at = datetime.fromisoformat(payment["expires_at"].replace('Z', '+00:00'))
-            if datetime.now(timezone.utc) > expires_at:
-                payment["status"] = "expired"
-                continue
-            
-            pending_payments.append({
-                "payment_id": payment_id,
-                "user_address": payment.get("user_address", ""),
-                "amount_usd": payment.get("amount", 0.0),  # Use "amount" field from P2P payment
-                "amount_bch": payment.get("amount_bch", 0.0),  # May not exist for non-BCH payments
-                "created_at": payment["created_at"],
-                "expires_at": payment["expires_at"]
-            })
+async def get_pending_payments(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Admin endpoint to get all pending payments, newest first"""
+    limit = clamp_limit(limit)
+    try:
+        page_filter = {"status": "pending", **keyset_filter(PENDING_PAYMENT_SORT, cursor)}
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    
+    # Expire lapsed instructions first so they drop out of the listing
+    await repos.payments.update_many(
+        {"status": "pending", "expires_at": {"$lte": datetime.now(timezone.utc)}},
+        {"$set": {"status": "expired"}}
+    )
+    
+    payments = await repos.payments.find(
+        page_filter, PENDING_PAYMENT_FIELDS
+    ).sort(PENDING_PAYMENT_SORT).limit(limit + 1).to_list(length=None)
+    cursor_after = next_cursor(payments, PENDING_PAYMENT_SORT, limit)
+    
+    pending_payments = [{
+        "payment_id": payment["payment_id"],
+        "user_address": payment.get("user_address", ""),
+        "amount_usd": payment.get("amount", 0.0),  # Use "amount" field from P2P payment
+        "amount_bch": payment.get("amount_bch", 0.0),  # May not exist for non-BCH payments
+        "created_at": payment["created_at"],
+        "expires_at": payment["expires_at"]
+    } for payment in payments]
     
     return {
         "pending_payments": pending_payments,
-        "count": len(pending_payments)
+        "count": len(pending_payments),
+        "next_cursor": cursor_after
     }
 
 class AdminSendCashstampRequest(BaseModel):
@@ -824,11 +1060,10 @@ class AdminSendCashstampRequest(BaseModel):
 @api_router.post("/admin/send-cashstamp")
 async def admin_send_cashstamp(request: AdminSendCashstampRequest):
     """Admin endpoint to send $15 BCH cashstamp (manual for now)"""
-    if request.payment_id not in payment_requests_db:
+    payment = await repos.payments.find_one({"payment_id": request.payment_id}, PAYMENT_FIELDS)
+    if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    payment = payment_requests_db[request.payment_id]
-    
     if payment["status"] != "verified":
         raise HTTPException(status_code=400, detail="Payment must be verified first")
     
@@ -894,7 +1129,7 @@ async def get_pump_token_price():
             token_data = None
             for api_url in api_urls:
                 try:
-                    response = requests.get(api_url, timeout=10)
+                    response = await asyncio.to_thread(requests.get, api_url, timeout=10)
                     if response.status_code == 200:
                         token_data = response.json()
                         break
@@ -920,7 +1155,7 @@ async def get_pump_token_price():
         # Fallback: Try to fetch from DexScreener API
         try:
             dexscreener_url = f"https://api.dexscreener.com/latest/dex/tokens/{PUMP_TOKEN_MINT}"
-            response = requests.get(dexscreener_url, timeout=10)
+            response = await asyncio.to_thread(requests.get, dexscreener_url, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("pairs") and len(data["pairs"]) > 0:
@@ -1174,15 +1409,63 @@ async def verify_signature(request: SignatureRequest):
 async def get_authenticated_member(member: MemberProfile = Depends(get_current_user)) -> MemberProfile:
     return member
 
+# Referral ledger
+# Every referral, earned commission and payout is appended to referral_ledger
+# through record_referral_entry(), which also $incs the affiliate's materialized
+# balance on their member document (total_referrals, total_commissions_earned,
+# unpaid_commissions). The ledger is the source of truth; the balance can be
+# rebuilt from it with migrations.py.
+def referral_balance_increments(entry: ReferralLedgerEntry) -> Dict[str, float]:
+    if entry.entry_type == "referral":
+        return {"total_referrals": 1}
+    if entry.entry_type == "commission":
+        return {"total_commissions_earned": entry.amount, "unpaid_commissions": entry.amount}
+    if entry.entry_type == "payout":
+        return {"unpaid_commissions": entry.amount}
+    raise ValueError(f"Unknown referral ledger entry type: {entry.entry_type}")
+
+def referral_dedupe_key(entry: ReferralLedgerEntry) -> str:
+    """A referred member yields at most one referral and one commission per affiliate"""
+    if entry.entry_type == "payout":
+        return f"payout:{entry.id}"
+    referred = entry.referred_email.strip().lower() or entry.referred_member_id
+    return f"{entry.entry_type}:{entry.affiliate_id}:{referred}"
+
+async def append_referral_entry(entry: ReferralLedgerEntry) -> bool:
+    """Append a ledger entry without touching the balance; False if it was already recorded"""
+    if not entry.dedupe_key:
+        entry.dedupe_key = referral_dedupe_key(entry)
+    try:
+        await repos.referral_ledger.insert_one(entry.dict())
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def record_referral_entry(entry: ReferralLedgerEntry) -> bool:
+    """Append a ledger entry and apply it to the affiliate's balance.
+
+    Returns False if the same referral or commission was already recorded.
+    """
+    if not await append_referral_entry(entry):
+        return False
+    
+    update = {"$inc": referral_balance_increments(entry)}
+    if entry.entry_type == "payout":
+        update["$set"] = {"last_payout_at": entry.created_at}
+    await repos.members.update_one({"id": entry.affiliate_id}, update)
+    return True
+
 # Affiliate System Endpoints
 @api_router.get("/affiliate/my-stats")
 async def get_affiliate_stats(member: MemberProfile = Depends(get_authenticated_member)):
     """Get affiliate statistics for current member"""
+    balance = await repos.members.find_one({"id": member.id}, MEMBER_AFFILIATE_FIELDS) or {}
     return {
-        "referral_code": member.referral_code,
-        "total_referrals": member.total_referrals,
-        "total_commissions_earned": member.total_commissions_earned,
-        "unpaid_commissions": member.unpaid_commissions,
+        "referral_code": balance.get("referral_code", member.referral_code),
+        "total_referrals": balance.get("total_referrals", 0),
+        "total_commissions_earned": balance.get("total_commissions_earned", 0.0),
+        "unpaid_commissions": balance.get("unpaid_commissions", 0.0),
+        "last_payout_at": balance.get("last_payout_at"),
         "commission_per_referral": AFFILIATE_COMMISSION_USD
     }
 
@@ -1196,30 +1479,22 @@ async def process_referral(
         return {"success": False, "message": "No referral code provided"}
     
     # Find the referrer by their referral code
-    referrer = await db.members.find_one({"referral_code": referral_code})
+    referrer = await repos.members.find_one({"referral_code": referral_code}, MEMBER_REFERRER_FIELDS)
     if not referrer:
         return {"success": False, "message": "Invalid referral code"}
     
-    # Create referral record
-    referral = AffiliateReferral(
-        referrer_email=referrer["email"],
-        referrer_code=referral_code,
-        new_member_email=new_member_email
-    )
-    
-    await db.affiliate_referrals.insert_one(referral.dict())
-    
-    # Update referrer's stats
-    await db.members.update_one(
-        {"referral_code": referral_code},
-        {
-            "$inc": {
-                "total_referrals": 1,
-                "total_commissions_earned": AFFILIATE_COMMISSION_USD,
-                "unpaid_commissions": AFFILIATE_COMMISSION_USD
-            }
-        }
-    )
+    # Record the referral and its commission in one step
+    for entry_type, amount in (("referral", 0.0), ("commission", AFFILIATE_COMMISSION_USD)):
+        recorded = await record_referral_entry(ReferralLedgerEntry(
+            entry_type=entry_type,
+            affiliate_id=referrer["id"],
+            affiliate_email=referrer["email"],
+            referral_code=referral_code,
+            referred_email=new_member_email,
+            amount=amount
+        ))
+        if not recorded:
+            return {"success": False, "message": "Referral already processed"}
     
     return {
         "success": True,
@@ -1227,35 +1502,119 @@ async def process_referral(
         "commission_amount": AFFILIATE_COMMISSION_USD
     }
 
+AFFILIATE_PAYOUT_SORT = [("email", 1)]
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+UNPAID_COMMISSIONS_MATCH = {"unpaid_commissions": {"$gt": 0}}
+
+def affiliate_payouts_pipeline(cursor: Optional[str], limit: int) -> List[dict]:
+    """One page of affiliates owed commissions plus the report totals.
+
+    Both branches match on unpaid_commissions > 0 and are served by the partial
+    members_unpaid_commissions index; commissions earned since the last payout
+    are joined from the referral ledger on its (affiliate_id, entry_type,
+    created_at) index. The totals document is appended with $unionWith so the
+    whole report is a single aggregation round trip.
+    """
+    return [
+        {"$match": {**UNPAID_COMMISSIONS_MATCH, **keyset_filter(AFFILIATE_PAYOUT_SORT, cursor)}},
+        {"$sort": dict(AFFILIATE_PAYOUT_SORT)},
+        {"$limit": limit + 1},
+        {"$lookup": {
+            "from": "referral_ledger",
+            "localField": "id",
+            "foreignField": "affiliate_id",
+            "let": {"last_payout_at": {"$ifNull": ["$last_payout_at", UNIX_EPOCH]}},
+            "pipeline": [
+                {"$match": {"entry_type": "commission", "$expr": {"$gt": ["$created_at", "$$last_payout_at"]}}},
+                {"$project": {"_id": 0, "new_member": "$referred_email", "amount": 1}}
+            ],
+            "as": "referrals"
+        }},
+        {"$project": {
+            "_id": 0,
+            "email": 1,
+            "member_email": "$email",
+            "member_name": "$full_name",
+            "referral_code": 1,
+            "total_unpaid": "$unpaid_commissions",
+            "pending_referrals": {"$size": "$referrals"},
+            "referrals": 1
+        }},
+        {"$unionWith": {
+            "coll": "members",
+            "pipeline": [
+                {"$match": UNPAID_COMMISSIONS_MATCH},
+                {"$group": {
+                    "_id": None,
+                    "total_affiliates": {"$sum": 1},
+                    "total_amount_owed": {"$sum": "$unpaid_commissions"}
+                }},
+                {"$project": {"_id": 0, "is_totals": {"$literal": True}, "total_affiliates": 1, "total_amount_owed": 1}}
+            ]
+        }}
+    ]
+
+AFFILIATE_PAYOUT_FIELDS = fields("id", "email", "full_name", "referral_code", "unpaid_commissions", "last_payout_at")
+
+async def affiliate_payouts_documents(cursor: Optional[str], limit: int) -> List[dict]:
+    """affiliate_payouts_pipeline folded in Python, for backends without aggregation"""
+    affiliates = await repos.members.find(
+        {**UNPAID_COMMISSIONS_MATCH, **keyset_filter(AFFILIATE_PAYOUT_SORT, cursor)}, AFFILIATE_PAYOUT_FIELDS
+    ).sort(AFFILIATE_PAYOUT_SORT).limit(limit + 1).to_list(length=None)
+    
+    documents = []
+    for affiliate in affiliates:
+        commissions = await repos.referral_ledger.find({
+            "affiliate_id": affiliate["id"],
+            "entry_type": "commission",
+            "created_at": {"$gt": affiliate.get("last_payout_at") or UNIX_EPOCH}
+        }, fields("referred_email", "amount")).to_list(length=None)
+        referrals = [{"new_member": entry.get("referred_email"), "amount": entry["amount"]} for entry in commissions]
+        documents.append({
+            "email": affiliate["email"],
+            "member_email": affiliate["email"],
+            "member_name": affiliate.get("full_name"),
+            "referral_code": affiliate.get("referral_code"),
+            "total_unpaid": affiliate["unpaid_commissions"],
+            "pending_referrals": len(referrals),
+            "referrals": referrals
+        })
+    
+    totals = {"is_totals": True, "total_affiliates": 0, "total_amount_owed": 0}
+    async for affiliate in repos.members.find(UNPAID_COMMISSIONS_MATCH, fields("unpaid_commissions")):
+        totals["total_affiliates"] += 1
+        totals["total_amount_owed"] += affiliate["unpaid_commissions"]
+    return documents + [totals]
+
 @api_router.get("/admin/affiliate-payouts")
-async def get_pending_affiliate_payouts():
+async def get_pending_affiliate_payouts(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
     """Admin: Get all pending affiliate commission payouts"""
+    limit = clamp_limit(limit)
+    try:
+        if repos.backend == "sqlite":
+            results = await affiliate_payouts_documents(cursor, limit)
+        else:
+            results = await db.members.aggregate(affiliate_payouts_pipeline(cursor, limit)).to_list(length=None)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Get all members with unpaid commissions
-    members_with_commissions = await db.members.find({
-        "unpaid_commissions": {"$gt": 0}
-    }).to_list(100)
-    
+    totals = {"total_affiliates": 0, "total_amount_owed": 0}
     payouts = []
-    for member in members_with_commissions:
-        # Get their pending referrals
-        pending_referrals = await db.affiliate_referrals.find({
-            "referrer_email": member["email"],
-            "status": "pending"
-        }).to_list(100)
-        
-        payouts.append({
-            "member_email": member["email"],
-            "member_name": member["full_name"],
-            "referral_code": member["referral_code"],
-            "total_unpaid": member["unpaid_commissions"],
-            "pending_referrals": len(pending_referrals),
-            "referrals": [{"new_member": r["new_member_email"], "amount": r["commission_amount"]} for r in pending_referrals]
-        })
+    for document in results:
+        if document.get("is_totals"):
+            totals = document
+        else:
+            payouts.append(document)
+    
+    cursor_after = next_cursor(payouts, AFFILIATE_PAYOUT_SORT, limit)
+    for payout in payouts:
+        payout.pop("email", None)
     
     return {
         "pending_payouts": payouts,
-        "total_amount_owed": sum(p["total_unpaid"] for p in payouts)
+        "total_amount_owed": totals["total_amount_owed"],
+        "total_affiliates": totals["total_affiliates"],
+        "next_cursor": cursor_after
     }
 
 @api_router.post("/admin/pay-affiliate-commission")
@@ -1266,32 +1625,30 @@ async def pay_affiliate_commission(
 ):
     """Admin: Mark affiliate commissions as paid"""
     
-    member = await db.members.find_one({"email": member_email})
+    # Claim the whole balance atomically, so two concurrent payouts can't both pay it
+    paid_at = datetime.now(timezone.utc)
+    member = await repos.members.find_one_and_update(
+        {"email": member_email, **UNPAID_COMMISSIONS_MATCH},
+        {"$set": {"unpaid_commissions": 0, "last_payout_at": paid_at}},
+        projection=MEMBER_COMMISSION_FIELDS,
+        return_document=ReturnDocument.BEFORE
+    )
     if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-    
-    unpaid_amount = member.get("unpaid_commissions", 0)
-    if unpaid_amount <= 0:
+        if not await repos.members.find_one({"email": member_email}, fields("id")):
+            raise HTTPException(status_code=404, detail="Member not found")
         return {"message": "No unpaid commissions for this member"}
     
-    # Mark all pending referrals as paid
-    await db.affiliate_referrals.update_many(
-        {"referrer_email": member_email, "status": "pending"},
-        {
-            "$set": {
-                "status": "paid",
-                "paid_at": datetime.now(timezone.utc).isoformat(),
-                "payment_method": payment_method,
-                "transaction_id": transaction_id
-            }
-        }
-    )
-    
-    # Reset unpaid commissions to 0
-    await db.members.update_one(
-        {"email": member_email},
-        {"$set": {"unpaid_commissions": 0}}
-    )
+    # The payout entry records the claimed amount; the balance is already settled
+    unpaid_amount = member["unpaid_commissions"]
+    await append_referral_entry(ReferralLedgerEntry(
+        entry_type="payout",
+        affiliate_id=member["id"],
+        affiliate_email=member["email"],
+        amount=-unpaid_amount,
+        payment_method=payment_method,
+        transaction_id=transaction_id,
+        created_at=paid_at
+    ))
     
     return {
         "success": True,
@@ -1299,15 +1656,51 @@ async def pay_affiliate_commission(
         "amount_paid": unpaid_amount
     }
 
+def require_mongo_backend():
+    """The treasury and archival read MongoDB directly; refuse rather than answer from the wrong store"""
+    if repos.backend != "mongo":
+        raise HTTPException(status_code=503, detail=f"Not available with STORAGE_BACKEND={repos.backend}")
+
+# Cold-data archival (admin)
+@api_router.post("/admin/archive/run", dependencies=[Depends(require_mongo_backend)])
+async def run_archive_job(admin: dict = Depends(get_admin_user)):
+    """Move history older than the retention window to compressed archive segments"""
+    from archive import RETENTION_DAYS, run_archival
+    from rewards_treasury import TREASURY_DB_NAME
+    
+    # Raw BSON (no Decimal codec) so Decimal128 amounts archive as $numberDecimal
+    results = await run_archival(db, client[TREASURY_DB_NAME])
+    return {"success": True, "retention_days": RETENTION_DAYS, "results": results}
+
+# Database metrics (admin)
+@api_router.get("/admin/db/metrics")
+async def get_db_metrics(admin: dict = Depends(get_admin_user)):
+    """Connection pool and command metrics for the MongoDB client"""
+    return {
+        "success": True,
+        "metrics": mongo_metrics.snapshot(pool_options=MONGO_POOL_OPTIONS),
+        "caches": {
+            **invalidation_bus.stats(),
+            "entries": {member_cache.collection: member_cache.stats()},
+            "catalog": catalog.stats(),
+            "repricing": repricing.stats()
+        }
+    }
+
+@api_router.post("/admin/db/metrics/reset")
+async def reset_db_metrics(admin: dict = Depends(get_admin_user)):
+    """Reset the MongoDB command and checkout counters"""
+    mongo_metrics.reset()
+    return {"success": True, "message": "Database metrics reset"}
+
 # Public routes (no auth required)
 @api_router.get("/")
 async def root():
     return {"message": "Welcome to Bitcoin Ben's Burger Bus Club - Exclusive Gourmet Experience"}
 
-@api_router.get("/menu/public", response_model=List[dict])
-async def get_public_menu():
-    """Get basic menu items visible to non-members (no pricing shown)."""
-    menu_items = await db.menu_items.find({"tier_required": "basic"}).to_list(50)
+def public_menu_view(snapshots: dict, tier: Optional[str]) -> List[dict]:
+    """Basic menu items without pricing, from the basic tier's snapshot"""
+    menu_items = snapshots["menu_items"]
     # Remove pricing information for public view
     public_items = []
     for item in menu_items:
@@ -1323,11 +1716,62 @@ async def get_public_menu():
         public_items.append(public_item)
     return public_items
 
+def public_locations_view(snapshots: dict, tier: Optional[str]) -> List[TruckLocation]:
+    """Non-exclusive stops, from the snapshot loaded with only those"""
+    return [TruckLocation(**location) for location in snapshots["locations"]]
+
+# Member views read snapshots already filtered by tier_rank in the query
+def member_menu_view(snapshots: dict, tier: Optional[str]) -> List[MenuItem]:
+    return [MenuItem(**item) for item in snapshots["menu_items"]]
+
+def member_locations_view(snapshots: dict, tier: Optional[str]) -> List[TruckLocation]:
+    return [TruckLocation(**location) for location in snapshots["locations"]]
+
+def member_events_view(snapshots: dict, tier: Optional[str]) -> List[MemberEvent]:
+    return [MemberEvent(**event) for event in snapshots["events"]]
+
+catalog.add_view("menu/public", ("menu_items",), public_menu_view)
+catalog.add_view("locations/public", ("locations",), public_locations_view)
+catalog.add_view("menu/member", ("menu_items",), member_menu_view)
+catalog.add_view("locations/member", ("locations",), member_locations_view)
+catalog.add_view("events", ("events",), member_events_view)
+
+@api_router.get("/menu/public", response_model=List[dict])
+async def get_public_menu():
+    """Get basic menu items visible to non-members (no pricing shown)."""
+    return catalog_response(await catalog.render("menu/public", "basic"))
+
 @api_router.get("/locations/public", response_model=List[TruckLocation])
 async def get_public_locations():
     """Get public food truck locations."""
-    locations = await db.locations.find({"is_member_exclusive": False}).to_list(20)
-    return [TruckLocation(**location) for location in locations]
+    return catalog_response(await catalog.render("locations/public", PUBLIC_TIER))
+
+@api_router.get("/locations/nearby", response_model=List[NearbyLocation])
+async def get_nearby_locations(
+    lat: float,
+    lng: float,
+    radius: float = 10.0,
+    date: Optional[str] = None,
+    limit: int = 20,
+    member: MemberProfile = Depends(get_authenticated_member)
+):
+    """Upcoming stops the member can attend within radius km, nearest first.
+
+    date (YYYY-MM-DD, default today) is the first day to include.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise HTTPException(status_code=400, detail="lat must be within ±90 and lng within ±180")
+    if radius <= 0:
+        raise HTTPException(status_code=400, detail="radius must be positive")
+    query = {
+        "date": {"$gte": date or datetime.now(timezone.utc).date().isoformat()},
+        **member_locations_filter(member.membership_tier),
+    }
+    locations = await find_nearby(
+        repos.locations, geojson_point(lng, lat), min(radius * 1000, MAX_RADIUS_M),
+        query, LOCATION_FIELDS, clamp_limit(limit)
+    )
+    return [NearbyLocation(**location) for location in locations]
 
 # Protected member routes
 @api_router.get("/profile", response_model=MemberProfile)
@@ -1335,6 +1779,42 @@ async def get_member_profile(member: MemberProfile = Depends(get_authenticated_m
     """Get member profile information."""
     return member
 
+@api_router.get("/me/bootstrap", response_model=MemberBootstrap)
+async def get_member_bootstrap(member: MemberProfile = Depends(get_authenticated_member_jwt)):
+    """Profile, tier menu, locations, events, recent orders and stake summary in one response.
+
+    The member is authenticated once and every part is loaded concurrently;
+    catalog views are spliced in as already-rendered JSON.
+    """
+    # Email members have no wallet yet, so they have no orders or stakes either;
+    # querying by "" would match any other record stored without a wallet
+    async def orders():
+        if not member.wallet_address:
+            return OrderHistoryPage(orders=[])
+        return await member_order_page(member.wallet_address)
+
+    async def stakes():
+        if not member.wallet_address:
+            return await stake_summary([])
+        return await stake_summary(await member_stake_accounts(member.wallet_address))
+
+    menu, locations, events, orders, stakes = await asyncio.gather(
+        catalog.render("menu/member", member.membership_tier),
+        catalog.render("locations/member", member.membership_tier),
+        catalog.render("events", member.membership_tier),
+        orders(),
+        stakes(),
+    )
+    body = render_object({
+        "profile": render_json(member).body,
+        "menu": menu.body,
+        "locations": locations.body,
+        "events": events.body,
+        "orders": render_json(orders).body,
+        "stakes": render_json(stakes).body,
+    })
+    return Response(content=body, media_type="application/json")
+
 @api_router.post("/profile/update-wallet")
 async def update_member_wallet(request: dict, member: MemberProfile = Depends(get_current_user)):
     """Update member Solana wallet address for staking"""
@@ -1348,13 +1828,14 @@ async def update_member_wallet(request: dict, member: MemberProfile = Depends(ge
             raise HTTPException(status_code=400, detail="Invalid Solana wallet address format")
         
         # Update member record using BCH wallet_address as key, but update solana_wallet_address
-        result = await db.members.update_one(
+        result = await repos.members.update_one(
             {"wallet_address": member.wallet_address},
-            {"$set": {"solana_wallet_address": solana_wallet_address, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"solana_wallet_address": solana_wallet_address, "updated_at": datetime.now(timezone.utc)}}
         )
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Member not found")
+        member_cache.discard(member.wallet_address)
         
         return {
             "success": True,
@@ -1373,10 +1854,11 @@ async def update_member_profile(
     member: MemberProfile = Depends(get_authenticated_member)
 ):
     """Update member favorite items."""
-    await db.members.update_one(
+    await repos.members.update_one(
         {"wallet_address": member.wallet_address},
         {"$set": {"favorite_items": favorite_items}}
     )
+    member_cache.discard(member.wallet_address)
 
 # TEMPORARY: Registration without auth for debugging
 @api_router.post("/debug/register")
@@ -1386,7 +1868,7 @@ async def debug_registration(member_data: dict):
         wallet_address = member_data.get("wallet_address", "debug_wallet_123")
         
         # Create or get member
-        existing_member = await db.members.find_one({"wallet_address": wallet_address})
+        existing_member = await repos.members.find_one({"wallet_address": wallet_address}, EXISTS_FIELDS)
         if not existing_member:
             new_member = MemberProfile(
                 wallet_address=wallet_address,
@@ -1400,11 +1882,11 @@ async def debug_registration(member_data: dict):
             member_dict = new_member.dict()
             if 'joined_at' in member_dict and isinstance(member_dict['joined_at'], datetime):
                 member_dict['joined_at'] = member_dict['joined_at'].isoformat()
-            await db.members.insert_one(member_dict)
+            await repos.members.insert_one(member_dict)
             existing_member = member_dict
         
         # Update with PMA info
-        await db.members.update_one(
+        await repos.members.update_one(
             {"wallet_address": wallet_address},
             {"$set": {
                 "full_name": member_data.get("fullName", ""),
@@ -1413,11 +1895,11 @@ async def debug_registration(member_data: dict):
                 "pma_agreed": member_data.get("pma_agreed", False),
                 "dues_paid": member_data.get("dues_paid", False),
                 "payment_amount": member_data.get("payment_amount", 0.0),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
         
-        updated_member = await db.members.find_one({"wallet_address": wallet_address})
+        updated_member = await repos.members.find_one({"wallet_address": wallet_address}, MEMBER_PROFILE_FIELDS)
         return {"message": "Debug registration successful", "member": MemberProfile(**updated_member)}
     except Exception as e:
         import traceback
@@ -1445,23 +1927,19 @@ async def debug_get_profile():
 @api_router.get("/debug/menu")
 async def debug_get_menu():
     """TEMPORARY: Get debug menu without authentication"""
-    # Seed menu items first
-    await seed_sample_data()
-    
-    # Return menu items
-    menu_items = await db.menu_items.find().to_list(100)
+    menu_items = await cached_menu_items()
     return [MenuItem(**item) for item in menu_items]
 
 @api_router.get("/debug/locations")
 async def debug_get_locations():
     """TEMPORARY: Get debug locations without authentication"""
-    locations = await db.locations.find().to_list(50)
+    locations = await cached_locations()
     return [TruckLocation(**location) for location in locations]
 
 @api_router.get("/debug/events")
 async def debug_get_events():
     """TEMPORARY: Get debug events without authentication"""
-    events = await db.events.find().to_list(20)
+    events = await cached_events()
     return [MemberEvent(**event) for event in events]
 
 @api_router.get("/debug/orders")
@@ -1473,7 +1951,7 @@ async def register_membership(member_data: dict, member: MemberProfile = Depends
     """Register new membership with PMA agreement and dues payment"""
     try:
         # Update existing member with PMA info
-        await db.members.update_one(
+        await repos.members.update_one(
             {"wallet_address": member.wallet_address},
             {"$set": {
                 "full_name": member_data.get("fullName", ""),
@@ -1482,10 +1960,11 @@ async def register_membership(member_data: dict, member: MemberProfile = Depends
                 "pma_agreed": member_data.get("pma_agreed", False),
                 "dues_paid": member_data.get("dues_paid", False),
                 "payment_amount": member_data.get("payment_amount", 0.0),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
-        updated_member = await db.members.find_one({"wallet_address": member.wallet_address})
+        member_cache.discard(member.wallet_address)
+        updated_member = await repos.members.find_one({"wallet_address": member.wallet_address}, MEMBER_PROFILE_FIELDS)
         return {"message": "Membership updated successfully", "member": MemberProfile(**updated_member)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
@@ -1493,28 +1972,59 @@ async def register_membership(member_data: dict, member: MemberProfile = Depends
 @api_router.get("/menu/member", response_model=List[MenuItem])
 async def get_member_menu(member: MemberProfile = Depends(get_authenticated_member)):
     """Get full menu with member pricing."""
-    menu_items = await db.menu_items.find().to_list(100)
-    accessible_items = []
-    
-    for item in menu_items:
-        menu_item = MenuItem(**item)
-        if await check_tier_access(menu_item.tier_required, member.membership_tier):
-            accessible_items.append(menu_item)
-    
-    return accessible_items
+    return catalog_response(await catalog.render("menu/member", member.membership_tier))
 
 @api_router.get("/locations/member", response_model=List[TruckLocation])
 async def get_member_locations(member: MemberProfile = Depends(get_authenticated_member)):
     """Get all locations including member-exclusive ones."""
-    locations = await db.locations.find().to_list(50)
-    accessible_locations = []
+    return catalog_response(await catalog.render("locations/member", member.membership_tier))
+
+def to_cents(amount: float) -> int:
+    """Convert a USD amount to integer cents without binary float drift"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+async def price_order_items(items: List[dict]) -> Tuple[List[dict], int]:
+    """Price every line item at member pricing with one $in query.
+
+    Returns the normalized line items (with unit prices in cents) and the
+    order total in cents. Malformed lines and unknown or unavailable menu
+    items are all rejected in the same pass.
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="Order must contain at least one item")
+    
+    for item in items:
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=400, detail="Each item needs an item_id and a positive integer quantity")
+        item_id = item.get("item_id")
+        quantity = item.get("quantity")
+        if not isinstance(item_id, str) or not item_id or not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise HTTPException(status_code=400, detail="Each item needs an item_id and a positive integer quantity")
+    
+    item_ids = list({item["item_id"] for item in items})
+    menu_items = await repos.menu_items.find({"id": {"$in": item_ids}}, MENU_PRICE_FIELDS).to_list(length=None)
+    menu_by_id = {menu_item["id"]: menu_item for menu_item in menu_items}
+    
+    unknown = [item_id for item_id in item_ids if item_id not in menu_by_id]
+    unavailable = [item_id for item_id in item_ids if item_id in menu_by_id and not menu_by_id[item_id].get("is_available", True)]
+    if unknown or unavailable:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Some items cannot be ordered", "unknown_items": unknown, "unavailable_items": unavailable}
+        )
     
-    for location in locations:
-        truck_location = TruckLocation(**location)
-        if not truck_location.is_member_exclusive or await check_tier_access(truck_location.tier_required, member.membership_tier):
-            accessible_locations.append(truck_location)
+    priced_items = []
+    total_cents = 0
+    for item in items:
+        unit_price_cents = to_cents(menu_by_id[item["item_id"]]["member_price"])
+        total_cents += unit_price_cents * item["quantity"]
+        priced_items.append({
+            **item,
+            "name": menu_by_id[item["item_id"]]["name"],
+            "unit_price_cents": unit_price_cents
+        })
     
-    return accessible_locations
+    return priced_items, total_cents
 
 @api_router.post("/orders", response_model=PreOrder)
 async def create_pre_order(
@@ -1539,48 +2049,118 @@ async def create_pre_order(
         )
     
     # Calculate total with member pricing
-    total = 0.0
-    for item in items:
-        menu_item = await db.menu_items.find_one({"id": item["item_id"]})
-        if menu_item:
-            total += menu_item["member_price"] * item["quantity"]
+    priced_items, total_cents = await price_order_items(items)
     
     order = PreOrder(
         wallet_address=member.wallet_address,
-        items=items,
-        total_amount=total,
+        items=priced_items,
+        total_amount=total_cents / 100,
+        total_cents=total_cents,
         pickup_location=pickup_location,
         pickup_time=pickup_time
     )
     
-    await db.orders.insert_one(order.dict())
+    await repos.orders.insert_one(order.dict())
     
     # Update member total orders
-    await db.members.update_one(
+    await repos.members.update_one(
         {"wallet_address": member.wallet_address},
         {"$inc": {"total_orders": 1}}
     )
     
     return order
 
-@api_router.get("/orders", response_model=List[PreOrder])
-async def get_member_orders(member: MemberProfile = Depends(get_authenticated_member)):
-    """Get member's order history."""
-    orders = await db.orders.find({"wallet_address": member.wallet_address}).to_list(50)
-    return [PreOrder(**order) for order in orders]
+ORDER_HISTORY_SORT = [("created_at", -1), ("id", -1)]
+
+@api_router.get("/orders", response_model=OrderHistoryPage)
+async def get_member_orders(
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    member: MemberProfile = Depends(get_authenticated_member)
+):
+    """Get member's order history, newest first. Use next_cursor for older orders."""
+    try:
+        return await member_order_page(member.wallet_address, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def member_order_page(wallet_address: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> OrderHistoryPage:
+    limit = clamp_limit(limit)
+    page_filter = {"wallet_address": wallet_address, **keyset_filter(ORDER_HISTORY_SORT, cursor)}
+    orders = await repos.orders.find(
+        page_filter, ORDER_SUMMARY_FIELDS
+    ).sort(ORDER_HISTORY_SORT).limit(limit + 1).to_list(length=None)
+    cursor_after = next_cursor(orders, ORDER_HISTORY_SORT, limit)
+    
+    return OrderHistoryPage(
+        orders=[OrderSummary(**order) for order in orders],
+        next_cursor=cursor_after
+    )
+
+@api_router.get("/orders/{order_id}", response_model=PreOrder)
+async def get_member_order(order_id: str, member: MemberProfile = Depends(get_authenticated_member)):
+    """Get a single order with its full line items."""
+    order = await repos.orders.find_one({"id": order_id, "wallet_address": member.wallet_address}, ORDER_FIELDS)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return PreOrder(**order)
 
 @api_router.get("/events", response_model=List[MemberEvent])
 async def get_member_events(member: MemberProfile = Depends(get_authenticated_member)):
     """Get exclusive member events."""
-    events = await db.events.find().to_list(20)
-    accessible_events = []
-    
-    for event in events:
-        member_event = MemberEvent(**event)
-        if await check_tier_access(member_event.tier_required, member.membership_tier):
-            accessible_events.append(member_event)
-    
-    return accessible_events
+    return catalog_response(await catalog.render("events", member.membership_tier))
+
+SCHEDULE_SORT = [("starts_at", 1)]
+SCHEDULE_STOP_FIELDS = fields("id", "name", "address", "starts_at", "ends_at", "tier_required")
+SCHEDULE_EVENT_FIELDS = fields("id", "title", "location", "starts_at", "ends_at", "tier_required")
+MAX_SCHEDULE_WINDOW = timedelta(days=31)
+
+async def schedule_between(start: datetime, end: datetime, tier: str) -> List[ScheduleEntry]:
+    """Stops and events the tier may see starting in [start, end), merged by start time"""
+    window = {"starts_at": {"$gte": start, "$lt": end}}
+    stops, events = await asyncio.gather(
+        repos.locations.find({**window, **member_locations_filter(tier)}, SCHEDULE_STOP_FIELDS).sort(SCHEDULE_SORT).to_list(length=None),
+        repos.events.find({**window, **tier_rank_filter(tier)}, SCHEDULE_EVENT_FIELDS).sort(SCHEDULE_SORT).to_list(length=None),
+    )
+    return merge_by_start(map(ScheduleEntry.from_stop, stops), map(ScheduleEntry.from_event, events))
+
+@api_router.get("/schedule", response_model=List[ScheduleEntry])
+async def get_schedule(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    member: MemberProfile = Depends(get_authenticated_member)
+):
+    """Truck stops and events starting between from and to (default: the next 7 days), soonest first."""
+    start = start or datetime.now(timezone.utc)
+    end = end or start + timedelta(days=7)
+    if start.tzinfo is None or end.tzinfo is None:
+        raise HTTPException(status_code=400, detail="from and to must include a UTC offset")
+    if not start < end <= start + MAX_SCHEDULE_WINDOW:
+        raise HTTPException(status_code=400, detail="to must be after from and at most 31 days later")
+    return await schedule_between(start, end, member.membership_tier)
+
+@api_router.get("/schedule/today", response_model=List[ScheduleEntry])
+async def get_today_schedule(member: MemberProfile = Depends(get_authenticated_member)):
+    """Today's truck stops and events in the truck's local time zone."""
+    today = local_today()
+    return await today_schedule_cache.get(
+        (member.membership_tier, today),
+        lambda: schedule_between(*local_day_bounds(today), member.membership_tier)
+    )
+
+async def claim_event_seat(event_id: str, member: MemberProfile) -> Optional[dict]:
+    """Take a seat in one conditional update - the filter only matches while
+    the event has capacity left and the member's tier allows it"""
+    return await repos.events.find_one_and_update(
+        {
+            "id": event_id,
+            **tier_rank_filter(member.membership_tier),
+            "$expr": {"$lt": ["$current_attendees", "$max_attendees"]}
+        },
+        {"$inc": {"current_attendees": 1}},
+        projection=fields("current_attendees", "max_attendees"),
+        return_document=ReturnDocument.AFTER
+    )
 
 @api_router.post("/events/{event_id}/join")
 async def join_member_event(
@@ -1588,144 +2168,167 @@ async def join_member_event(
     member: MemberProfile = Depends(get_authenticated_member)
 ):
     """Join a member event."""
-    event = await db.events.find_one({"id": event_id})
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    member_event = MemberEvent(**event)
-    
-    if not await check_tier_access(member_event.tier_required, member.membership_tier):
-        raise HTTPException(status_code=403, detail="Insufficient membership tier")
-    
-    if member_event.current_attendees >= member_event.max_attendees:
+    # A repeat join is turned away before it can hold a seat, so it never
+    # makes a full event look full to someone else
+    if await repos.event_attendees.find_one({"event_id": event_id, "member_id": member.id}, fields("id")):
+        raise HTTPException(status_code=409, detail="You have already joined this event")
+    
+    event = await claim_event_seat(event_id, member)
+    if event is None:
+        # Only the failure path reads the event, to report why
+        existing_event = await repos.events.find_one({"id": event_id}, fields("tier_rank", "tier_required"))
+        if not existing_event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if "tier_rank" not in existing_event:
+            # Written before tier ranks; rank it and claim once more
+            ranked = with_tier_rank({"tier_required": MemberEvent.model_fields["tier_required"].default, **existing_event})
+            await repos.events.update_one({"id": event_id, "tier_rank": {"$exists": False}}, {"$set": {"tier_rank": ranked["tier_rank"]}})
+            existing_event = ranked
+            event = await claim_event_seat(event_id, member)
+    if event is None:
+        if existing_event["tier_rank"] > tier_rank(member.membership_tier):
+            raise HTTPException(status_code=403, detail="Insufficient membership tier")
         raise HTTPException(status_code=400, detail="Event is full")
     
-    # Add member to event attendees
-    await db.events.update_one(
-        {"id": event_id},
-        {"$inc": {"current_attendees": 1}}
-    )
+    # The unique (event_id, member_id) index still rejects a second join when
+    # two requests from the same member race past the check above; the loser
+    # gives its seat back. Registering after the claim means a crash in
+    # between leaks a seat rather than locking the member out with a stale
+    # registration.
+    try:
+        await repos.event_attendees.insert_one({
+            "id": str(uuid.uuid4()),
+            "event_id": event_id,
+            "member_id": member.id,
+            "wallet_address": member.wallet_address,
+            "joined_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        await repos.events.update_one({"id": event_id}, {"$inc": {"current_attendees": -1}})
+        raise HTTPException(status_code=409, detail="You have already joined this event")
+    catalog.invalidate("events")
     
-    return {"message": "Successfully joined event"}
+    return {
+        "message": "Successfully joined event",
+        "current_attendees": event["current_attendees"],
+        "max_attendees": event["max_attendees"]
+    }
 
 # Admin routes for seeding data
+# Sample data for /admin/seed-data. Documents are keyed by a hash of their
+# content, so an edit here replaces that document on the next seed.
+
+# Sample menu items - Bitcoin Ben's themed, priced in USD; the repricing
+# engine fills in the BCH and BBC prices
+SAMPLE_MENU = [
+    {
+        "name": "The Satoshi Stacker",
+        "description": "Triple-stacked wagyu beef with crypto-gold sauce and blockchain pickles",
+        "price": 28.00,  # USD
+        "member_price": 21.00,  # USD member price
+        "category": "main",
+        "image_url": "https://images.unsplash.com/photo-1616671285410-2a676a9a433d?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHw0fHxnb3VybWV0JTIwZm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
+        "is_available": True,
+        "tier_required": "basic"
+    },
+    {
+        "name": "The Hodl Burger",
+        "description": "Premium beef that gets better with time, served with diamond hands fries",
+        "price": 22.00,  # USD
+        "member_price": 18.00,  # USD member price
+        "category": "main",
+        "image_url": "https://images.unsplash.com/photo-1623073284788-0d846f75e329?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHwxfHxnb3VybWV0JTIwZm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
+        "is_available": True,
+        "tier_required": "basic"
+    },
+    {
+        "name": "The Bitcoin Mining Rig",
+        "description": "Ultimate burger stack for serious crypto miners - requires premium membership",
+        "price": 35.00,  # USD
+        "member_price": 28.00,  # USD member price
+        "category": "main",
+        "image_url": "https://images.unsplash.com/photo-1628838463043-b81a343794d6?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHwyfHxnb3VybWV0JTIwZm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
+        "is_available": True,
+        "tier_required": "premium"
+    },
+    {
+        "name": "Lightning Network Loaded Fries",
+        "description": "Crispy fries loaded with cheese, bacon, and instant satisfaction",
+        "price": 14.00,  # USD
+        "member_price": 11.00,  # USD member price
+        "category": "sides",
+        "image_url": "https://images.unsplash.com/photo-1573080496219-bb080dd4f877?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHwyMHx8Zm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
+        "is_available": True,
+        "tier_required": "basic"
+    }
+]
+
+# Sample locations
+SAMPLE_LOCATIONS = [
+    {
+        "name": "Downtown Business District",
+        "address": "123 Main St, Downtown",
+        "location": {"type": "Point", "coordinates": [-97.7431, 30.2672]},
+        "date": "2025-01-30",
+        "start_time": "11:00",
+        "end_time": "14:00",
+        "is_member_exclusive": False,
+        "tier_required": "basic"
+    },
+    {
+        "name": "VIP Members Only - Rooftop Event",
+        "address": "456 Elite Tower, Penthouse Level",
+        "location": {"type": "Point", "coordinates": [-97.7404, 30.2711]},
+        "date": "2025-02-01",
+        "start_time": "18:00",
+        "end_time": "22:00",
+        "is_member_exclusive": True,
+        "tier_required": "vip"
+    }
+]
+
+# Sample events
+SAMPLE_EVENTS = [
+    {
+        "title": "Chef's Table Experience",
+        "description": "Exclusive 5-course tasting menu with wine pairings",
+        "date": "2025-02-05",
+        "time": "19:00",
+        "location": "Private Kitchen Studio",
+        "tier_required": "premium",
+        "max_attendees": 12,
+        "current_attendees": 3
+    }
+]
+
+SAMPLE_DATA = {"menu_items": SAMPLE_MENU, "locations": SAMPLE_LOCATIONS, "events": SAMPLE_EVENTS}
+
+async def seed_catalog_collections() -> Dict[str, dict]:
+    """Seed SAMPLE_DATA, invalidating the collections it changed.
+
+    Idempotent: unchanged sample documents are left alone, so re-seeding
+    writes nothing and keeps ids stable.
+    """
+    seeded = {}
+    for collection, documents in SAMPLE_DATA.items():
+        seeded[collection] = await seed_collection(getattr(repos, collection), documents, catalog_document)
+    changed = [collection for collection, counts in seeded.items() if any(counts.values())]
+    if changed:
+        invalidation_bus.invalidate(changed)
+    return seeded
+
 @api_router.post("/admin/seed-data")
-async def seed_sample_data():
-    """Seed the database with sample data (for demo purposes)."""
-    
-    # Sample menu items - Bitcoin Ben's themed with multi-currency pricing
-    sample_menu = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "The Satoshi Stacker",
-            "description": "Triple-stacked wagyu beef with crypto-gold sauce and blockchain pickles",
-            "price": 28.00,  # USD
-            "member_price": 21.00,  # USD member price
-            "price_bch": 0.085,  # BCH price (~$28 at ~$330/BCH)
-            "member_price_bch": 0.064,  # BCH member price (~$21)
-            "price_bbc": 1140.0,  # BBC token price (assuming $0.0245/BBC)
-            "member_price_bbc": 857.0,  # BBC member price
-            "category": "main",
-            "image_url": "https://images.unsplash.com/photo-1616671285410-2a676a9a433d?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHw0fHxnb3VybWV0JTIwZm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
-            "is_available": True,
-            "tier_required": "basic"
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "The Hodl Burger",
-            "description": "Premium beef that gets better with time, served with diamond hands fries",
-            "price": 22.00,  # USD
-            "member_price": 18.00,  # USD member price
-            "price_bch": 0.067,  # BCH price (~$22)
-            "member_price_bch": 0.055,  # BCH member price (~$18)
-            "price_bbc": 898.0,  # BBC token price
-            "member_price_bbc": 735.0,  # BBC member price
-            "category": "main",
-            "image_url": "https://images.unsplash.com/photo-1623073284788-0d846f75e329?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHwxfHxnb3VybWV0JTIwZm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
-            "is_available": True,
-            "tier_required": "basic"
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "The Bitcoin Mining Rig",
-            "description": "Ultimate burger stack for serious crypto miners - requires premium membership",
-            "price": 35.00,  # USD
-            "member_price": 28.00,  # USD member price
-            "price_bch": 0.106,  # BCH price (~$35)
-            "member_price_bch": 0.085,  # BCH member price (~$28)
-            "price_bbc": 1429.0,  # BBC token price
-            "member_price_bbc": 1143.0,  # BBC member price
-            "category": "main",
-            "image_url": "https://images.unsplash.com/photo-1628838463043-b81a343794d6?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHwyfHxnb3VybWV0JTIwZm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
-            "is_available": True,
-            "tier_required": "premium"
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Lightning Network Loaded Fries",
-            "description": "Crispy fries loaded with cheese, bacon, and instant satisfaction",
-            "price": 14.00,  # USD
-            "member_price": 11.00,  # USD member price
-            "price_bch": 0.042,  # BCH price (~$14)
-            "member_price_bch": 0.033,  # BCH member price (~$11)
-            "price_bbc": 571.0,  # BBC token price
-            "member_price_bbc": 449.0,  # BBC member price
-            "category": "sides",
-            "image_url": "https://images.unsplash.com/photo-1573080496219-bb080dd4f877?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzd8MHwxfHNlYXJjaHwyMHx8Zm9vZHxlbnwwfHx8fDE3NTc0MzcyMDJ8MA&ixlib=rb-4.1.0&q=85",
-            "is_available": True,
-            "tier_required": "basic"
-        }
-    ]
-    
-    # Sample locations
-    sample_locations = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Downtown Business District",
-            "address": "123 Main St, Downtown",
-            "date": "2025-01-30",
-            "start_time": "11:00",
-            "end_time": "14:00",
-            "is_member_exclusive": False,
-            "tier_required": "basic"
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "VIP Members Only - Rooftop Event",
-            "address": "456 Elite Tower, Penthouse Level",
-            "date": "2025-02-01",
-            "start_time": "18:00",
-            "end_time": "22:00",
-            "is_member_exclusive": True,
-            "tier_required": "vip"
-        }
-    ]
-    
-    # Sample events
-    sample_events = [
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Chef's Table Experience",
-            "description": "Exclusive 5-course tasting menu with wine pairings",
-            "date": "2025-02-05",
-            "time": "19:00",
-            "location": "Private Kitchen Studio",
-            "tier_required": "premium",
-            "max_attendees": 12,
-            "current_attendees": 3
-        }
-    ]
-    
-    # Insert sample data
-    await db.menu_items.delete_many({})
-    await db.locations.delete_many({})
-    await db.events.delete_many({})
-    
-    await db.menu_items.insert_many(sample_menu)
-    await db.locations.insert_many(sample_locations)
-    await db.events.insert_many(sample_events)
-    
-    return {"message": "Sample data seeded successfully"}
+async def seed_sample_data(admin: dict = Depends(get_admin_user)):
+    """Seed the database with sample data (for demo purposes)"""
+    seeded = await seed_catalog_collections()
+    return {"message": "Sample data seeded successfully", "seeded": seeded}
+
+@api_router.post("/admin/menu/reprice")
+async def reprice_menu(admin: dict = Depends(get_admin_user)):
+    """Reprice the menu's BCH/BBC prices now, whatever the threshold"""
+    prices = await fetch_menu_prices()
+    changed = await repricing.reprice(prices)
+    return {"success": True, "prices": prices, "items_changed": changed}
 
 # GET endpoint for generating cashstamp
 @api_router.get("/admin/generate-cashstamp/{member_id}")
@@ -1737,7 +2340,7 @@ async def generate_cashstamp(member_id: str, admin_wallet: str = Header(...)):
             raise HTTPException(status_code=403, detail="Admin access required")
         
         # Find member
-        member = await db.members.find_one({"id": member_id})
+        member = await repos.members.find_one({"id": member_id}, MEMBER_CASHSTAMP_FIELDS)
         if not member:
             raise HTTPException(status_code=404, detail="Member not found")
         
@@ -1772,7 +2375,7 @@ async def login_member(request: MemberLoginRequest):
     """Authenticate member with email and password"""
     try:
         # Find member by email
-        member = await db.members.find_one({"email": request.email})
+        member = await repos.members.find_one({"email": request.email}, MEMBER_LOGIN_FIELDS)
         if not member:
             raise HTTPException(status_code=404, detail="Member not found. Please check your email or sign up for a new account.")
         
@@ -1793,9 +2396,9 @@ async def login_member(request: MemberLoginRequest):
         access_token = jwt.encode(token_data, JWT_SECRET_KEY, algorithm="HS256")
         
         # Update last login
-        await db.members.update_one(
+        await repos.members.update_one(
             {"id": member["id"]},
-            {"$set": {"last_login": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"last_login": datetime.now(timezone.utc)}}
         )
         
         return {
@@ -1863,7 +2466,7 @@ async def register_member(request: MemberRegistrationRequest):
     """Register a new member with PMA agreement"""
     try:
         # Check if member already exists
-        existing_member = await db.members.find_one({"email": request.email})
+        existing_member = await repos.members.find_one({"email": request.email}, EXISTS_FIELDS)
         if existing_member:
             raise HTTPException(status_code=409, detail="Member with this email already exists")
         
@@ -1889,28 +2492,27 @@ async def register_member(request: MemberRegistrationRequest):
             "referral_code": referral_code,
             "referred_by": request.referral_code or "",
             "wallet_address": "",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_login": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc),
+            "last_login": datetime.now(timezone.utc)
         }
         
         # Insert member
-        await db.members.insert_one(member_data)
+        await repos.members.insert_one(member_data)
         
         # Process referral if provided
         if request.referral_code:
             try:
-                referrer = await db.members.find_one({"referral_code": request.referral_code})
+                referrer = await repos.members.find_one({"referral_code": request.referral_code}, MEMBER_REFERRER_FIELDS)
                 if referrer:
-                    # Record referral
-                    referral_record = {
-                        "id": str(uuid.uuid4()),
-                        "referrer_id": referrer["id"],
-                        "referred_id": member_id,
-                        "commission_amount_usd": AFFILIATE_COMMISSION_USD,
-                        "status": "pending",
-                        "created_at": datetime.now(timezone.utc).isoformat()
-                    }
-                    await db.referrals.insert_one(referral_record)
+                    # Commission is earned once the referred member pays their dues
+                    await record_referral_entry(ReferralLedgerEntry(
+                        entry_type="referral",
+                        affiliate_id=referrer["id"],
+                        affiliate_email=referrer["email"],
+                        referral_code=request.referral_code,
+                        referred_member_id=member_id,
+                        referred_email=request.email
+                    ))
             except Exception as e:
                 print(f"Referral processing error: {e}")
         
@@ -1980,14 +2582,14 @@ async def process_bbc_staking_payment(request: BBCStakingPaymentRequest):
             "bbc_tokens_staked": request.bbc_tokens_staked,
             "payment_method": "bbc_staking",
             "status": "verified",  # Auto-verify for now
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "verified_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": datetime.now(timezone.utc),
+            "verified_at": datetime.now(timezone.utc),
             "equivalent_usd_value": MEMBERSHIP_FEE_USD,
             "membership_type": "staking_member"
         }
         
-        # Store in payment tracking (use existing payment_requests_db for now)
-        payment_requests_db[staking_payment_id] = staking_record
+        # Store in payment tracking
+        await repos.payments.insert_one(staking_record)
         
         return {
             "success": True,
@@ -2020,15 +2622,29 @@ async def process_bbc_staking_payment(request: BBCStakingPaymentRequest):
 # ADMIN PAYMENT MANAGEMENT ENDPOINTS  
 # =======================
 
+PENDING_MEMBER_SORT = [("created_at", -1), ("id", -1)]
+PENDING_MEMBER_MATCH = {"payment_pending": True, "account_status": "pending_payment"}
+
 @api_router.get("/admin/pending-members")
-async def get_pending_members(admin: dict = Depends(get_admin_user)):
-    """Get all members with pending payments"""
+async def get_pending_members(
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    admin: dict = Depends(get_admin_user)
+):
+    """Get members with pending payments, newest first"""
+    limit = clamp_limit(limit)
+    try:
+        page_filter = {**PENDING_MEMBER_MATCH, **keyset_filter(PENDING_MEMBER_SORT, cursor)}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Find members with pending payments
-        pending_members = await db.members.find({
-            "payment_pending": True,
-            "account_status": "pending_payment"
-        }).to_list(length=None)
+        pending_members = await repos.members.find(
+            page_filter, MEMBER_PENDING_FIELDS
+        ).sort(PENDING_MEMBER_SORT).limit(limit + 1).to_list(length=None)
+        cursor_after = next_cursor(pending_members, PENDING_MEMBER_SORT, limit)
+        total_pending = await repos.members.count_documents(PENDING_MEMBER_MATCH)
         
         # Format for admin display
         pending_list = []
@@ -2047,8 +2663,9 @@ async def get_pending_members(admin: dict = Depends(get_admin_user)):
         return {
             "success": True,
             "pending_members": pending_list,
-            "total_pending": len(pending_list),
-            "membership_fee": MEMBERSHIP_FEE_USD
+            "total_pending": total_pending,
+            "membership_fee": MEMBERSHIP_FEE_USD,
+            "next_cursor": cursor_after
         }
         
     except Exception as e:
@@ -2064,12 +2681,12 @@ async def activate_member_payment(
     """Activate a member's account after payment verification"""
     try:
         # Find the pending member
-        member = await db.members.find_one({"id": member_id, "payment_pending": True})
+        member = await repos.members.find_one({"id": member_id, "payment_pending": True}, MEMBER_ACTIVATION_FIELDS)
         if not member:
             raise HTTPException(status_code=404, detail="Pending member not found")
         
         # Update member to active status
-        update_result = await db.members.update_one(
+        update_result = await repos.members.update_one(
             {"id": member_id},
             {
                 "$set": {
@@ -2077,7 +2694,7 @@ async def activate_member_payment(
                     "payment_pending": False,
                     "account_status": "active",
                     "is_member": True,
-                    "payment_verified_at": datetime.now(timezone.utc).isoformat(),
+                    "payment_verified_at": datetime.now(timezone.utc),
                     "payment_verified_by": admin["email"],
                     "transaction_id": transaction_id,
                     "payment_method": payment_method,
@@ -2100,7 +2717,7 @@ async def activate_member_payment(
         # Handle affiliate commission if referred
         referral_info = None
         if member.get("referred_by"):
-            referral_info = await process_affiliate_commission(member["id"], member["referred_by"])
+            referral_info = await process_affiliate_commission(member["id"], member["referred_by"], member.get("email", ""))
         
         return {
             "success": True,
@@ -2126,29 +2743,29 @@ async def activate_member_payment(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to activate member: {str(e)}")
 
-async def process_affiliate_commission(member_id: str, referral_code: str):
+async def process_affiliate_commission(member_id: str, referral_code: str, member_email: str = ""):
     """Process affiliate commission for referral"""
     try:
         # Find referring member
-        referring_member = await db.members.find_one({"referral_code": referral_code})
+        referring_member = await repos.members.find_one({"referral_code": referral_code}, MEMBER_REFERRER_FIELDS)
         if not referring_member:
             return {"error": "Referring member not found"}
         
         # Record affiliate commission
-        commission = {
-            "id": str(uuid.uuid4()),
-            "affiliate_id": referring_member["id"],
-            "affiliate_email": referring_member["email"],
-            "referred_member_id": member_id,
-            "commission_amount": AFFILIATE_COMMISSION_USD,
-            "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        
-        await db.affiliate_commissions.insert_one(commission)
+        commission = ReferralLedgerEntry(
+            entry_type="commission",
+            affiliate_id=referring_member["id"],
+            affiliate_email=referring_member["email"],
+            referral_code=referral_code,
+            referred_member_id=member_id,
+            referred_email=member_email,
+            amount=AFFILIATE_COMMISSION_USD
+        )
+        if not await record_referral_entry(commission):
+            return {"error": "Commission already recorded for this member"}
         
         return {
-            "commission_id": commission["id"],
+            "commission_id": commission.id,
             "affiliate_email": referring_member["email"],
             "commission_amount": AFFILIATE_COMMISSION_USD,
             "status": "pending"
@@ -2195,7 +2812,7 @@ async def calculate_staking_rewards(request: StakeRewardsRequest):
         # Check if user is a club member (optional, works without login)
         is_member = False
         try:
-            member = await db.members.find_one({"wallet_address": request.wallet_address})
+            member = await repos.members.find_one({"wallet_address": request.wallet_address}, MEMBER_STATUS_FIELDS)
             is_member = member and member.get("dues_paid", False) and member.get("pma_agreed", False)
         except Exception:
             is_member = False
@@ -2268,7 +2885,7 @@ async def create_stake(request: StakeRequest, current_member: MemberProfile = De
         )
         
         # Store in database
-        await db.stake_accounts.insert_one(stake_account.dict())
+        await repos.stake_accounts.insert_one(stake_account.dict())
         
         return {
             "success": True,
@@ -2290,29 +2907,34 @@ async def create_stake(request: StakeRequest, current_member: MemberProfile = De
 async def get_my_stakes(current_member: MemberProfile = Depends(get_current_user)):
     """Get all stake accounts for the authenticated member"""
     try:
-        stakes = await db.stake_accounts.find(
-            {"member_wallet": current_member.wallet_address}
-        ).to_list(length=None)
-        
-        total_staked = sum(stake["stake_amount_sol"] for stake in stakes)
-        active_stakes = [stake for stake in stakes if stake["status"] == "active"]
-        
+        stakes = await member_stake_accounts(current_member.wallet_address)
         return {
             "success": True,
             "stakes": stakes,
-            "summary": {
-                "total_accounts": len(stakes),
-                "active_accounts": len(active_stakes),
-                "total_staked_sol": total_staked,
-                "estimated_daily_rewards": await solana_staking_service.calculate_staking_rewards(
-                    total_staked, is_member=True, days_staked=1
-                ) if stakes else {"total_reward_sol": 0}
-            }
+            "summary": await stake_summary(stakes)
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch stakes: {str(e)}")
 
+async def member_stake_accounts(wallet_address: str) -> List[dict]:
+    return await repos.stake_accounts.find(
+        {"member_wallet": wallet_address},
+        STAKE_ACCOUNT_FIELDS
+    ).to_list(length=None)
+
+async def stake_summary(stakes: List[dict]) -> Dict[str, Any]:
+    total_staked = sum(stake["stake_amount_sol"] for stake in stakes)
+    active_stakes = [stake for stake in stakes if stake["status"] == "active"]
+    return {
+        "total_accounts": len(stakes),
+        "active_accounts": len(active_stakes),
+        "total_staked_sol": total_staked,
+        "estimated_daily_rewards": await solana_staking_service.calculate_staking_rewards(
+            total_staked, is_member=True, days_staked=1
+        ) if stakes else {"total_reward_sol": 0}
+    }
+
 # Get specific stake account info
 @api_router.get("/staking/account/{stake_account_pubkey}")
 async def get_stake_account_info(
@@ -2326,10 +2948,10 @@ async def get_stake_account_info(
             raise HTTPException(status_code=400, detail="Invalid stake account address")
         
         # Find stake account in database
-        stake_account = await db.stake_accounts.find_one({
+        stake_account = await repos.stake_accounts.find_one({
             "stake_account_pubkey": stake_account_pubkey,
             "member_wallet": current_member.wallet_address
-        })
+        }, STAKE_ACCOUNT_FIELDS)
         
         if not stake_account:
             raise HTTPException(status_code=404, detail="Stake account not found or not owned by you")
@@ -2340,8 +2962,7 @@ async def get_stake_account_info(
         # Calculate accumulated rewards
         days_since_activation = 0
         if stake_account.get("activated_at"):
-            activated_time = datetime.fromisoformat(stake_account["activated_at"].replace("Z", "+00:00"))
-            days_since_activation = (datetime.now(timezone.utc) - activated_time).days
+            days_since_activation = (datetime.now(timezone.utc) - stake_account["activated_at"]).days
         
         rewards = await solana_staking_service.calculate_staking_rewards(
             stake_account["stake_amount_sol"],
@@ -2373,10 +2994,10 @@ async def unstake_tokens(request: UnstakeRequest, current_member: MemberProfile
             raise HTTPException(status_code=400, detail="Invalid wallet address")
         
         # Verify ownership
-        stake_account = await db.stake_accounts.find_one({
+        stake_account = await repos.stake_accounts.find_one({
             "stake_account_pubkey": request.stake_account_pubkey,
             "member_wallet": current_member.wallet_address
-        })
+        }, fields("status"))
         
         if not stake_account:
             raise HTTPException(status_code=404, detail="Stake account not found or not owned by you")
@@ -2394,12 +3015,12 @@ async def unstake_tokens(request: UnstakeRequest, current_member: MemberProfile
             raise HTTPException(status_code=500, detail=instructions.get("error", "Failed to create unstake instructions"))
         
         # Update status to deactivating
-        await db.stake_accounts.update_one(
+        await repos.stake_accounts.update_one(
             {"stake_account_pubkey": request.stake_account_pubkey},
             {
                 "$set": {
                     "status": "deactivating",
-                    "deactivated_at": datetime.now(timezone.utc).isoformat()
+                    "deactivated_at": datetime.now(timezone.utc)
                 }
             }
         )
@@ -2418,23 +3039,42 @@ async def unstake_tokens(request: UnstakeRequest, current_member: MemberProfile
 @api_router.get("/staking/rewards/{stake_account_pubkey}")
 async def get_stake_rewards(
     stake_account_pubkey: str,
+    since: Optional[datetime] = None,
+    include_archived: bool = False,
     current_member: MemberProfile = Depends(get_current_user)
 ):
-    """Get reward history for a specific stake account"""
+    """Get reward history for a specific stake account, optionally only rewards after since.
+
+    Rewards past the archive retention window are only read when include_archived is set.
+    """
     try:
         # Verify ownership
-        stake_account = await db.stake_accounts.find_one({
+        stake_account = await repos.stake_accounts.find_one({
             "stake_account_pubkey": stake_account_pubkey,
             "member_wallet": current_member.wallet_address
-        })
+        }, fields("id"))
         
         if not stake_account:
             raise HTTPException(status_code=404, detail="Stake account not found")
         
-        # Get reward history
-        rewards = await db.stake_rewards.find(
-            {"stake_account_id": stake_account["id"]}
-        ).sort("epoch", -1).to_list(length=50)  # Last 50 epochs
+        # Get reward history - one bucket range scan on the time-series collection
+        query = {"stake_account_id": stake_account["id"]}
+        if since:
+            query["calculated_at"] = {"$gt": since}
+        rewards = await repos.stake_rewards.find(
+            query,
+            STAKE_REWARD_FIELDS
+        ).sort("calculated_at", -1).to_list(length=50)  # Last 50 epochs
+        
+        if include_archived and len(rewards) < 50:
+            oldest = rewards[-1]["calculated_at"] if rewards else None
+            async for reward in iter_archived(
+                "stake_rewards", "calculated_at",
+                match={"stake_account_id": stake_account["id"]}, before=oldest, after=since
+            ):
+                rewards.append({field: reward.get(field) for field in StakeReward.model_fields})
+                if len(rewards) >= 50:
+                    break
         
         total_rewards = sum(reward["total_reward_sol"] for reward in rewards)
         member_bonus_total = sum(reward["member_bonus_sol"] for reward in rewards)
@@ -2464,7 +3104,7 @@ async def claim_stake_rewards(request: StakeRewardsRequest, current_member: Memb
         if request.stake_account_pubkey:
             query["stake_account_pubkey"] = request.stake_account_pubkey
         
-        stake_accounts = await db.stake_accounts.find(query).to_list(length=None)
+        stake_accounts = await repos.stake_accounts.find(query, fields("stake_amount_sol")).to_list(length=None)
         
         if not stake_accounts:
             raise HTTPException(status_code=404, detail="No stake accounts found")
@@ -2500,6 +3140,79 @@ async def claim_stake_rewards(request: StakeRewardsRequest, current_member: Memb
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reward claim failed: {str(e)}")
 
+# Staking overview computed server-side: stakes are grouped per wallet, each
+# wallet is looked up once in members, and a final $group folds everything into
+# a single document - the API process never holds the stake list in memory.
+CLUB_MEMBER_EXPR = {"$gt": [{"$size": "$club_member"}, 0]}
+
+STAKING_OVERVIEW_PIPELINE = [
+    {"$group": {
+        "_id": "$member_wallet",
+        "accounts": {"$sum": 1},
+        "active_accounts": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+        "sol_staked": {"$sum": "$stake_amount_sol"}
+    }},
+    {"$lookup": {
+        "from": "members",
+        "localField": "_id",
+        "foreignField": "wallet_address",
+        "pipeline": [
+            {"$match": {"dues_paid": True, "pma_agreed": True}},
+            {"$project": {"_id": 1}},
+            {"$limit": 1}
+        ],
+        "as": "club_member"
+    }},
+    {"$group": {
+        "_id": None,
+        "total_stake_accounts": {"$sum": "$accounts"},
+        "active_stake_accounts": {"$sum": "$active_accounts"},
+        "total_sol_staked": {"$sum": "$sol_staked"},
+        "member_accounts": {"$sum": {"$cond": [CLUB_MEMBER_EXPR, "$accounts", 0]}},
+        "member_sol_staked": {"$sum": {"$cond": [CLUB_MEMBER_EXPR, "$sol_staked", 0]}}
+    }},
+    {"$project": {
+        "_id": 0,
+        "total_stake_accounts": 1,
+        "active_stake_accounts": 1,
+        "total_sol_staked": 1,
+        "member_accounts": 1,
+        "non_member_accounts": {"$subtract": ["$total_stake_accounts", "$member_accounts"]},
+        "member_sol_staked": 1,
+        "non_member_sol_staked": {"$subtract": ["$total_sol_staked", "$member_sol_staked"]}
+    }}
+]
+
+EMPTY_STAKING_OVERVIEW = {
+    "total_stake_accounts": 0,
+    "active_stake_accounts": 0,
+    "total_sol_staked": 0,
+    "member_accounts": 0,
+    "non_member_accounts": 0,
+    "member_sol_staked": 0,
+    "non_member_sol_staked": 0
+}
+
+async def staking_overview_document() -> dict:
+    """STAKING_OVERVIEW_PIPELINE folded in Python, for backends without aggregation"""
+    overview = dict(EMPTY_STAKING_OVERVIEW)
+    per_wallet: Dict[str, List[float]] = {}
+    async for stake in repos.stake_accounts.find({}, fields("member_wallet", "status", "stake_amount_sol")):
+        accounts_and_sol = per_wallet.setdefault(stake["member_wallet"], [0, 0])
+        accounts_and_sol[0] += 1
+        accounts_and_sol[1] += stake.get("stake_amount_sol") or 0
+        overview["total_stake_accounts"] += 1
+        overview["active_stake_accounts"] += stake.get("status") == "active"
+        overview["total_sol_staked"] += stake.get("stake_amount_sol") or 0
+    
+    async for member in repos.members.find({"dues_paid": True, "pma_agreed": True}, fields("wallet_address")):
+        accounts, sol_staked = per_wallet.pop(member["wallet_address"], (0, 0))
+        overview["member_accounts"] += accounts
+        overview["member_sol_staked"] += sol_staked
+    overview["non_member_accounts"] = overview["total_stake_accounts"] - overview["member_accounts"]
+    overview["non_member_sol_staked"] = overview["total_sol_staked"] - overview["member_sol_staked"]
+    return overview
+
 # Admin: Get staking overview
 @api_router.get("/admin/staking/overview")
 async def get_staking_overview(admin_wallet: str = Header(...)):
@@ -2509,58 +3222,51 @@ async def get_staking_overview(admin_wallet: str = Header(...)):
         if admin_wallet != "admin-wallet-address":
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Get all stake accounts
-        all_stakes = await db.stake_accounts.find({}).to_list(length=None)
-        
-        # Calculate statistics
-        total_accounts = len(all_stakes)
-        active_accounts = len([s for s in all_stakes if s["status"] == "active"])
-        total_staked = sum(stake["stake_amount_sol"] for stake in all_stakes)
-        
-        # Member vs non-member breakdown
-        member_stakes = []
-        non_member_stakes = []
-        
-        for stake in all_stakes:
-            member = await db.members.find_one({"wallet_address": stake["member_wallet"]})
-            is_member = member and member.get("dues_paid", False) and member.get("pma_agreed", False)
-            
-            if is_member:
-                member_stakes.append(stake)
-            else:
-                non_member_stakes.append(stake)
+        if repos.backend == "sqlite":
+            overview = await staking_overview_document()
+        else:
+            results = await db.stake_accounts.aggregate(STAKING_OVERVIEW_PIPELINE, allowDiskUse=True).to_list(length=1)
+            overview = results[0] if results else EMPTY_STAKING_OVERVIEW
         
         return {
             "success": True,
-            "overview": {
-                "total_stake_accounts": total_accounts,
-                "active_stake_accounts": active_accounts,
-                "total_sol_staked": total_staked,
-                "member_accounts": len(member_stakes),
-                "non_member_accounts": len(non_member_stakes),
-                "member_sol_staked": sum(s["stake_amount_sol"] for s in member_stakes),
-                "non_member_sol_staked": sum(s["stake_amount_sol"] for s in non_member_stakes)
-            }
+            "overview": overview
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get staking overview: {str(e)}")
 
+STAKE_ACCOUNT_SORT = [("created_at", -1), ("id", -1)]
+
 # Admin: Get all stake accounts
 @api_router.get("/admin/staking/accounts")
-async def get_all_stake_accounts(admin_wallet: str = Header(...), skip: int = 0, limit: int = 100):
-    """Get all stake accounts with member information (admin only)"""
+async def get_all_stake_accounts(
+    admin_wallet: str = Header(...),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    members: BatchLoader = Depends(get_member_loader)
+):
+    """Get stake accounts with member information, newest first (admin only)"""
+    limit = clamp_limit(limit)
+    try:
+        page_filter = keyset_filter(STAKE_ACCOUNT_SORT, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         if admin_wallet != "admin-wallet-address":
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Get stake accounts with pagination
-        stakes = await db.stake_accounts.find({}).skip(skip).limit(limit).to_list(length=None)
+        # Keyset pagination - page N costs the same as page 1
+        stakes = await repos.stake_accounts.find(
+            page_filter, STAKE_ACCOUNT_FIELDS
+        ).sort(STAKE_ACCOUNT_SORT).limit(limit + 1).to_list(length=None)
+        cursor_after = next_cursor(stakes, STAKE_ACCOUNT_SORT, limit)
         
         # Enrich with member information
         enriched_stakes = []
-        for stake in stakes:
-            member = await db.members.find_one({"wallet_address": stake["member_wallet"]})
+        stake_members = await members.load_many([stake["member_wallet"] for stake in stakes])
+        for stake, member in zip(stakes, stake_members):
             stake_info = {
                 **stake,
                 "member_info": {
@@ -2574,10 +3280,10 @@ async def get_all_stake_accounts(admin_wallet: str = Header(...), skip: int = 0,
             "success": True,
             "stakes": enriched_stakes,
             "pagination": {
-                "skip": skip,
                 "limit": limit,
                 "count": len(enriched_stakes)
-            }
+            },
+            "next_cursor": cursor_after
         }
         
     except Exception as e:
@@ -2587,7 +3293,7 @@ async def get_all_stake_accounts(admin_wallet: str = Header(...), skip: int = 0,
 # REWARDS TREASURY MANAGEMENT
 # =======================
 
-@api_router.post("/admin/treasury/initialize")
+@api_router.post("/admin/treasury/initialize", dependencies=[Depends(require_mongo_backend)])
 async def initialize_treasury(request: dict, admin_wallet: str = Header(...)):
     """Initialize the rewards treasury with initial funding (Admin only)"""
     try:
@@ -2610,7 +3316,7 @@ async def initialize_treasury(request: dict, admin_wallet: str = Header(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Treasury initialization failed: {str(e)}")
 
-@api_router.post("/admin/treasury/fund")
+@api_router.post("/admin/treasury/fund", dependencies=[Depends(require_mongo_backend)])
 async def add_treasury_funding(request: dict, admin_wallet: str = Header(...)):
     """Add funding to the rewards treasury (Admin only)"""
     try:
@@ -2637,7 +3343,7 @@ async def add_treasury_funding(request: dict, admin_wallet: str = Header(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Treasury funding failed: {str(e)}")
 
-@api_router.get("/admin/treasury/status")
+@api_router.get("/admin/treasury/status", dependencies=[Depends(require_mongo_backend)])
 async def get_treasury_status(admin_wallet: str = Header(...)):
     """Get current treasury status and metrics (Admin only)"""
     try:
@@ -2657,7 +3363,7 @@ async def get_treasury_status(admin_wallet: str = Header(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Treasury status check failed: {str(e)}")
 
-@api_router.post("/admin/treasury/distribute-rewards")
+@api_router.post("/admin/treasury/distribute-rewards", dependencies=[Depends(require_mongo_backend)])
 async def distribute_rewards(admin_wallet: str = Header(...)):
     """Manually trigger reward distribution to all stakers (Admin only)"""
     try:
@@ -2703,7 +3409,7 @@ async def calculate_optimal_funding(projected_stakes: float = 10000000, time_hor
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Funding calculation failed: {str(e)}")
 
-@api_router.get("/treasury/public-stats")
+@api_router.get("/treasury/public-stats", dependencies=[Depends(require_mongo_backend)])
 async def get_public_treasury_stats():
     """Get public treasury statistics (no auth required)"""
     try:
@@ -2735,6 +3441,17 @@ async def get_public_treasury_stats():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Read-only routes that browsers and nginx may cache and revalidate with If-None-Match
+CACHEABLE_ROUTES = {
+    "/api/payments/methods": CachePolicy(max_age=300, stale_while_revalidate=3600),
+    "/api/pump/token-info": CachePolicy(max_age=3600, stale_while_revalidate=86400),
+    "/api/staking/info": CachePolicy(max_age=300, stale_while_revalidate=3600),
+    "/api/menu/public": CachePolicy(max_age=60, stale_while_revalidate=600),
+    "/api/locations/public": CachePolicy(max_age=60, stale_while_revalidate=600),
+}
+
+app.add_middleware(ConditionalGetMiddleware, policies=CACHEABLE_ROUTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -2748,8 +3465,72 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
+
+@app.on_event("startup")
+async def create_db_indexes():
+    """Apply the index registry so every route query is served by an index"""
+    from db_indexes import INDEXES, TIME_SERIES, TREASURY_INDEXES, TREASURY_TIME_SERIES, ensure_indexes, ensure_time_series
+    from rewards_treasury import RewardsTreasury
+
+    if repos.backend != "mongo":
+        # SQLite repositories build their indexes when they open
+        return
+    try:
+        treasury_db = RewardsTreasury(client).db
+        await ensure_time_series(db, TIME_SERIES)
+        await ensure_time_series(treasury_db, TREASURY_TIME_SERIES)
+        result = await ensure_indexes(db, INDEXES)
+        treasury_result = await ensure_indexes(treasury_db, TREASURY_INDEXES)
+        applied = len(result["applied"]) + len(treasury_result["applied"])
+        failed = result["failed"] + treasury_result["failed"]
+        logger.info(f"MongoDB indexes ensured: {applied} applied, {len(failed)} failed {failed if failed else ''}")
+    except Exception as e:
+        # Never block startup on index creation, queries still work without them
+        logger.error(f"Index bootstrap failed: {e}")
+
+@app.on_event("startup")
+async def backfill_tier_ranks():
+    """Rank catalog documents written before tier_rank existed, so tier filters match them"""
+    from migrations import TIER_DEFAULTS, set_tier_ranks
+
+    try:
+        updated = await set_tier_ranks({name: getattr(repos, name) for name in TIER_DEFAULTS})
+        changed = [name for name, count in updated.items() if count]
+        if changed:
+            invalidation_bus.invalidate(changed)
+            logger.info(f"Tier ranks backfilled: {updated}")
+    except Exception as e:
+        logger.error(f"Tier rank backfill failed: {e}")
+
+@app.on_event("startup")
+async def seed_catalog():
+    """Seed sample catalog data at startup, only when SEED_SAMPLE_DATA=true"""
+    if os.environ.get("SEED_SAMPLE_DATA", "false").lower() != "true":
+        return
+    try:
+        seeded = await seed_catalog_collections()
+        logger.info(f"Sample data seeded: {seeded}")
+    except Exception as e:
+        logger.error(f"Sample data seeding failed: {e}")
+
+@app.on_event("startup")
+async def start_menu_repricing():
+    """Keep menu crypto prices in line with live BCH/BBC prices"""
+    repricing.start()
+
+@app.on_event("startup")
+async def start_cache_invalidation():
+    """Watch cached collections so every worker drops stale entries on write"""
+    catalog.start()
+    if repos.backend == "sqlite":
+        # Single-process deployment - repository writes invalidate the caches directly
+        return
+    invalidation_bus.start(db)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await invalidation_bus.stop()
+    await catalog.stop()
+    await repricing.stop()
+    await repos.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,585 @@
+"""
+Repository layer between the API handlers and the database
+
+Handlers in server.py reach members, menu items, locations, events, orders,
+payments, stake accounts, the referral ledger and reward history through a Repositories object instead of Motor
+directly. Each repository speaks the subset of Motor's collection API the
+handlers use (find_one, find().sort().limit().to_list(), insert, update,
+delete, count, find_one_and_update, bulk_write) with the same filter, update and
+projection documents, so a query reads the same against either backend.
+
+Backends, selected with STORAGE_BACKEND:
+    mongo   (default) the Motor collections themselves, no extra layer
+    sqlite  one table per collection in SQLITE_PATH, documents stored as JSON
+            with expression indexes built from the db_indexes registry
+
+SQLite runs in WAL mode on a single worker thread, so queries never block the
+event loop and read-modify-write updates are serialized. It is meant for a
+single API process on small hardware. Aggregation reports are folded in
+Python on this backend; the treasury and archival stay on MongoDB and their
+routes answer 503 when STORAGE_BACKEND is sqlite.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", str(Path(__file__).parent / "burger_bus.sqlite3"))
+
+REPOSITORY_COLLECTIONS = (
+    "members",
+    "menu_items",
+    "locations",
+    "events",
+    "event_attendees",
+    "orders",
+    "payments",
+    "stake_accounts",
+    "referral_ledger",
+    "stake_rewards",
+)
+
+
+class Repository(Protocol):
+    """Collection operations available to handlers on every backend"""
+
+    async def find_one(self, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> Optional[dict]: ...
+
+    def find(self, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None): ...
+
+    async def insert_one(self, document: dict) -> InsertOneResult: ...
+
+    async def insert_many(self, documents: List[dict]) -> InsertManyResult: ...
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult: ...
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any]) -> UpdateResult: ...
+
+    async def delete_one(self, filter: Dict[str, Any]) -> DeleteResult: ...
+
+    async def delete_many(self, filter: Dict[str, Any]) -> DeleteResult: ...
+
+    async def count_documents(self, filter: Dict[str, Any]) -> int: ...
+
+    async def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], projection=None,
+                                  return_document: bool = ReturnDocument.BEFORE) -> Optional[dict]: ...
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult: ...
+
+
+class Repositories:
+    """The repositories handlers use, one attribute per collection"""
+
+    def __init__(self, backend: str, collections: Dict[str, Repository], close=None, on_write=None):
+        self.backend = backend
+        self._close = close
+        self._on_write = on_write
+        for name in REPOSITORY_COLLECTIONS:
+            setattr(self, name, collections[name])
+
+    def on_write(self, callback: Callable[[str], None]):
+        """Call callback(collection) after every write
+
+        Only needed where writes cannot be watched from the database, which
+        is the SQLite backend; MongoDB writes reach the invalidation bus.
+        """
+        if self._on_write is not None:
+            self._on_write(callback)
+
+    async def close(self):
+        if self._close is not None:
+            await self._close()
+
+
+def open_repositories(database, backend: Optional[str] = None, sqlite_path: Optional[str] = None) -> Repositories:
+    """Repositories for the configured backend; database is the Motor database"""
+    backend = backend or STORAGE_BACKEND
+    if backend == "mongo":
+        return Repositories("mongo", {name: database[name] for name in REPOSITORY_COLLECTIONS})
+    if backend == "sqlite":
+        from db_indexes import INDEXES
+
+        sqlite_db = SQLiteDatabase(sqlite_path or SQLITE_PATH)
+        collections = {name: SQLiteRepository(sqlite_db, name, INDEXES.get(name, [])) for name in REPOSITORY_COLLECTIONS}
+        return Repositories("sqlite", collections, close=sqlite_db.close, on_write=sqlite_db.write_listeners.append)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+# Document encoding
+# Datetimes are stored as tagged ISO strings in UTC, which compare and sort
+# chronologically inside SQLite and decode back to aware datetimes. They are
+# truncated to milliseconds like BSON dates, so pagination cursors round-trip.
+DATE_TAG = "$date:"
+FIELD_PATH = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+
+
+def _encode_datetime(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return DATE_TAG + f"{value:%Y-%m-%dT%H:%M:%S}.{value.microsecond // 1000:03d}+00:00"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not supported by the SQLite backend")
+
+
+def _decode(value):
+    if isinstance(value, str) and value.startswith(DATE_TAG):
+        return datetime.fromisoformat(value[len(DATE_TAG):])
+    if isinstance(value, dict):
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _dumps(document: dict) -> str:
+    return json.dumps({key: value for key, value in document.items() if key != "_id"}, default=_json_default)
+
+
+def _to_sql(value):
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+# Filters
+def _field(path: str) -> str:
+    if path == "_id":
+        return "_id"
+    if not FIELD_PATH.match(path):
+        raise ValueError(f"Unsupported field path: {path}")
+    return f"json_extract(doc, '$.{path}')"
+
+
+class _FilterCompiler:
+    """Translate a MongoDB filter into a SQL expression
+
+    Inline mode renders values as literals, for partial index definitions
+    which may not contain bound parameters.
+    """
+
+    COMPARISONS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+    def __init__(self, inline: bool = False):
+        self.inline = inline
+        self.params: List[Any] = []
+
+    def value(self, value) -> str:
+        value = _to_sql(value)
+        if isinstance(value, bool):
+            value = int(value)
+        if self.inline:
+            if value is None:
+                return "NULL"
+            if isinstance(value, str):
+                return "'" + value.replace("'", "''") + "'"
+            return repr(value)
+        self.params.append(value)
+        return "?"
+
+    def compile(self, filter: Dict[str, Any]) -> str:
+        clauses = [self._clause(key, value) for key, value in filter.items()]
+        return " AND ".join(f"({clause})" for clause in clauses) if clauses else "1"
+
+    def _clause(self, key: str, value) -> str:
+        if key in ("$or", "$and"):
+            joined = f" {key[1:].upper()} ".join(f"({self.compile(sub)})" for sub in value)
+            return joined or ("0" if key == "$or" else "1")
+        if key == "$expr":
+            return self._expression(value)
+        if key.startswith("$"):
+            raise ValueError(f"Unsupported query operator: {key}")
+        if isinstance(value, dict) and value and all(op.startswith("$") for op in value):
+            return " AND ".join(f"({self._operator(key, op, operand)})" for op, operand in value.items())
+        return self._operator(key, "$eq", value)
+
+    def _operator(self, path: str, op: str, operand) -> str:
+        column = _field(path)
+        if op == "$eq":
+            return f"{column} IS NULL" if operand is None else f"{column} = {self.value(operand)}"
+        if op == "$ne":
+            if operand is None:
+                return f"{column} IS NOT NULL"
+            # Like MongoDB, $ne also matches documents without the field
+            return f"{column} IS NULL OR {column} != {self.value(operand)}"
+        if op in self.COMPARISONS:
+            return f"{column} {self.COMPARISONS[op]} {self.value(operand)}"
+        if op in ("$in", "$nin"):
+            values = list(operand)
+            if not values:
+                return "0" if op == "$in" else "1"
+            listed = ", ".join(self.value(item) for item in values)
+            return f"{column} IN ({listed})" if op == "$in" else f"{column} IS NULL OR {column} NOT IN ({listed})"
+        if op == "$exists":
+            type_check = f"json_type(doc, '$.{path}')"
+            return f"{type_check} IS NOT NULL" if operand else f"{type_check} IS NULL"
+        if op == "$type" and operand == "string":
+            return f"json_type(doc, '$.{path}') = 'text'"
+        raise ValueError(f"Unsupported query operator: {op}")
+
+    def _expression(self, expression: Dict[str, Any]) -> str:
+        [(op, (left, right))] = expression.items()
+        if op not in self.COMPARISONS:
+            raise ValueError(f"Unsupported $expr operator: {op}")
+        return f"{self._operand(left)} {self.COMPARISONS[op]} {self._operand(right)}"
+
+    def _operand(self, operand) -> str:
+        if isinstance(operand, str) and operand.startswith("$"):
+            return _field(operand[1:])
+        return self.value(operand)
+
+
+# Projections and updates
+def _project(document: dict, projection: Optional[Dict[str, Any]]) -> dict:
+    if not projection:
+        return document
+    include_id = projection.get("_id", 1)
+    included = {key: spec for key, spec in projection.items() if key != "_id" and spec}
+    if not included:
+        excluded = {key for key, spec in projection.items() if not spec}
+        return {key: value for key, value in document.items() if key not in excluded}
+
+    projected = {"_id": document["_id"]} if include_id and "_id" in document else {}
+    for key, spec in included.items():
+        if isinstance(spec, dict):
+            projected[key] = _evaluate(document, spec)
+        elif key in document:
+            projected[key] = document[key]
+    return projected
+
+
+def _evaluate(document: dict, expression):
+    """The few aggregation expressions used in projections"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        [(op, argument)] = expression.items()
+        if op == "$size":
+            return len(_evaluate(document, argument))
+        if op == "$ifNull":
+            value, default = (_evaluate(document, item) for item in argument)
+            return default if value is None else value
+        raise ValueError(f"Unsupported projection expression: {op}")
+    return expression
+
+
+def _apply_update(document: dict, update: Dict[str, Any], inserting: bool = False) -> dict:
+    updated = dict(document)
+    for op, changes in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, value in changes.items():
+            *parents, leaf = path.split(".")
+            target = updated
+            for parent in parents:
+                target[parent] = dict(target.get(parent) or {})
+                target = target[parent]
+            if op in ("$set", "$setOnInsert"):
+                target[leaf] = value
+            elif op == "$inc":
+                target[leaf] = target.get(leaf, 0) + value
+            elif op == "$unset":
+                target.pop(leaf, None)
+            elif op == "$push":
+                target[leaf] = list(target.get(leaf) or []) + [value]
+            else:
+                raise ValueError(f"Unsupported update operator: {op}")
+    return updated
+
+
+def _upsert_document(filter: Dict[str, Any], update: Dict[str, Any]) -> dict:
+    seed = {key: value for key, value in filter.items() if not key.startswith("$") and not isinstance(value, dict)}
+    return _apply_update(seed, update, inserting=True)
+
+
+# SQLite backend
+class SQLiteDatabase:
+    """One SQLite connection, used only from its own worker thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._tables: set = set()
+        self.write_listeners: List[Callable[[str], None]] = []
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._conn = conn
+        return self._conn
+
+    def notify(self, collection: str):
+        for listener in self.write_listeners:
+            listener(collection)
+
+    async def run(self, fn, *args):
+        """Run fn(connection, *args) on the worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(self._connection(), *args))
+
+    def ensure_table(self, conn: sqlite3.Connection, name: str, indexes) -> None:
+        if name in self._tables:
+            return
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+        for index in indexes:
+            # Spatial and text indexes have no SQLite equivalent
+            if all(direction in (1, -1) for direction in index.document["key"].values()):
+                conn.execute(_index_sql(name, index.document))
+        self._tables.add(name)
+
+    async def close(self):
+        def close_connection():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, close_connection)
+        self._executor.shutdown(wait=False)
+
+
+def _index_sql(table: str, spec: Dict[str, Any]) -> str:
+    """CREATE INDEX statement for a pymongo IndexModel document"""
+    columns = ", ".join(f"{_field(field)}{' DESC' if direction == -1 else ''}" for field, direction in spec["key"].items())
+    unique = "UNIQUE " if spec.get("unique") else ""
+    statement = f'CREATE {unique}INDEX IF NOT EXISTS "{spec["name"]}" ON "{table}" ({columns})'
+    if spec.get("partialFilterExpression"):
+        statement += f" WHERE {_FilterCompiler(inline=True).compile(spec['partialFilterExpression'])}"
+    return statement
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so read-modify-write holds the write lock
+
+    Nested transactions join the outer one, so a bulk write commits once.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.outermost = False
+
+    def __enter__(self):
+        self.outermost = not self.conn.in_transaction
+        if self.outermost:
+            self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outermost:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        if exc_type is sqlite3.IntegrityError:
+            raise DuplicateKeyError(str(exc)) from exc
+        return False
+
+
+class SQLiteCursor:
+    """find() result with Motor's sort/limit/to_list chain"""
+
+    def __init__(self, repository: "SQLiteRepository", filter: Dict[str, Any], projection):
+        self._repository = repository
+        self._filter = filter
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "SQLiteCursor":
+        self._sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, limit: int) -> "SQLiteCursor":
+        self._limit = limit
+        return self
+
+    def skip(self, skip: int) -> "SQLiteCursor":
+        self._skip = skip
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        limit = min(filter(None, (self._limit, length)), default=0)
+        documents = await self._repository._select(self._filter, self._sort, limit, self._skip)
+        return [_project(document, self._projection) for document in documents]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self.to_list():
+            yield document
+
+
+class SQLiteRepository:
+    """A collection stored as a SQLite table of JSON documents"""
+
+    def __init__(self, database: SQLiteDatabase, name: str, indexes=()):
+        self.database = database
+        self.name = name
+        self._indexes = list(indexes)
+
+    async def _call(self, fn, *args):
+        def with_table(conn, *args):
+            self.database.ensure_table(conn, self.name, self._indexes)
+            return fn(conn, *args)
+
+        return await self.database.run(with_table, *args)
+
+    # Reads
+    def _query(self, filter, sort=(), limit=0, skip=0) -> Tuple[str, List[Any]]:
+        compiler = _FilterCompiler()
+        sql = f'SELECT _id, doc FROM "{self.name}" WHERE {compiler.compile(filter)}'
+        if sort:
+            sql += " ORDER BY " + ", ".join(f"{_field(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in sort)
+        if limit or skip:
+            sql += f" LIMIT {int(limit) if limit else -1} OFFSET {int(skip)}"
+        return sql, compiler.params
+
+    @staticmethod
+    def _row(row) -> dict:
+        return {"_id": row[0], **_decode(json.loads(row[1]))}
+
+    def _select_sync(self, conn, filter, sort, limit, skip) -> List[dict]:
+        sql, params = self._query(filter, sort, limit, skip)
+        return [self._row(row) for row in conn.execute(sql, params)]
+
+    async def _select(self, filter, sort=(), limit=0, skip=0) -> List[dict]:
+        return await self._call(self._select_sync, filter, sort, limit, skip)
+
+    async def find_one(self, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+        documents = await self._select(filter, limit=1)
+        return _project(documents[0], projection) if documents else None
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> SQLiteCursor:
+        return SQLiteCursor(self, filter or {}, projection)
+
+    async def count_documents(self, filter: Dict[str, Any]) -> int:
+        def count(conn):
+            compiler = _FilterCompiler()
+            sql = f'SELECT COUNT(*) FROM "{self.name}" WHERE {compiler.compile(filter)}'
+            return conn.execute(sql, compiler.params).fetchone()[0]
+
+        return await self._call(count)
+
+    # Writes
+    async def _write(self, fn, *args):
+        result = await self._call(fn, *args)
+        self.database.notify(self.name)
+        return result
+
+    def _insert_sync(self, conn, documents: List[dict]) -> List[Any]:
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        with _Transaction(conn):
+            conn.executemany(
+                f'INSERT INTO "{self.name}" (_id, doc) VALUES (?, ?)',
+                [(str(document["_id"]), _dumps(document)) for document in documents],
+            )
+        return [document["_id"] for document in documents]
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        [inserted_id] = await self._write(self._insert_sync, [document])
+        return InsertOneResult(inserted_id, True)
+
+    async def insert_many(self, documents: List[dict]) -> InsertManyResult:
+        return InsertManyResult(await self._write(self._insert_sync, list(documents)), True)
+
+    def _update_sync(self, conn, filter, update, many: bool, upsert: bool):
+        with _Transaction(conn):
+            before = self._select_sync(conn, filter, (), 0 if many else 1, 0)
+            after = []
+            for document in before:
+                updated = _apply_update(document, update)
+                if updated != document:
+                    conn.execute(f'UPDATE "{self.name}" SET doc = ? WHERE _id = ?', (_dumps(updated), document["_id"]))
+                after.append(updated)
+            upserted_id = None
+            if not before and upsert:
+                document = _upsert_document(filter, update)
+                document.setdefault("_id", ObjectId())
+                conn.execute(f'INSERT INTO "{self.name}" (_id, doc) VALUES (?, ?)', (str(document["_id"]), _dumps(document)))
+                upserted_id = document["_id"]
+                after.append(document)
+        return before, after, upserted_id
+
+    def _update_result(self, before, after, upserted_id) -> UpdateResult:
+        raw = {"n": len(before) + (1 if upserted_id is not None else 0), "nModified": sum(a != b for a, b in zip(after, before))}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return self._update_result(*await self._write(self._update_sync, filter, update, False, upsert))
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return self._update_result(*await self._write(self._update_sync, filter, update, True, upsert))
+
+    async def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], projection=None,
+                                  return_document: bool = ReturnDocument.BEFORE, upsert: bool = False) -> Optional[dict]:
+        before, after, upserted_id = await self._write(self._update_sync, filter, update, False, upsert)
+        if return_document == ReturnDocument.AFTER:
+            return _project(after[0], projection) if after else None
+        return _project(before[0], projection) if before else None
+
+    def _delete_sync(self, conn, filter, many: bool) -> int:
+        compiler = _FilterCompiler()
+        where = compiler.compile(filter)
+        if not many:
+            where = f'_id IN (SELECT _id FROM "{self.name}" WHERE {where} LIMIT 1)'
+        with _Transaction(conn):
+            return conn.execute(f'DELETE FROM "{self.name}" WHERE {where}', compiler.params).rowcount
+
+    async def delete_one(self, filter: Dict[str, Any]) -> DeleteResult:
+        return DeleteResult({"n": await self._write(self._delete_sync, filter, False)}, True)
+
+    async def delete_many(self, filter: Dict[str, Any]) -> DeleteResult:
+        return DeleteResult({"n": await self._write(self._delete_sync, filter, True)}, True)
+
+    def _bulk_sync(self, conn, requests) -> Dict[str, Any]:
+        raw = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        with _Transaction(conn):
+            for index, request in enumerate(requests):
+                if isinstance(request, InsertOne):
+                    self._insert_sync(conn, [request._doc])
+                    raw["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    many = isinstance(request, UpdateMany)
+                    before, after, upserted_id = self._update_sync(conn, request._filter, request._doc, many, bool(request._upsert))
+                    raw["nMatched"] += len(before)
+                    raw["nModified"] += sum(a != b for a, b in zip(after, before))
+                    if upserted_id is not None:
+                        raw["nUpserted"] += 1
+                        raw["upserted"].append({"index": index, "_id": upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    raw["nRemoved"] += self._delete_sync(conn, request._filter, isinstance(request, DeleteMany))
+                else:
+                    raise ValueError(f"Unsupported bulk write request: {type(request).__name__}")
+        return raw
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        """Apply the requests in order in one transaction; all or nothing, whatever ordered says"""
+        raw = await self._call(self._bulk_sync, list(requests))
+        if raw["nInserted"] or raw["nUpserted"] or raw["nModified"] or raw["nRemoved"]:
+            self.database.notify(self.name)
+        return BulkWriteResult(raw, True)
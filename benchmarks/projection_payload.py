@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Projection payload benchmark for the admin list endpoints
+
+Seeds a scratch database with members and stake accounts shaped like the ones
+server.py writes, then compares wire bytes and fetch time of the full
+documents against the per-route projections.
+
+Usage: MONGO_URL=mongodb://localhost:27017 python benchmarks/projection_payload.py [members]
+"""
+
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import bson
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import MEMBER_PENDING_FIELDS, MEMBER_STATUS_FIELDS, STAKE_ACCOUNT_FIELDS  # noqa: E402
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+def seed(db, count: int):
+    now = datetime.now(timezone.utc)
+    members = []
+    stakes = []
+    for i in range(count):
+        wallet = f"wallet_{i:08d}"
+        members.append({
+            "id": str(uuid.uuid4()),
+            "name": f"Member {i}",
+            "email": f"member{i}@example.com",
+            "password": "x" * 24,
+            "phone": "555-0100",
+            "address": "123 Main St",
+            "city": "Springfield",
+            "state": "IL",
+            "zip_code": "62701",
+            "pma_agreed": True,
+            "dues_paid": False,
+            "payment_pending": True,
+            "account_status": "pending_payment",
+            "referral_code": f"BITCOINBEN-{i:08X}",
+            "referred_by": "",
+            "wallet_address": wallet,
+            "favorite_items": ["The Hodl Burger", "Lightning Network Loaded Fries"],
+            "created_at": now,
+            "last_login": now,
+        })
+        stakes.append({
+            "id": str(uuid.uuid4()),
+            "member_wallet": wallet,
+            "stake_account_pubkey": uuid.uuid4().hex,
+            "validator_vote_account": "7K8DVxtNJGnMtUY1CQJT5jcs8sFGSZTDiG7kowvFpECh",
+            "stake_amount_sol": 2.5,
+            "stake_amount_lamports": 2_500_000_000,
+            "status": "active",
+            "created_at": now,
+            "activated_at": now,
+            "deactivated_at": None,
+            "last_reward_calculation": None,
+            "total_rewards_earned": 0.0,
+            "member_bonus_earned": 0.0,
+        })
+    db.members.insert_many(members)
+    db.stake_accounts.insert_many(stakes)
+
+
+def measure(collection, query, projection=None):
+    start = time.perf_counter()
+    docs = list(collection.find(query, projection))
+    elapsed = time.perf_counter() - start
+    return sum(len(bson.encode(d)) for d in docs), elapsed
+
+
+def report(label, collection, query, projection):
+    full_bytes, full_time = measure(collection, query)
+    projected_bytes, projected_time = measure(collection, query, projection)
+    reduction = 100 * (1 - projected_bytes / full_bytes) if full_bytes else 0
+    print(f"{label}")
+    print(f"  full:      {full_bytes:>12,} bytes  {full_time * 1000:8.1f} ms")
+    print(f"  projected: {projected_bytes:>12,} bytes  {projected_time * 1000:8.1f} ms")
+    print(f"  payload reduction: {reduction:.1f}%")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    client = MongoClient(MONGO_URL)
+    db_name = f"bbc_bench_{uuid.uuid4().hex[:8]}"
+    db = client[db_name]
+    try:
+        print(f"🚀 Seeding {count:,} members and stake accounts into {db_name}")
+        seed(db, count)
+        report("/api/admin/pending-members", db.members,
+               {"payment_pending": True, "account_status": "pending_payment"}, MEMBER_PENDING_FIELDS)
+        report("/api/admin/staking/accounts (stakes)", db.stake_accounts, {}, STAKE_ACCOUNT_FIELDS)
+        report("/api/admin/staking/accounts (member enrichment)", db.members, {}, MEMBER_STATUS_FIELDS)
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
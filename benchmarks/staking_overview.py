@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Staking overview benchmark at 100k stake accounts
+
+Compares the old approach (load every stake into Python, look members up and
+sum in Python) with the server-side aggregation used by
+/api/admin/staking/overview. Reports wall time and peak Python heap for each.
+
+Usage: MONGO_URL=mongodb://localhost:27017 python benchmarks/staking_overview.py [stakes]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from db_indexes import INDEXES  # noqa: E402
+from server import STAKING_OVERVIEW_PIPELINE  # noqa: E402
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+def seed(db, stakes: int):
+    wallets = [f"wallet_{i:08d}" for i in range(max(1, stakes // 3))]
+    db.members.insert_many([
+        {
+            "id": str(uuid.uuid4()),
+            "wallet_address": wallet,
+            "email": f"{wallet}@example.com",
+            "referral_code": f"BITCOINBEN-{i:08X}",
+            "dues_paid": i % 2 == 0,
+            "pma_agreed": True,
+        }
+        for i, wallet in enumerate(wallets)
+    ])
+    batch = []
+    for i in range(stakes):
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "member_wallet": random.choice(wallets) if i % 10 else f"outsider_{i}",
+            "stake_account_pubkey": uuid.uuid4().hex,
+            "stake_amount_sol": round(random.uniform(1, 50), 3),
+            "status": random.choice(["active", "pending", "deactivating"]),
+        })
+        if len(batch) == 10000:
+            db.stake_accounts.insert_many(batch)
+            batch = []
+    if batch:
+        db.stake_accounts.insert_many(batch)
+    for collection_name in ("members", "stake_accounts"):
+        db[collection_name].create_indexes(INDEXES[collection_name])
+
+
+def python_overview(db):
+    stakes = list(db.stake_accounts.find({}, {"_id": 0, "member_wallet": 1, "status": 1, "stake_amount_sol": 1}))
+    wallets = list({s["member_wallet"] for s in stakes})
+    members = {}
+    for start in range(0, len(wallets), 1000):
+        for m in db.members.find({"wallet_address": {"$in": wallets[start:start + 1000]}},
+                                 {"_id": 0, "wallet_address": 1, "dues_paid": 1, "pma_agreed": 1}):
+            members[m["wallet_address"]] = m
+    member_stakes = [s for s in stakes
+                     if members.get(s["member_wallet"], {}).get("dues_paid") and members[s["member_wallet"]].get("pma_agreed")]
+    return {
+        "total_stake_accounts": len(stakes),
+        "active_stake_accounts": len([s for s in stakes if s["status"] == "active"]),
+        "total_sol_staked": sum(s["stake_amount_sol"] for s in stakes),
+        "member_accounts": len(member_stakes),
+        "member_sol_staked": sum(s["stake_amount_sol"] for s in member_stakes),
+    }
+
+
+def aggregation_overview(db):
+    return list(db.stake_accounts.aggregate(STAKING_OVERVIEW_PIPELINE, allowDiskUse=True))[0]
+
+
+def measure(label, fn, db):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(db)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {elapsed * 1000:10.1f} ms   peak heap {peak / 1024 / 1024:8.2f} MiB")
+    return result
+
+
+def main():
+    stakes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    client = MongoClient(MONGO_URL)
+    db_name = f"bbc_bench_{uuid.uuid4().hex[:8]}"
+    db = client[db_name]
+    try:
+        print(f"🚀 Seeding {stakes:,} stake accounts into {db_name}")
+        seed(db, stakes)
+        legacy = measure("python loop", python_overview, db)
+        aggregated = measure("aggregation", aggregation_overview, db)
+        for key in ("total_stake_accounts", "active_stake_accounts", "member_accounts"):
+            assert legacy[key] == aggregated[key], (key, legacy[key], aggregated[key])
+        print("✅ Results match")
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Reward distribution benchmark, float amounts vs Decimal128
+
+Seeds two scratch treasury databases with the same stakes: one with amounts
+stored as doubles and processed the old way (Decimal(str(float)) on every
+read, float(Decimal) on every write), one with Decimal128 amounts decoded by
+the treasury codec and updated with server-side $inc. Runs a distribution on
+each and reports wall time and the drift between the treasury balance and the
+sum of what was paid out.
+
+Usage: MONGO_URL=mongodb://localhost:27017 python benchmarks/treasury_distribution.py [stakes]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from bson.decimal128 import Decimal128
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from rewards_treasury import (  # noqa: E402
+    BASE_APY, COMPOUND_FREQUENCY, MEMBER_BONUS_APY, MIN_REWARD_CLAIM, RewardsTreasury, to_amount,
+)
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+FUNDING = Decimal("1000000000.123456789")
+
+
+def seed(db, stakes: int, as_decimal: bool):
+    now = datetime.now(timezone.utc)
+    amount = (lambda value: Decimal128(to_amount(value))) if as_decimal else float
+    rng = random.Random(42)
+    db.treasury.insert_one({
+        "treasury_id": "main_treasury",
+        "total_funded": amount(FUNDING),
+        "total_distributed": amount(0),
+        "available_balance": amount(FUNDING),
+    })
+    batch = []
+    for i in range(stakes):
+        batch.append({
+            "stake_id": f"stake_{i}",
+            "staker_wallet": f"wallet_{i}",
+            "amount_staked": amount(round(rng.uniform(1_000_000, 50_000_000), 9)),
+            "total_rewards_earned": amount(0),
+            "is_member": i % 2 == 0,
+            "status": "active",
+            "created_at": now - timedelta(days=rng.uniform(1, 30)),
+        })
+        if len(batch) == 10000:
+            db.stakes.insert_many(batch)
+            batch = []
+    if batch:
+        db.stakes.insert_many(batch)
+    db.stakes.create_index("stake_id", unique=True)
+
+
+async def legacy_distribution(db):
+    """The float round-trips the treasury used to make"""
+    now = datetime.now(timezone.utc)
+    stakes = await db.stakes.find({"status": "active"}).to_list(length=None)
+    treasury = await db.treasury.find_one({"treasury_id": "main_treasury"})
+    available_balance = Decimal(str(treasury["available_balance"]))
+    total_distributed = Decimal("0")
+    for stake in stakes:
+        days_elapsed = Decimal(str((now - stake["created_at"]).total_seconds() / 86400))
+        rate = BASE_APY + (MEMBER_BONUS_APY if stake["is_member"] else 0)
+        n = Decimal(str(COMPOUND_FREQUENCY))
+        principal = Decimal(str(stake["amount_staked"]))
+        reward = float(principal * (1 + rate / n) ** (n * (days_elapsed / Decimal("365"))) - principal)
+        reward_amount = Decimal(str(reward))
+        if reward_amount >= MIN_REWARD_CLAIM:
+            await db.stakes.update_one(
+                {"stake_id": stake["stake_id"]},
+                {"$inc": {"total_rewards_earned": float(reward_amount)}, "$set": {"last_reward_time": now}},
+            )
+            total_distributed += reward_amount
+    await db.treasury.update_one(
+        {"treasury_id": "main_treasury"},
+        {"$set": {
+            "available_balance": float(available_balance - total_distributed),
+            "total_distributed": treasury["total_distributed"] + float(total_distributed),
+        }},
+    )
+
+
+async def decimal_distribution(client, db_name):
+    result = await RewardsTreasury(client, db_name).distribute_rewards()
+    assert result["success"], result
+
+
+def drift(db) -> Decimal:
+    """Funded - distributed - available, as stored; zero when the ledger is exact"""
+    treasury = db.treasury.find_one({"treasury_id": "main_treasury"})
+    paid = sum((Decimal(str(s.get("total_rewards_earned", 0))) for s in db.stakes.find({}, {"total_rewards_earned": 1})), Decimal(0))
+    available = Decimal(str(treasury["available_balance"]))
+    return to_amount(FUNDING) - paid - available
+
+
+def main():
+    stakes = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    client = MongoClient(MONGO_URL, tz_aware=True)
+    float_db_name = f"bbc_bench_{uuid.uuid4().hex[:8]}"
+    decimal_db_name = f"bbc_bench_{uuid.uuid4().hex[:8]}"
+    try:
+        print(f"🚀 Seeding {stakes:,} stakes into {float_db_name} (double) and {decimal_db_name} (Decimal128)")
+        seed(client[float_db_name], stakes, as_decimal=False)
+        seed(client[decimal_db_name], stakes, as_decimal=True)
+
+        async def run():
+            motor = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+            try:
+                start = time.perf_counter()
+                await legacy_distribution(motor[float_db_name])
+                legacy = time.perf_counter() - start
+
+                start = time.perf_counter()
+                await decimal_distribution(motor, decimal_db_name)
+                return legacy, time.perf_counter() - start
+            finally:
+                motor.close()
+
+        legacy, decimal = asyncio.run(run())
+        print(f"{'float':<12} {legacy * 1000:10.1f} ms   drift {drift(client[float_db_name])}")
+        print(f"{'Decimal128':<12} {decimal * 1000:10.1f} ms   drift {drift(client[decimal_db_name])}")
+    finally:
+        client.drop_database(float_db_name)
+        client.drop_database(decimal_db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
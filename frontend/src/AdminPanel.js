@@ -16,20 +16,31 @@ const AdminPanel = ({ onLogout, adminUser }) => {
     return () => clearInterval(interval);
   }, []);
 
+  // Admin listings are keyset-paginated: follow next_cursor to the last page
+  const fetchAllPages = async (path, key, token) => {
+    const items = [];
+    let cursor = null;
+    do {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const page = await fetch(`${BACKEND_URL}${path}${query}`, {
+        headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' }
+      }).then(r => r.json());
+      items.push(...(page[key] || []));
+      cursor = page.next_cursor;
+    } while (cursor);
+    return items;
+  };
+
   const loadData = async () => {
     try {
       const token = localStorage.getItem('accessToken');
-      const [paymentsResponse, affiliatesResponse] = await Promise.all([
-        fetch(`${BACKEND_URL}/api/admin/pending-payments`, {
-          headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' }
-        }).then(r => r.json()),
-        fetch(`${BACKEND_URL}/api/admin/affiliate-payouts`, {
-          headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' }
-        }).then(r => r.json())
+      const [payments, payouts] = await Promise.all([
+        fetchAllPages('/api/admin/pending-payments', 'pending_payments', token),
+        fetchAllPages('/api/admin/affiliate-payouts', 'pending_payouts', token)
       ]);
       
-      setPendingPayments(paymentsResponse.pending_payments || []);
-      setAffiliatePayouts(affiliatesResponse.pending_payouts || []);
+      setPendingPayments(payments);
+      setAffiliatePayouts(payouts);
     } catch (error) {
       console.error('Failed to load admin data:', error);
     } finally {
@@ -524,6 +524,15 @@ const LandingPage = ({ onGetStarted, onMemberLogin }) => {
   );
 };
 
+// Member dashboard data: profile, menu, locations, events, orders and stakes
+const fetchMemberBootstrap = async (headers) => {
+  const response = await fetch(`${BACKEND_URL}/api/me/bootstrap`, { headers });
+  if (!response.ok) {
+    throw new Error(`Bootstrap failed with status ${response.status}`);
+  }
+  return response.json();
+};
+
 const MemberDashboard = ({ memberAddress }) => {
   const [memberData, setMemberData] = useState(null);
   const [menu, setMenu] = useState([]);
@@ -539,16 +548,6 @@ const MemberDashboard = ({ memberAddress }) => {
       try {
         setLoading(true);
         
-        // Seed sample data first
-        const token = localStorage.getItem('accessToken');
-        await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/admin/seed-data`, {
-          method: 'POST',
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json'
-          }
-        });
-        
         // Try to load member profile and dashboard data
         let profile;
         try {
@@ -558,21 +557,15 @@ const MemberDashboard = ({ memberAddress }) => {
             'Content-Type': 'application/json'
           };
           
-          profile = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/profile`, { headers }).then(r => r.json());
-          
-          // Load member data (using debug endpoints temporarily)
-          const [menuData, locationsData, eventsData, ordersData] = await Promise.all([
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/menu`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/locations`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/events`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/orders`, { headers }).then(r => r.json())
-          ]);
+          // Profile and dashboard data in one request
+          const bootstrap = await fetchMemberBootstrap(headers);
+          profile = bootstrap.profile;
 
           setMemberData(profile);
-          setMenu(menuData);
-          setLocations(locationsData);
-          setEvents(eventsData);
-          setOrders(ordersData);
+          setMenu(bootstrap.menu);
+          setLocations(bootstrap.locations);
+          setEvents(bootstrap.events);
+          setOrders(bootstrap.orders.orders);
         } catch (profileError) {
           console.error('Profile fetch error:', profileError);
           // If profile doesn't exist, show PMA page
@@ -651,7 +644,7 @@ const MemberDashboard = ({ memberAddress }) => {
         }
       });
       const ordersData = await ordersResponse.json();
-      setOrders(ordersData);
+      setOrders(ordersData.orders || []);
     } catch (error) {
       console.error('Order failed:', error);
       
@@ -686,19 +679,13 @@ const MemberDashboard = ({ memberAddress }) => {
             'Authorization': `Bearer ${token}`
           };
 
-          const [profile, menuData, locationsData, eventsData, ordersData] = await Promise.all([
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/profile`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/menu`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/locations`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/events`, { headers }).then(r => r.json()),
-            fetch(`${process.env.REACT_APP_BACKEND_URL}/api/debug/orders`, { headers }).then(r => r.json())
-          ]);
+          const bootstrap = await fetchMemberBootstrap(headers);
 
-          setMemberData(profile);
-          setMenu(menuData);
-          setLocations(locationsData);
-          setEvents(eventsData);
-          setOrders(ordersData);
+          setMemberData(bootstrap.profile);
+          setMenu(bootstrap.menu);
+          setLocations(bootstrap.locations);
+          setEvents(bootstrap.events);
+          setOrders(bootstrap.orders.orders);
         } catch (error) {
           console.error('Error loading member data:', error);
         }
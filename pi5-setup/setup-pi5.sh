@@ -223,6 +223,13 @@ configure_environment() {
 MONGO_URL="mongodb://bbcadmin:bbc-secure-$(date +%s)@localhost:27017/bitcoin_bens_club?authSource=admin"
 DB_NAME="bitcoin_bens_club"
 
+# MongoDB connection pool (sized for the Pi 5 memory budget)
+MONGO_MAX_POOL_SIZE=20
+MONGO_MIN_POOL_SIZE=0
+MONGO_MAX_IDLE_TIME_MS=300000
+MONGO_WAIT_QUEUE_TIMEOUT_MS=10000
+MONGO_SERVER_SELECTION_TIMEOUT_MS=5000
+
 # Server Configuration
 HOST=0.0.0.0
 PORT=8001
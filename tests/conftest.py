@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules (uvicorn server:app)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def mongo_client():
+    """Synchronous client for a real MongoDB, skipping the test if none is reachable"""
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"MongoDB not reachable at {MONGO_URL}")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def scratch_db_name(mongo_client):
+    """Throwaway database name, dropped after the test"""
+    name = f"bbc_test_{uuid.uuid4().hex[:8]}"
+    yield name
+    mongo_client.drop_database(name)
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def run_with_repositories(request, tmp_path):
+    """Run fn(repos) on a fresh store of the parametrized backend"""
+    backend = request.param
+    if backend == "mongo":
+        db_name = request.getfixturevalue("scratch_db_name")
+
+    def run(fn):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        from db_indexes import INDEXES, ensure_indexes
+        from storage import REPOSITORY_COLLECTIONS, open_repositories
+
+        async def main():
+            client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+            database = client[db_name] if backend == "mongo" else None
+            repos = open_repositories(database, backend=backend, sqlite_path=str(tmp_path / "parity.sqlite3"))
+            if backend == "mongo":
+                await ensure_indexes(database, {name: INDEXES[name] for name in REPOSITORY_COLLECTIONS if name in INDEXES})
+            try:
+                return await fn(repos)
+            finally:
+                await repos.close()
+                client.close()
+
+        return asyncio.run(main())
+
+    return run
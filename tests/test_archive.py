@@ -0,0 +1,94 @@
+"""
+Archival moves old records into compressed segments and the history reader
+finds them again, newest first, without touching unrelated segments.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import archive
+from tests.conftest import MONGO_URL
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def _rewards(count):
+    return [
+        {
+            "_id": f"reward-{i}",
+            "stake_account_id": "stake-1" if i % 2 else "stake-2",
+            "epoch": i,
+            "calculated_at": NOW - timedelta(days=count - i),
+        }
+        for i in range(count)
+    ]
+
+
+def _collect(**kwargs):
+    async def run():
+        return [document async for document in archive.iter_archived("stake_rewards", "calculated_at", **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_segments_are_read_newest_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path)
+    rewards = _rewards(30)
+    for start in range(0, 30, 10):
+        archive._write_segment("stake_rewards", rewards[start:start + 10], "calculated_at")
+
+    assert [s["count"] for s in archive.load_index("stake_rewards")] == [10, 10, 10]
+
+    epochs = [document["epoch"] for document in _collect(match={"stake_account_id": "stake-1"})]
+    assert epochs == list(range(29, 0, -2))
+
+    window = _collect(before=NOW - timedelta(days=5), after=NOW - timedelta(days=12))
+    assert [document["epoch"] for document in window] == list(range(24, 18, -1))
+    assert window[0]["calculated_at"].tzinfo is not None
+
+
+def test_keyed_reads_skip_segments_without_the_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path)
+    rewards = _rewards(30)
+    for reward in rewards[10:]:
+        reward["stake_account_id"] = "stake-2"
+    for start in range(0, 30, 10):
+        archive._write_segment("stake_rewards", rewards[start:start + 10], "calculated_at", "stake_account_id")
+
+    assert [s["keys"] for s in archive.load_index("stake_rewards")] == [["stake-1", "stake-2"], ["stake-2"], ["stake-2"]]
+
+    opened = []
+    read_segment = archive._read_segment
+    monkeypatch.setattr(archive, "_read_segment", lambda collection, name: opened.append(name) or read_segment(collection, name))
+    epochs = [document["epoch"] for document in _collect(match={"stake_account_id": "stake-1"})]
+
+    assert epochs == list(range(9, 0, -2))
+    assert opened == [archive.load_index("stake_rewards")[0]["file"]]
+
+
+def test_archive_collection_deletes_what_it_archived(mongo_client, scratch_db_name, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path)
+    monkeypatch.setattr(archive, "SEGMENT_SIZE", 7)
+    mongo_client[scratch_db_name].stake_rewards.insert_many(_rewards(30))
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+        try:
+            policy = archive.ArchivePolicy("stake_rewards", "calculated_at")
+            return await archive.archive_collection(client[scratch_db_name], policy, retention_days=10, now=NOW)
+        finally:
+            client.close()
+
+    result = asyncio.run(run())
+
+    assert result["archived"] == result["deleted"] == 20
+    assert mongo_client[scratch_db_name].stake_rewards.count_documents({}) == 10
+    assert [s["count"] for s in archive.load_index("stake_rewards")] == [7, 7, 6]
+    assert len(_collect()) == 20
+
+
+def test_referral_ledger_is_never_archived():
+    # Its dedupe_key index is what rejects replayed referrals and commissions
+    assert "referral_ledger" not in {policy.collection for policy in archive.ARCHIVE_POLICIES}
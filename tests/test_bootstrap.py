@@ -0,0 +1,83 @@
+"""
+The member dashboard bootstrap gathers profile, menu, orders and stakes in
+one response, rendered from the same catalog views as the single endpoints.
+"""
+
+import json
+from datetime import datetime, timezone
+
+NOW = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def test_member_bootstrap_through_repositories(run_with_repositories):
+    import server
+
+    async def scenario(repos):
+        original = server.repos
+        server.repos = repos
+        server.catalog.invalidate()
+        try:
+            await repos.menu_items.insert_many([
+                {"id": f"item-{tier}", "name": tier, "description": "", "price": 10.0, "member_price": 8.0,
+                 "category": "main", "image_url": "", "tier_required": tier, "tier_rank": rank}
+                for tier, rank in server.TIER_HIERARCHY.items()
+            ])
+            await repos.orders.insert_one({
+                "id": "order-1", "wallet_address": "wallet-1", "total_amount": 8.0, "total_cents": 800, "items": [{}],
+                "pickup_location": "Downtown", "pickup_time": "12:00", "status": "pending", "created_at": NOW,
+            })
+            member = server.MemberProfile(id="member-1", wallet_address="wallet-1", membership_tier="premium")
+            response = await server.get_member_bootstrap(member)
+            return json.loads(response.body)
+        finally:
+            server.repos = original
+            server.catalog.invalidate()
+
+    bootstrap = run_with_repositories(scenario)
+    server.MemberBootstrap(**bootstrap)
+    assert bootstrap["profile"]["id"] == "member-1"
+    assert [item["id"] for item in bootstrap["menu"]] == ["item-basic", "item-premium"]
+    assert [order["id"] for order in bootstrap["orders"]["orders"]] == ["order-1"]
+    assert bootstrap["stakes"]["total_accounts"] == 0
+
+
+def test_email_member_bootstrap_uses_stored_tier_and_skips_blank_wallet(run_with_repositories):
+    import server
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    async def scenario(repos):
+        original = server.repos
+        server.repos = repos
+        server.catalog.invalidate()
+        try:
+            await repos.menu_items.insert_many([
+                {"id": f"item-{tier}", "name": tier, "description": "", "price": 10.0, "member_price": 8.0,
+                 "category": "main", "image_url": "", "tier_required": tier, "tier_rank": rank}
+                for tier, rank in server.TIER_HIERARCHY.items()
+            ])
+            # Someone else's order, also stored without a wallet
+            await repos.orders.insert_one({
+                "id": "order-other", "wallet_address": "", "total_amount": 8.0, "total_cents": 800, "items": [{}],
+                "pickup_location": "Downtown", "pickup_time": "12:00", "status": "pending", "created_at": NOW,
+            })
+            await repos.members.insert_one({
+                "id": "member-2", "email": "vip@example.com", "name": "Vip", "wallet_address": "",
+                "membership_tier": "vip",
+            })
+            token = server.jwt.encode(
+                {"email": "vip@example.com", "member_id": "member-2"}, server.JWT_SECRET_KEY, algorithm="HS256"
+            )
+            member = await server.get_authenticated_member_jwt(
+                HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+            )
+            response = await server.get_member_bootstrap(member)
+            return json.loads(response.body)
+        finally:
+            server.repos = original
+            server.catalog.invalidate()
+
+    bootstrap = run_with_repositories(scenario)
+    assert bootstrap["profile"]["membership_tier"] == "vip"
+    assert [item["id"] for item in bootstrap["menu"]] == ["item-basic", "item-premium", "item-vip"]
+    assert bootstrap["orders"]["orders"] == []
+    assert bootstrap["stakes"]["total_accounts"] == 0
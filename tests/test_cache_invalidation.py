@@ -0,0 +1,214 @@
+"""
+Process caches must drop entries when the underlying collection is written,
+whether the write arrives through a change stream (replica set) or is found by
+polling (standalone mongod).
+
+Run against a local single-node replica set to cover change streams:
+    mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"
+"""
+
+import asyncio
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+
+import cache_invalidation
+from cache_invalidation import CollectionCache, Invalidation, InvalidationBus
+from tests.conftest import MONGO_URL
+
+
+def test_keyed_cache_drops_only_the_changed_document():
+    bus = InvalidationBus()
+    members = bus.register(CollectionCache("members", key_field="wallet_address"))
+
+    async def run():
+        await members.get("wallet-a", lambda: asyncio.sleep(0, {"name": "A"}))
+        await members.get("wallet-b", lambda: asyncio.sleep(0, {"name": "B"}))
+        bus.publish(Invalidation("members", "update", {"wallet_address": "wallet-a"}, updated_fields=["name"]))
+        bus.publish(Invalidation("menu_items", "update", {"wallet_address": "wallet-b"}))
+        return members.stats()
+
+    assert asyncio.run(run())["entries"] == 1
+
+    # A delete carries no document, so everything goes
+    bus.publish(Invalidation("members", "delete"))
+    assert members.stats()["entries"] == 0
+
+
+def test_keyed_cache_drops_the_old_key_when_the_key_changes():
+    bus = InvalidationBus()
+    members = bus.register(CollectionCache("members", key_field="wallet_address"))
+
+    async def fill():
+        for wallet in ("wallet-a", "wallet-b", "wallet-c"):
+            await members.get(wallet, lambda: asyncio.sleep(0, {"name": wallet}))
+
+    async def run():
+        await fill()
+        # With a pre-image both the old and the new key go
+        bus.publish(Invalidation("members", "update", {"wallet_address": "wallet-z"}, {"wallet_address": "wallet-a"}))
+        with_pre_image = members.stats()["entries"]
+
+        # Without one, an update that set the key field can't say which entry was stale
+        await fill()
+        bus.publish(Invalidation("members", "update", {"wallet_address": "wallet-z"}, updated_fields=["wallet_address"]))
+        return with_pre_image, members.stats()["entries"]
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = CollectionCache("menu_items")
+
+    async def run():
+        async def load():
+            cache.invalidate()
+            return ["stale"]
+
+        value = await cache.get("all", load)
+        return value, cache.stats()
+
+    value, stats = asyncio.run(run())
+    assert value == ["stale"]
+    assert stats["entries"] == 0
+
+
+class _FailingDatabase:
+    """Change streams fail with an unexpected error, then turn out to be unsupported; top counts writes"""
+
+    name = "burger_bus"
+
+    def __init__(self):
+        self.failures = [OperationFailure("not authorized", code=13), OperationFailure("no replica set", code=40573)]
+        self.writes = 0
+        self.client = self
+        self.admin = self
+
+    def watch(self, *args, **kwargs):
+        raise self.failures.pop(0)
+
+    async def server_info(self):
+        return {"versionArray": [7, 0, 2, 0]}
+
+    async def command(self, name):
+        return {"totals": {"burger_bus.menu_items": {"writeLock": {"time": 0, "count": self.writes}}}}
+
+
+def test_watcher_survives_unexpected_failures(monkeypatch):
+    monkeypatch.setattr(cache_invalidation, "RETRY_DELAY", 0.01)
+    bus = InvalidationBus(poll_interval=0.01)
+    menu = bus.register(CollectionCache("menu_items"))
+
+    async def run():
+        await menu.get("all", lambda: asyncio.sleep(0, ["cached"]))
+        bus.start(database)
+        for _ in range(100):
+            if bus.mode == "polling":
+                break
+            await asyncio.sleep(0.01)
+        running = not bus._task.done()
+        # The failure cleared the cache instead of leaving it stale
+        cleared = menu.stats()["entries"] == 0
+
+        await menu.get("all", lambda: asyncio.sleep(0, ["cached"]))
+        await asyncio.sleep(0.05)
+        unchanged = menu.stats()["entries"] == 1
+        database.writes += 1
+        await asyncio.sleep(0.05)
+        await bus.stop()
+        return running, cleared, unchanged, menu.stats()["entries"]
+
+    database = _FailingDatabase()
+    assert asyncio.run(run()) == (True, True, True, 0)
+    assert bus.mode == "polling"
+
+
+class _OldStandaloneDatabase:
+    """MongoDB 5.0 standalone whose user lacks clusterMonitor"""
+
+    name = "burger_bus"
+
+    def __init__(self):
+        self.watch_options = None
+        self.client = self
+        self.admin = self
+
+    def watch(self, pipeline, **options):
+        self.watch_options = options
+        raise OperationFailure("no replica set", code=40573)
+
+    async def server_info(self):
+        return {"versionArray": [5, 0, 24, 0]}
+
+    async def command(self, name):
+        raise OperationFailure("not authorized on admin to execute command { top: 1 }", code=13)
+
+
+def test_old_servers_watch_without_pre_images_and_unauthorized_polling_is_reported(caplog):
+    bus = InvalidationBus(poll_interval=0.01)
+    menu = bus.register(CollectionCache("menu_items"))
+    database = _OldStandaloneDatabase()
+
+    async def run():
+        bus.start(database)
+        await asyncio.sleep(0.05)
+        await menu.get("all", lambda: asyncio.sleep(0, ["cached"]))
+        await asyncio.sleep(0.05)
+        await bus.stop()
+
+    asyncio.run(run())
+    assert "full_document_before_change" not in database.watch_options
+    assert bus.mode == "polling"
+    # Every failed poll clears the cache, but the missing role is logged once
+    assert menu.stats()["entries"] == 0
+    assert len([r for r in caplog.records if "clusterMonitor" in r.getMessage()]) == 1
+
+
+def _watch_and_write(db_name, poll_interval=0.1):
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        database = client[db_name]
+        bus = InvalidationBus(poll_interval=poll_interval)
+        menu = bus.register(CollectionCache("menu_items"))
+        try:
+            await database.menu_items.insert_one({"id": "item-1", "name": "Satoshi Stacker"})
+            items = await menu.get("all", lambda: database.menu_items.find({}, {"_id": 0}).to_list(None))
+            assert len(items) == 1
+
+            bus.start(database)
+            while bus.mode is None:
+                await asyncio.sleep(0.05)
+            # Let the stream or first poll settle before writing
+            await asyncio.sleep(poll_interval * 2)
+
+            await database.menu_items.update_one({"id": "item-1"}, {"$set": {"name": "Bitcoin Classic"}})
+            for _ in range(100):
+                if menu.stats()["entries"] == 0:
+                    break
+                await asyncio.sleep(0.05)
+
+            items = await menu.get("all", lambda: database.menu_items.find({}, {"_id": 0}).to_list(None))
+            return bus.mode, items
+        finally:
+            await bus.stop()
+            client.close()
+
+    return asyncio.run(run())
+
+
+def test_writes_invalidate_cache(mongo_client, scratch_db_name):
+    mode, items = _watch_and_write(scratch_db_name)
+
+    expected_mode = "change_stream" if mongo_client.admin.command("hello").get("setName") else "polling"
+    assert mode == expected_mode
+    assert items == [{"id": "item-1", "name": "Bitcoin Classic"}]
+
+
+def test_change_stream_on_replica_set(mongo_client, scratch_db_name):
+    if not mongo_client.admin.command("hello").get("setName"):
+        pytest.skip("MongoDB is not a replica set")
+
+    mode, items = _watch_and_write(scratch_db_name, poll_interval=60)
+    assert mode == "change_stream"
+    assert items[0]["name"] == "Bitcoin Classic"
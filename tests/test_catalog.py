@@ -0,0 +1,96 @@
+"""
+Catalog views are rendered once per snapshot version and tier, and re-rendered
+only after the collections they read change.
+"""
+
+import asyncio
+import json
+
+from cache_invalidation import Invalidation, InvalidationBus
+from catalog import Catalog
+
+
+def _catalog(menu):
+    catalog = Catalog(refresh_interval=0)
+    loads = []
+
+    async def load_menu(tier):
+        loads.append(tier)
+        return [dict(item) for item in menu if tier is None or item["rank"] <= tier]
+
+    catalog.add_collection("menu_items", load_menu)
+    catalog.add_view("menu", ("menu_items",), lambda snapshots, tier: snapshots["menu_items"])
+    catalog.add_view("menu/all", ("menu_items",), lambda snapshots, tier: snapshots["menu_items"], tiered=False)
+    return catalog, loads
+
+
+def test_views_render_once_per_version_and_tier():
+    menu = [{"id": "a", "rank": 1}, {"id": "b", "rank": 3}]
+    catalog, loads = _catalog(menu)
+    bus = InvalidationBus()
+    catalog.attach(bus)
+
+    async def run():
+        basic = await catalog.render("menu", 1)
+        again = await catalog.render("menu", 1)
+        vip = await catalog.render("menu", 3)
+        bus.publish(Invalidation("menu_items", "update"))
+        menu.append({"id": "c", "rank": 1})
+        changed = await catalog.render("menu", 1)
+        return basic, again, vip, changed
+
+    basic, again, vip, changed = asyncio.run(run())
+    assert again is basic
+    assert json.loads(basic.body) == [{"id": "a", "rank": 1}]
+    assert len(json.loads(vip.body)) == 2
+    assert json.loads(changed.body) == [{"id": "a", "rank": 1}, {"id": "c", "rank": 1}]
+    assert changed.etag != basic.etag
+    assert loads == [1, 3, 1]
+    assert catalog.stats()["renders"] == 3
+
+
+def test_untiered_views_share_the_full_snapshot():
+    menu = [{"id": "a", "rank": 1}, {"id": "b", "rank": 3}]
+    catalog, loads = _catalog(menu)
+
+    async def run():
+        return [await catalog.render("menu/all", tier) for tier in (1, 3)]
+
+    basic, vip = asyncio.run(run())
+    assert json.loads(basic.body) == json.loads(vip.body) == menu
+    assert loads == [None]
+
+
+def test_refresh_bumps_version_only_on_change():
+    menu = [{"id": "a", "rank": 1}]
+    catalog, _ = _catalog(menu)
+
+    async def run():
+        first = await catalog.render("menu")
+        await catalog.refresh()
+        unchanged = await catalog.render("menu")
+        menu[0]["rank"] = 2
+        await catalog.refresh()
+        return first, unchanged, await catalog.render("menu")
+
+    first, unchanged, refreshed = asyncio.run(run())
+    assert unchanged is first
+    assert json.loads(refreshed.body) == [{"id": "a", "rank": 2}]
+
+
+def test_load_racing_an_invalidation_is_not_kept():
+    catalog = Catalog(refresh_interval=0)
+
+    async def load(tier):
+        catalog.invalidate("events")
+        return [{"id": "stale"}]
+
+    catalog.add_collection("events", load)
+
+    async def run():
+        documents = await catalog.snapshot("events")
+        return documents, catalog.stats()
+
+    documents, stats = asyncio.run(run())
+    assert documents == [{"id": "stale"}]
+    assert stats["snapshots"] == {}
@@ -0,0 +1,72 @@
+"""
+Cacheable routes carry an ETag and Cache-Control, and a matching
+If-None-Match gets an empty 304.
+"""
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
+
+from conditional import CachePolicy, ConditionalGetMiddleware, etag_matches
+
+app = FastAPI()
+
+
+@app.get("/info")
+async def info():
+    return {"apy": 7}
+
+
+@app.get("/tagged")
+async def tagged():
+    return Response(content=b"[]", media_type="application/json", headers={"ETag": '"catalog-v1"'})
+
+
+@app.get("/missing")
+async def missing():
+    raise HTTPException(status_code=404, detail="Not found")
+
+
+@app.get("/uncached")
+async def uncached():
+    return {"now": 1}
+
+
+app.add_middleware(ConditionalGetMiddleware, policies={
+    "/info": CachePolicy(max_age=300, stale_while_revalidate=3600),
+    "/tagged": CachePolicy(max_age=60),
+    "/missing": CachePolicy(max_age=60),
+})
+client = TestClient(app)
+
+
+def test_etag_and_304():
+    first = client.get("/info")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=300, stale-while-revalidate=3600"
+    etag = first.headers["etag"]
+
+    revalidated = client.get("/info", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    assert client.get("/info", headers={"If-None-Match": '"other"'}).json() == {"apy": 7}
+
+
+def test_route_etag_is_kept():
+    response = client.get("/tagged", headers={"If-None-Match": '"catalog-v1"'})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+
+def test_errors_and_unlisted_routes_pass_through():
+    missing = client.get("/missing")
+    assert missing.status_code == 404
+    assert "etag" not in missing.headers
+    assert "etag" not in client.get("/uncached").headers
+
+
+def test_etag_matches():
+    assert etag_matches("*", '"a"')
+    assert etag_matches('W/"a"', '"a"')
+    assert not etag_matches('"b"', '"a"')
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from db_metrics import MongoMetrics
+
+
+def _command(name, request_id, command, database="bitcoin_bens_burger_club", duration_micros=1500):
+    return SimpleNamespace(
+        command_name=name,
+        command=command,
+        database_name=database,
+        request_id=request_id,
+        connection_id=("localhost", 27017),
+        duration_micros=duration_micros,
+    )
+
+
+def test_pool_checkout_and_saturation():
+    metrics = MongoMetrics(max_pool_size=4)
+
+    metrics.connection_created(SimpleNamespace())
+    metrics.connection_check_out_started(SimpleNamespace())
+    metrics.connection_checked_out(SimpleNamespace())
+    metrics.connection_check_out_started(SimpleNamespace())
+    metrics.connection_check_out_failed(SimpleNamespace(reason="timeout"))
+
+    pool = metrics.snapshot()["pool"]
+    assert pool["in_use"] == 1
+    assert pool["waiting"] == 0
+    assert pool["saturation"] == 0.25
+
+    metrics.connection_checked_in(SimpleNamespace())
+    metrics.connection_closed(SimpleNamespace(reason="idle"))
+
+    snapshot = metrics.snapshot()
+    assert snapshot["pool"]["in_use"] == 0
+    assert snapshot["pool"]["peak_in_use"] == 1
+    assert snapshot["checkout"]["count"] == 1
+    assert snapshot["checkout"]["failures"] == {"timeout": 1}
+    assert snapshot["connections"] == {"created": 1, "closed": 1, "close_reasons": {"idle": 1}}
+
+
+def test_command_counts_per_collection():
+    metrics = MongoMetrics(max_pool_size=4)
+
+    metrics.started(_command("find", 1, {"find": "members", "filter": {}}))
+    assert metrics.snapshot()["commands"]["in_flight"] == 1
+    metrics.succeeded(_command("find", 1, {}))
+    metrics.started(_command("getMore", 2, {"getMore": 123, "collection": "members"}))
+    metrics.failed(_command("getMore", 2, {}))
+    metrics.started(_command("ping", 3, {"ping": 1}))
+
+    commands = metrics.snapshot()["commands"]
+    assert commands["in_flight"] == 0
+    assert commands["by_collection"] == {"bitcoin_bens_burger_club.members": {"find": 1, "getMore": 1}}
+    assert commands["by_name"]["find"]["count"] == 1
+    assert commands["by_name"]["getMore"]["failures"] == 1
+    assert "ping" not in commands["by_name"]
@@ -0,0 +1,165 @@
+"""
+Concurrent event joins against a real MongoDB: the capacity check and the
+attendee registry must hold under a burst of members racing for the last seats.
+The SQLite backend runs the same joins one at a time.
+"""
+
+import asyncio
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from tests.conftest import MONGO_URL
+
+
+def _run_joins(db_name, members, max_attendees=5):
+    import server
+    from storage import open_repositories
+    from db_indexes import INDEXES, ensure_indexes
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        original_db, original_repos = server.db, server.repos
+        server.db = client[db_name]
+        server.repos = open_repositories(server.db, backend="mongo")
+        try:
+            await ensure_indexes(server.db, {"event_attendees": INDEXES["event_attendees"]})
+            await server.db.events.insert_one({
+                "id": "event-1",
+                "title": "Chef's Table Experience",
+                "tier_required": "premium",
+                "tier_rank": 2,
+                "max_attendees": max_attendees,
+                "current_attendees": 0,
+            })
+
+            async def join(member):
+                try:
+                    await server.join_member_event("event-1", member)
+                    return 200
+                except HTTPException as e:
+                    return e.status_code
+
+            statuses = await asyncio.gather(*(join(member) for member in members))
+            event = await server.db.events.find_one({"id": "event-1"})
+            attendees = await server.db.event_attendees.count_documents({"event_id": "event-1"})
+            return statuses, event["current_attendees"], attendees
+        finally:
+            server.db, server.repos = original_db, original_repos
+            client.close()
+
+    return asyncio.run(run())
+
+
+def _member(index, tier="premium"):
+    from server import MemberProfile
+
+    return MemberProfile(id=f"member-{index}", wallet_address=f"wallet-{index}", membership_tier=tier)
+
+
+def test_burst_of_joins_never_oversubscribes(mongo_client, scratch_db_name):
+    statuses, current_attendees, attendees = _run_joins(scratch_db_name, [_member(i) for i in range(25)])
+
+    assert statuses.count(200) == 5
+    assert statuses.count(400) == 20
+    assert current_attendees == 5
+    assert attendees == 5
+
+
+def test_same_member_joins_once(mongo_client, scratch_db_name):
+    member = _member(1)
+    statuses, current_attendees, attendees = _run_joins(scratch_db_name, [member] * 4 + [_member(2, tier="basic")])
+
+    assert sorted(statuses) == [200, 403, 409, 409, 409]
+    assert current_attendees == 1
+    assert attendees == 1
+
+
+def test_rejoin_gives_the_seat_back_on_sqlite(tmp_path):
+    import server
+    from storage import open_repositories
+
+    async def run():
+        original_repos = server.repos
+        server.repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "joins.sqlite3"))
+        try:
+            await server.repos.events.insert_one({
+                "id": "event-1", "tier_required": "premium", "tier_rank": 2, "max_attendees": 2, "current_attendees": 0,
+            })
+            statuses = []
+            for member in (_member(1), _member(1), _member(2), _member(3)):
+                try:
+                    await server.join_member_event("event-1", member)
+                    statuses.append(200)
+                except HTTPException as e:
+                    statuses.append(e.status_code)
+            event = await server.repos.events.find_one({"id": "event-1"}, {"_id": 0})
+            return statuses, event["current_attendees"]
+        finally:
+            await server.repos.close()
+            server.repos = original_repos
+
+    statuses, current_attendees = asyncio.run(run())
+    assert statuses == [200, 409, 200, 400]
+    assert current_attendees == 2
+
+
+def test_repeat_join_never_holds_the_last_seat_on_sqlite(tmp_path):
+    import server
+    from storage import open_repositories
+
+    async def join(member):
+        try:
+            await server.join_member_event("event-1", member)
+            return 200
+        except HTTPException as e:
+            return e.status_code
+
+    async def run():
+        original_repos = server.repos
+        server.repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "last-seat.sqlite3"))
+        try:
+            await server.repos.events.insert_one({
+                "id": "event-1", "tier_required": "premium", "tier_rank": 2, "max_attendees": 2, "current_attendees": 0,
+            })
+            await join(_member(1))
+            return await asyncio.gather(join(_member(1)), join(_member(2)))
+        finally:
+            await server.repos.close()
+            server.repos = original_repos
+
+    assert asyncio.run(run()) == [409, 200]
+
+def test_unranked_events_are_ranked_on_sqlite(tmp_path):
+    import server
+    from migrations import TIER_DEFAULTS, set_tier_ranks
+    from storage import open_repositories
+
+    async def run():
+        original_repos = server.repos
+        server.repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "ranks.sqlite3"))
+        try:
+            # Written before tier ranks existed
+            await server.repos.events.insert_many([
+                {"id": "event-1", "tier_required": "premium", "max_attendees": 5, "current_attendees": 0},
+                {"id": "event-2", "tier_required": "vip", "max_attendees": 5, "current_attendees": 0},
+            ])
+            await server.join_member_event("event-1", _member(1))
+            try:
+                await server.join_member_event("event-2", _member(1))
+            except HTTPException as e:
+                denied = e.status_code
+            await server.repos.menu_items.insert_one({"id": "item-1", "tier_required": "vip"})
+            updated = await set_tier_ranks({name: getattr(server.repos, name) for name in TIER_DEFAULTS})
+            again = await set_tier_ranks({name: getattr(server.repos, name) for name in TIER_DEFAULTS})
+            item = await server.repos.menu_items.find_one({"id": "item-1"}, {"_id": 0})
+            return denied, updated, again, item["tier_rank"]
+        finally:
+            await server.repos.close()
+            server.repos = original_repos
+
+    denied, updated, again, item_rank = asyncio.run(run())
+    assert denied == 403
+    assert updated == {"menu_items": 1, "locations": 0, "events": 0}
+    assert again == {"menu_items": 0, "locations": 0, "events": 0}
+    assert item_rank == 3
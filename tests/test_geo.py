@@ -0,0 +1,29 @@
+"""
+Nearest stops come back in distance order with the date and tier filter
+applied, from $geoNear on MongoDB and from the distance sort on SQLite.
+"""
+
+
+def test_nearby_locations_sorted_by_distance(run_with_repositories):
+    from geo import find_nearby, geojson_point
+
+    stops = [
+        ("downtown", [-97.7431, 30.2672], "2025-02-01", 1),
+        ("campus", [-97.7394, 30.2849], "2025-02-01", 1),
+        ("rooftop", [-97.7404, 30.2711], "2025-02-01", 3),
+        ("yesterday", [-97.7430, 30.2670], "2025-01-01", 1),
+        ("dallas", [-96.7970, 32.7767], "2025-02-01", 1),
+    ]
+
+    async def scenario(repos):
+        await repos.locations.insert_many([
+            {"id": name, "location": geojson_point(*coordinates), "date": date, "tier_rank": rank, "is_member_exclusive": rank > 1}
+            for name, coordinates, date, rank in stops
+        ])
+        query = {"date": {"$gte": "2025-01-30"}, "$or": [{"is_member_exclusive": False}, {"tier_rank": {"$lte": 2}}]}
+        return await find_nearby(repos.locations, geojson_point(-97.7431, 30.2672), 10_000, query, {"_id": 0, "id": 1}, 10)
+
+    nearby = run_with_repositories(scenario)
+    assert [location["id"] for location in nearby] == ["downtown", "campus"]
+    assert nearby[0]["distance_m"] < 1
+    assert 1900 < nearby[1]["distance_m"] < 2100
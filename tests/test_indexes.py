@@ -0,0 +1,163 @@
+"""
+Every route query must be served by an index - explain() each one against a
+real MongoDB and fail on any COLLSCAN.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from tests.conftest import MONGO_URL
+from db_indexes import INDEXES, TIME_SERIES, TREASURY_INDEXES, TREASURY_TIME_SERIES, ensure_indexes, ensure_time_series
+
+# (collection, filter, sort) for every indexed lookup made by the API
+ROUTE_QUERIES = [
+    # get_or_create_member, update_member_wallet, calculate_staking_rewards
+    ("members", {"wallet_address": "bch_wallet"}, None),
+    # get_authenticated_member_jwt
+    ("members", {"email": "member@example.com", "id": "member-1"}, None),
+    # login_member, register_member, pay_affiliate_commission
+    ("members", {"email": "member@example.com"}, None),
+    # process_referral, process_affiliate_commission
+    ("members", {"referral_code": "BITCOINBEN-ABCD"}, None),
+    # generate_cashstamp, activate_member_payment
+    ("members", {"id": "member-1"}, None),
+    ("members", {"id": "member-1", "payment_pending": True}, None),
+    # get_pending_affiliate_payouts
+    ("members", {"unpaid_commissions": {"$gt": 0}, "email": {"$gt": "a@example.com"}}, [("email", 1)]),
+    # get_pending_members
+    ("members", {"payment_pending": True, "account_status": "pending_payment"}, [("created_at", -1), ("id", -1)]),
+    # get_my_stakes, claim_stake_rewards
+    ("stake_accounts", {"member_wallet": "sol_wallet"}, None),
+    # get_stake_account_info, unstake_tokens, get_stake_rewards
+    ("stake_accounts", {"stake_account_pubkey": "pubkey", "member_wallet": "sol_wallet"}, None),
+    ("stake_accounts", {"stake_account_pubkey": "pubkey"}, None),
+    # get_all_stake_accounts (page after a cursor)
+    ("stake_accounts", {"$or": [
+        {"created_at": {"$lt": "2025-01-02"}},
+        {"created_at": "2025-01-02", "id": {"$lt": "stake-9"}},
+    ]}, [("created_at", -1), ("id", -1)]),
+    # get_payment_status, admin_verify_payment, admin_send_cashstamp
+    ("payments", {"payment_id": "pma_venmo_1"}, None),
+    # get_pending_payments (expiry sweep, then the page)
+    ("payments", {"status": "pending", "expires_at": {"$lte": datetime(2025, 1, 2, tzinfo=timezone.utc)}}, None),
+    ("payments", {"status": "pending"}, [("created_at", -1), ("payment_id", -1)]),
+    # get_member_orders, get_member_order
+    ("orders", {"wallet_address": "bch_wallet"}, [("created_at", -1), ("id", -1)]),
+    ("orders", {"id": "order-1", "wallet_address": "bch_wallet"}, None),
+    # get_public_menu, get_member_menu (catalog snapshot per tier)
+    ("menu_items", {"tier_rank": {"$lte": 2}}, None),
+    # create_pre_order
+    ("menu_items", {"id": "item-1"}, None),
+    # get_public_locations
+    ("locations", {"is_member_exclusive": False}, None),
+    # get_member_locations
+    ("locations", {"$or": [{"is_member_exclusive": False}, {"tier_rank": {"$lte": 2}}]}, None),
+    # get_nearby_locations ($geoNear uses the same index as $nearSphere)
+    ("locations", {
+        "location": {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [-97.74, 30.27]}, "$maxDistance": 10000}},
+        "date": {"$gte": "2025-01-30"},
+        "$or": [{"is_member_exclusive": False}, {"tier_rank": {"$lte": 2}}],
+    }, None),
+    # get_schedule, get_today_schedule
+    ("locations", {
+        "starts_at": {"$gte": datetime(2025, 1, 30, tzinfo=timezone.utc), "$lt": datetime(2025, 2, 6, tzinfo=timezone.utc)},
+        "$or": [{"is_member_exclusive": False}, {"tier_rank": {"$lte": 2}}],
+    }, [("starts_at", 1)]),
+    ("events", {
+        "starts_at": {"$gte": datetime(2025, 1, 30, tzinfo=timezone.utc), "$lt": datetime(2025, 2, 6, tzinfo=timezone.utc)},
+        "tier_rank": {"$lte": 2},
+    }, [("starts_at", 1)]),
+    # get_member_events
+    ("events", {"tier_rank": {"$lte": 2}}, None),
+    # join_member_event
+    ("events", {"id": "event-1", "tier_rank": {"$lte": 2}}, None),
+    ("event_attendees", {"event_id": "event-1", "member_id": "member-1"}, None),
+    # get_pending_affiliate_payouts (ledger join), record_referral_entry
+    ("referral_ledger", {"affiliate_id": "member-1", "entry_type": "commission", "created_at": {"$gt": "2025-01-01"}}, None),
+    ("referral_ledger", {"dedupe_key": "commission:member-1:new@example.com"}, None),
+    # get_stake_rewards
+    ("stake_rewards", {"stake_account_id": "stake-1"}, [("calculated_at", -1)]),
+]
+
+TREASURY_QUERIES = [
+    ("treasury", {"treasury_id": "main_treasury"}, None),
+    ("stakes", {"status": "active"}, None),
+    ("stakes", {"stake_id": "stake-1"}, None),
+    ("reward_distributions", {"stake_id": {"$ne": None}}, [("distribution_time", -1)]),
+    ("reward_distributions", {"stake_id": "stake-1"}, [("distribution_time", -1)]),
+]
+
+
+def _stages(plan):
+    """Yield every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def _winning_plans(explain):
+    """Every winningPlan in an explain result (time-series finds explain as an aggregation)"""
+    if isinstance(explain, dict):
+        if "winningPlan" in explain:
+            yield explain["winningPlan"]
+        for value in explain.values():
+            yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+
+def _apply_registry(db_name, registry, time_series=None):
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        try:
+            if time_series:
+                await ensure_time_series(client[db_name], time_series)
+            return await ensure_indexes(client[db_name], registry)
+        finally:
+            client.close()
+
+    return asyncio.run(run())
+
+
+def _assert_indexed(database, queries):
+    # Explain on a missing collection yields EOF, so give each one a document
+    # (with the time fields time-series collections require)
+    now = datetime.now(timezone.utc)
+    for collection_name in {q[0] for q in queries}:
+        database[collection_name].insert_one({"placeholder": True, "calculated_at": now, "distribution_time": now})
+
+    for collection_name, query_filter, sort in queries:
+        cursor = database[collection_name].find(query_filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(_stages(list(_winning_plans(cursor.explain()))))
+        assert "COLLSCAN" not in stages, f"{collection_name} {query_filter} is a collection scan: {stages}"
+
+
+def test_registry_is_idempotent(mongo_client, scratch_db_name):
+    first = _apply_registry(scratch_db_name, INDEXES)
+    second = _apply_registry(scratch_db_name, INDEXES)
+
+    assert first["failed"] == []
+    assert second["failed"] == []
+    assert sorted(first["applied"]) == sorted(second["applied"])
+
+
+@pytest.mark.parametrize("registry,time_series,queries", [
+    (INDEXES, TIME_SERIES, ROUTE_QUERIES),
+    (TREASURY_INDEXES, TREASURY_TIME_SERIES, TREASURY_QUERIES),
+])
+def test_route_queries_use_indexes(mongo_client, scratch_db_name, registry, time_series, queries):
+    result = _apply_registry(scratch_db_name, registry, time_series)
+    assert result["failed"] == []
+
+    _assert_indexed(mongo_client[scratch_db_name], queries)
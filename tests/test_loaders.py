@@ -0,0 +1,37 @@
+import asyncio
+
+from loaders import BatchLoader
+
+
+def test_concurrent_loads_share_one_batch():
+    calls = []
+
+    async def batch_fn(keys):
+        calls.append(list(keys))
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    async def run():
+        loader = BatchLoader(batch_fn)
+        first = await loader.load_many(["a", "b", "a", "missing"])
+        second = await asyncio.gather(loader.load("b"), loader.load("c"))
+        return first, second, loader.batches_dispatched
+
+    first, second, batches = asyncio.run(run())
+
+    assert first == ["A", "B", "A", None]
+    assert second == ["B", "C"]
+    # "b" is served from the request cache, "c" needs one more batch
+    assert calls == [["a", "b", "missing"], ["c"]]
+    assert batches == 2
+
+
+def test_batches_are_split_at_max_size():
+    async def batch_fn(keys):
+        return {key: key * 2 for key in keys}
+
+    async def run():
+        loader = BatchLoader(batch_fn, max_batch_size=2)
+        values = await loader.load_many([1, 2, 3, 4, 5])
+        return values, loader.batches_dispatched
+
+    assert asyncio.run(run()) == ([2, 4, 6, 8, 10], 3)
@@ -0,0 +1,105 @@
+"""
+String timestamps are rewritten as BSON dates in place, and a re-run is a no-op.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from tests.conftest import MONGO_URL
+from migrations import convert_string_timestamps, parse_timestamp
+
+
+def test_parse_timestamp_normalizes_to_utc():
+    assert parse_timestamp("2025-01-30T11:00:00Z") == datetime(2025, 1, 30, 11, tzinfo=timezone.utc)
+    assert parse_timestamp("2025-01-30T11:00:00") == datetime(2025, 1, 30, 11, tzinfo=timezone.utc)
+    assert parse_timestamp("2025-01-30T13:00:00+02:00") == datetime(2025, 1, 30, 11, tzinfo=timezone.utc)
+    assert parse_timestamp("not a date") is None
+
+
+def test_string_timestamps_become_dates(mongo_client, scratch_db_name):
+    collection = mongo_client[scratch_db_name].stakes
+    collection.insert_many([
+        {"stake_id": "stake-1", "created_at": "2025-01-01T00:00:00+00:00", "last_reward_time": "2025-01-02T00:00:00.123456+00:00"},
+        {"stake_id": "stake-2", "created_at": datetime(2025, 1, 3, tzinfo=timezone.utc)},
+    ])
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+        try:
+            registry = {"stakes": ["created_at", "last_reward_time"]}
+            first = await convert_string_timestamps(client[scratch_db_name], registry)
+            second = await convert_string_timestamps(client[scratch_db_name], registry)
+            return first, second
+        finally:
+            client.close()
+
+    first, second = asyncio.run(run())
+
+    assert first == {"stakes": 1}
+    assert second == {"stakes": 0}
+    assert collection.count_documents({"created_at": {"$type": "date"}}) == 2
+    assert collection.count_documents({"last_reward_time": {"$gte": datetime(2025, 1, 2)}}) == 1
+
+
+def test_regular_collection_moves_into_time_series(mongo_client, scratch_db_name):
+    from migrations import convert_to_time_series
+
+    database = mongo_client[scratch_db_name]
+    database.reward_distributions.insert_many([
+        {"stake_id": "stake-1", "amount": 1500.0, "distribution_time": datetime(2025, 1, 1, tzinfo=timezone.utc)},
+        {"transaction_type": "funding", "amount": 1e6, "timestamp": "2025-01-01T00:00:00+00:00"},
+        {"stake_id": "stake-2", "amount": 10.0},
+    ])
+    specs = {"reward_distributions": {"timeField": "distribution_time", "metaField": "stake_id", "granularity": "hours"}}
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+        try:
+            return await convert_to_time_series(client[scratch_db_name], specs)
+        finally:
+            client.close()
+
+    assert asyncio.run(run()) == {"reward_distributions": 2}
+
+    info = next(database.list_collections(filter={"name": "reward_distributions"}))
+    assert info["type"] == "timeseries"
+    assert database.reward_distributions.count_documents({"stake_id": {"$ne": None}}) == 1
+    assert database.reward_distributions_legacy.count_documents({}) == 3
+
+
+def test_interrupted_time_series_copy_resumes(mongo_client, scratch_db_name):
+    from migrations import convert_to_time_series
+
+    database = mongo_client[scratch_db_name]
+    specs = {"reward_distributions": {"timeField": "distribution_time", "metaField": "stake_id", "granularity": "hours"}}
+    rewards = [
+        {"_id": i, "stake_id": "stake-1", "amount": float(i), "distribution_time": datetime(2025, 1, 1 + i, tzinfo=timezone.utc)}
+        for i in range(5)
+    ]
+    # Interrupted after the rename and part of the copy
+    database.reward_distributions_legacy.insert_many(rewards)
+    database.create_collection("reward_distributions", timeseries=specs["reward_distributions"])
+    database.reward_distributions.insert_many([rewards[0], rewards[2]])
+
+    def run():
+        async def convert():
+            client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+            try:
+                return await convert_to_time_series(client[scratch_db_name], specs)
+            finally:
+                client.close()
+
+        return asyncio.run(convert())
+
+    assert run() == {"reward_distributions": 3}
+    assert sorted(document["_id"] for document in database.reward_distributions.find({}, {"_id": 1})) == [0, 1, 2, 3, 4]
+    assert run() == {"reward_distributions": 0}
+
+    # A regular collection next to the legacy copy is ambiguous
+    database.reward_distributions.drop()
+    database.reward_distributions.insert_one({"_id": 99})
+    with pytest.raises(RuntimeError):
+        run()
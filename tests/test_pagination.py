@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, next_cursor
+
+SORT = [("created_at", -1), ("id", -1)]
+
+
+def test_cursor_round_trips_datetimes():
+    created_at = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    values = decode_cursor(encode_cursor({"created_at": created_at, "id": "abc"}))
+
+    assert values["id"] == "abc"
+    assert values["created_at"].replace(tzinfo=timezone.utc) == created_at
+
+
+def test_keyset_filter_breaks_ties_on_the_second_key():
+    cursor = encode_cursor({"created_at": "2025-03-01", "id": "m-5"})
+
+    assert keyset_filter(SORT, None) == {}
+    assert keyset_filter(SORT, cursor) == {"$or": [
+        {"created_at": {"$lt": "2025-03-01"}},
+        {"created_at": "2025-03-01", "id": {"$lt": "m-5"}},
+    ]}
+
+
+def test_next_cursor_trims_the_lookahead_document():
+    documents = [{"created_at": "2025-03-0%d" % day, "id": str(day)} for day in (5, 4, 3)]
+
+    cursor = next_cursor(documents, SORT, limit=2)
+
+    assert [d["id"] for d in documents] == ["5", "4"]
+    assert decode_cursor(cursor) == {"created_at": "2025-03-04", "id": "4"}
+    assert next_cursor(documents, SORT, limit=2) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    encode_cursor({"id": "x"}),
+    encode_cursor({"created_at": "2025-03-01", "id": "x", "status": "paid"}),
+    encode_cursor({"created_at": {"$gt": ""}, "id": "x"}),
+    encode_cursor({"created_at": "2025-03-01", "id": ["x", "y"]}),
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        keyset_filter(SORT, cursor)
@@ -0,0 +1,125 @@
+"""
+Referral ledger against a real MongoDB: every flow appends through one write
+path, the materialized balance matches the ledger, and the payout report reads
+commissions earned since the last payout. The SQLite backend keeps the ledger
+next to the balances and folds the same report in Python.
+"""
+
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from tests.conftest import MONGO_URL
+
+
+async def _referral_flows(server):
+    await server.repos.members.insert_one({
+        "id": "affiliate-1",
+        "email": "ben@example.com",
+        "full_name": "Ben",
+        "referral_code": "BITCOINBEN-TEST",
+    })
+
+    await server.process_referral("BITCOINBEN-TEST", "first@example.com")
+    # Activation of the same referred member must not pay twice
+    await server.process_affiliate_commission("member-1", "BITCOINBEN-TEST", "First@example.com")
+    await server.pay_affiliate_commission("ben@example.com")
+    # The report tells commissions after the payout apart by created_at, stored to the millisecond
+    await asyncio.sleep(0.01)
+    await server.process_affiliate_commission("member-2", "BITCOINBEN-TEST", "second@example.com")
+
+    balance = await server.repos.members.find_one({"id": "affiliate-1"}, server.MEMBER_AFFILIATE_FIELDS)
+    report = await server.get_pending_affiliate_payouts()
+    return balance, report
+
+
+def _run_flows(db_name):
+    import server
+    from storage import open_repositories
+    from db_indexes import INDEXES, ensure_indexes
+    from migrations import rebuild_referral_balances
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        original_db, original_repos = server.db, server.repos
+        server.db = client[db_name]
+        server.repos = open_repositories(server.db, backend="mongo")
+        try:
+            await ensure_indexes(server.db, {"referral_ledger": INDEXES["referral_ledger"]})
+            balance, report = await _referral_flows(server)
+
+            # Rebuilding from the ledger gives the same balance
+            await server.db.members.update_one({"id": "affiliate-1"}, {"$set": {"unpaid_commissions": 999}})
+            await rebuild_referral_balances(server.db)
+            rebuilt = await server.db.members.find_one({"id": "affiliate-1"}, server.MEMBER_AFFILIATE_FIELDS)
+            return balance, report, rebuilt
+        finally:
+            server.db, server.repos = original_db, original_repos
+            client.close()
+
+    return asyncio.run(run())
+
+
+def test_ledger_balance_and_payout_report(mongo_client, scratch_db_name):
+    from server import AFFILIATE_COMMISSION_USD
+
+    balance, report, rebuilt = _run_flows(scratch_db_name)
+
+    assert balance["total_referrals"] == 1
+    assert balance["total_commissions_earned"] == 2 * AFFILIATE_COMMISSION_USD
+    assert balance["unpaid_commissions"] == AFFILIATE_COMMISSION_USD
+    assert rebuilt == balance
+
+    assert report["total_affiliates"] == 1
+    [payout] = report["pending_payouts"]
+    assert payout["referrals"] == [{"new_member": "second@example.com", "amount": AFFILIATE_COMMISSION_USD}]
+
+
+def test_sqlite_ledger_and_payout_report(tmp_path):
+    import server
+    from storage import open_repositories
+
+    async def run():
+        original_repos = server.repos
+        server.repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "ledger.sqlite3"))
+        try:
+            return await _referral_flows(server)
+        finally:
+            await server.repos.close()
+            server.repos = original_repos
+
+    balance, report = asyncio.run(run())
+
+    assert balance["total_referrals"] == 1
+    assert balance["unpaid_commissions"] == server.AFFILIATE_COMMISSION_USD
+    assert report["total_affiliates"] == 1
+    assert report["total_amount_owed"] == server.AFFILIATE_COMMISSION_USD
+    [payout] = report["pending_payouts"]
+    assert payout["member_email"] == "ben@example.com"
+    assert payout["referrals"] == [{"new_member": "second@example.com", "amount": server.AFFILIATE_COMMISSION_USD}]
+
+
+def test_concurrent_payouts_pay_once(tmp_path):
+    import server
+    from storage import open_repositories
+
+    async def run():
+        original_repos = server.repos
+        server.repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "payouts.sqlite3"))
+        try:
+            await server.repos.members.insert_one({
+                "id": "affiliate-1", "email": "ben@example.com", "full_name": "Ben", "unpaid_commissions": 9.0,
+            })
+            replies = await asyncio.gather(*(server.pay_affiliate_commission("ben@example.com") for _ in range(3)))
+            payouts = await server.repos.referral_ledger.find({"entry_type": "payout"}, {"_id": 0, "amount": 1}).to_list(None)
+            balance = await server.repos.members.find_one({"id": "affiliate-1"}, server.MEMBER_AFFILIATE_FIELDS)
+            return replies, payouts, balance
+        finally:
+            await server.repos.close()
+            server.repos = original_repos
+
+    replies, payouts, balance = asyncio.run(run())
+
+    assert sorted(reply.get("amount_paid", 0) for reply in replies) == [0, 0, 9.0]
+    assert payouts == [{"amount": -9.0}]
+    assert balance["unpaid_commissions"] == 0
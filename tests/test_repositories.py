@@ -0,0 +1,154 @@
+"""
+Parity suite for the repository backends: every query shape the handlers use
+must return the same results from MongoDB and from SQLite. The SQLite half
+always runs; the MongoDB half skips when no server is reachable. Feature
+suites run on both backends through the run_with_repositories fixture in
+conftest.py.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db_indexes import NON_EMPTY_STRING
+from pagination import keyset_filter, next_cursor
+
+NOW = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def test_insert_and_projected_reads(run_with_repositories):
+    async def scenario(repos):
+        await repos.members.insert_one({"id": "m1", "email": "a@example.com", "wallet_address": "", "created_at": NOW, "tags": ["vip"]})
+        full = await repos.members.find_one({"id": "m1"}, {"_id": 0})
+        projected = await repos.members.find_one({"email": "a@example.com"}, {"_id": 0, "id": 1, "created_at": 1})
+        missing = await repos.members.find_one({"id": "nobody"}, {"_id": 0})
+        return full, projected, missing
+
+    full, projected, missing = run_with_repositories(scenario)
+    assert full == {"id": "m1", "email": "a@example.com", "wallet_address": "", "created_at": NOW, "tags": ["vip"]}
+    assert projected == {"id": "m1", "created_at": NOW}
+    assert projected["created_at"].tzinfo is not None
+    assert missing is None
+
+
+def test_partial_unique_indexes(run_with_repositories):
+    async def scenario(repos):
+        # Empty emails are exempt from uniqueness, populated ones are not
+        await repos.members.insert_one({"id": "m1", "email": "", "wallet_address": "w1"})
+        await repos.members.insert_one({"id": "m2", "email": "", "wallet_address": "w2"})
+        await repos.members.insert_one({"id": "m3", "email": "x@example.com", "wallet_address": ""})
+        with pytest.raises(DuplicateKeyError):
+            await repos.members.insert_one({"id": "m4", "email": "x@example.com", "wallet_address": ""})
+        with pytest.raises(DuplicateKeyError):
+            await repos.members.update_one({"id": "m2"}, {"$set": {"wallet_address": "w1"}})
+        return await repos.members.count_documents({"email": NON_EMPTY_STRING})
+
+    assert run_with_repositories(scenario) == 1
+
+
+def test_updates_deletes_and_counts(run_with_repositories):
+    async def scenario(repos):
+        await repos.stake_accounts.insert_many([
+            {"id": f"s{i}", "stake_account_pubkey": f"pk{i}", "member_wallet": "w1" if i < 3 else "w2",
+             "status": "active", "stake_amount_sol": float(i)}
+            for i in range(5)
+        ])
+        one = await repos.stake_accounts.update_one({"id": "s1"}, {"$set": {"status": "deactivated"}, "$inc": {"stake_amount_sol": 0.5}})
+        unchanged = await repos.stake_accounts.update_one({"id": "s1"}, {"$set": {"status": "deactivated"}})
+        none = await repos.stake_accounts.update_one({"id": "nope"}, {"$set": {"status": "x"}})
+        many = await repos.stake_accounts.update_many({"member_wallet": "w2"}, {"$set": {"status": "pending"}})
+        active = await repos.stake_accounts.count_documents({"status": {"$in": ["active", "pending"]}, "member_wallet": {"$ne": "w1"}})
+        s1 = await repos.stake_accounts.find_one({"id": "s1"}, {"_id": 0, "status": 1, "stake_amount_sol": 1})
+        deleted = await repos.stake_accounts.delete_many({"stake_amount_sol": {"$gte": 3}})
+        remaining = await repos.stake_accounts.find({}, {"_id": 0, "id": 1}).sort("id", 1).to_list(length=None)
+        return (one.matched_count, one.modified_count, unchanged.modified_count, none.matched_count,
+                many.modified_count, active, s1, deleted.deleted_count, remaining)
+
+    assert run_with_repositories(scenario) == (
+        1, 1, 0, 0, 2, 2, {"status": "deactivated", "stake_amount_sol": 1.5}, 2,
+        [{"id": "s0"}, {"id": "s1"}, {"id": "s2"}],
+    )
+
+
+def test_keyset_pages_match_full_sort(run_with_repositories):
+    sort = [("created_at", -1), ("id", -1)]
+    projection = {"_id": 0, "id": 1, "created_at": 1, "item_count": {"$size": {"$ifNull": ["$items", []]}}}
+
+    async def scenario(repos):
+        # Pairs of orders share a timestamp so the id tie-breaker matters
+        await repos.orders.insert_many([
+            {"id": f"order-{i:02d}", "wallet_address": "w1", "created_at": NOW - timedelta(minutes=i // 2), "items": [{}] * i}
+            for i in range(11)
+        ] + [{"id": "other", "wallet_address": "w2", "created_at": NOW}])
+
+        pages, cursor = [], None
+        while True:
+            page = await repos.orders.find(
+                {"wallet_address": "w1", **keyset_filter(sort, cursor)}, projection
+            ).sort(sort).limit(4).to_list(length=None)
+            cursor = next_cursor(page, sort, 3)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+    pages = run_with_repositories(scenario)
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    ordered = [order["id"] for page in pages for order in page]
+    assert ordered == [f"order-{i:02d}" for i in (1, 0, 3, 2, 5, 4, 7, 6, 9, 8, 10)]
+    assert pages[0][0]["item_count"] == 1
+
+
+def test_conditional_seat_claim(run_with_repositories):
+    async def scenario(repos):
+        await repos.events.insert_one({"id": "e1", "tier_rank": 2, "current_attendees": 0, "max_attendees": 2})
+        claim = {"id": "e1", "tier_rank": {"$lte": 2}, "$expr": {"$lt": ["$current_attendees", "$max_attendees"]}}
+        claims = [
+            await repos.events.find_one_and_update(
+                claim, {"$inc": {"current_attendees": 1}},
+                projection={"_id": 0, "current_attendees": 1}, return_document=ReturnDocument.AFTER
+            )
+            for _ in range(3)
+        ]
+        wrong_tier = await repos.events.find_one_and_update({**claim, "tier_rank": {"$lte": 1}}, {"$inc": {"current_attendees": -1}})
+        return claims, wrong_tier
+
+    claims, wrong_tier = run_with_repositories(scenario)
+    assert claims == [{"current_attendees": 1}, {"current_attendees": 2}, None]
+    assert wrong_tier is None
+
+
+def test_server_event_joins_through_repositories(run_with_repositories):
+    import server
+
+    async def scenario(repos):
+        original = server.repos
+        server.repos = repos
+        try:
+            await repos.events.insert_one({
+                "id": "event-1", "title": "Chef's Table Experience", "tier_required": "premium",
+                "tier_rank": 2, "max_attendees": 3, "current_attendees": 0,
+            })
+
+            async def join(index):
+                member = server.MemberProfile(id=f"member-{index % 6}", wallet_address=f"wallet-{index}", membership_tier="premium")
+                try:
+                    await server.join_member_event("event-1", member)
+                    return 200
+                except HTTPException as e:
+                    return e.status_code
+
+            statuses = await asyncio.gather(*(join(i) for i in range(8)))
+            event = await repos.events.find_one({"id": "event-1"}, {"_id": 0})
+            attendees = await repos.event_attendees.count_documents({"event_id": "event-1"})
+            return sorted(statuses), event["current_attendees"], attendees
+        finally:
+            server.repos = original
+
+    statuses, current_attendees, attendees = run_with_repositories(scenario)
+    assert statuses.count(200) == 3
+    assert current_attendees == attendees == 3
+    assert set(statuses) <= {200, 400, 409}
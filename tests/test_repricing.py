@@ -0,0 +1,81 @@
+"""
+Menu crypto prices are recomputed in one vectorized pass when a live price
+moves past the threshold, rounded up per currency, and only changed items are
+written.
+"""
+
+import asyncio
+
+from repricing import RepricingEngine, price_updates
+from storage import open_repositories
+
+MENU = [
+    {"id": "stacker", "price": 28.0, "member_price": 21.0},
+    {"id": "hodl", "price": 22.0, "member_price": 18.0, "price_bch": 0.0734, "member_price_bch": 0.06},
+]
+
+
+def test_price_updates_round_up_and_skip_unchanged():
+    updates = price_updates(MENU, {"bch": 300.0, "bbc": 0.0245})
+    changes = {update._filter["id"]: update._doc["$set"] for update in updates}
+
+    assert changes["stacker"] == {
+        "price_bch": 0.0934, "member_price_bch": 0.07, "price_bbc": 1143.0, "member_price_bbc": 858.0,
+    }
+    # hodl's BCH prices are already right; only its BBC prices are written
+    assert changes["hodl"] == {"price_bbc": 898.0, "member_price_bbc": 735.0}
+    assert price_updates([], {"bch": 300.0}) == []
+
+
+def test_engine_reprices_only_past_threshold(tmp_path):
+    prices = {"bch": 300.0}
+    repriced = []
+
+    async def fetch_prices():
+        return dict(prices)
+
+    async def run():
+        repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "menu.sqlite3"))
+        engine = RepricingEngine(lambda: repos.menu_items, fetch_prices, on_repriced=lambda: repriced.append(1), threshold=0.02)
+        try:
+            await repos.menu_items.insert_many([dict(item) for item in MENU])
+            first = await engine.check()
+            prices["bch"] = 303.0  # 1% move, below threshold
+            small = await engine.check()
+            prices["bch"] = 330.0
+            large = await engine.check()
+            item = await repos.menu_items.find_one({"id": "stacker"}, {"_id": 0})
+            return first, small, large, item, engine.stats()
+        finally:
+            await repos.close()
+
+    first, small, large, item, stats = asyncio.run(run())
+    assert (first, small, large) == (1, 0, 2)
+    assert item["price_bch"] == 0.0849
+    assert stats["priced_with"] == {"bch": 330.0}
+    assert len(repriced) == 2
+
+
+def test_new_items_are_priced_without_a_move(tmp_path):
+    async def fetch_prices():
+        return {"bch": 300.0}
+
+    async def run():
+        repos = open_repositories(None, backend="sqlite", sqlite_path=str(tmp_path / "menu.sqlite3"))
+        engine = RepricingEngine(lambda: repos.menu_items, fetch_prices, threshold=0.02)
+        try:
+            await repos.menu_items.insert_one(dict(MENU[1]))
+            await engine.check()
+            await repos.menu_items.insert_one(dict(MENU[0]))
+            priced = await engine.check()
+            again = await engine.check()
+            item = await repos.menu_items.find_one({"id": "stacker"}, {"_id": 0})
+            return priced, again, item, engine.runs
+        finally:
+            await repos.close()
+
+    priced, again, item, runs = asyncio.run(run())
+    assert (priced, again) == (1, 0)
+    assert item["price_bch"] == 0.0934
+    # Only the first check was a full repricing
+    assert runs == 1
@@ -0,0 +1,78 @@
+"""
+Local stop and event times become UTC datetimes once, when written.
+"""
+
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import schedule
+from schedule import local_day_bounds, merge_by_start, schedule_times, with_schedule_times
+
+
+def test_schedule_times_in_truck_timezone(monkeypatch):
+    monkeypatch.setattr(schedule, "TRUCK_TIMEZONE", ZoneInfo("America/Chicago"))
+
+    starts_at, ends_at = schedule_times("2025-01-30", "11:00", "14:00")
+    assert starts_at == datetime(2025, 1, 30, 17, tzinfo=timezone.utc)
+    assert ends_at == datetime(2025, 1, 30, 20, tzinfo=timezone.utc)
+
+    # A late stop that ends after midnight ends on the next day
+    _, late_end = schedule_times("2025-01-30", "22:00", "02:00")
+    assert late_end == datetime(2025, 1, 31, 8, tzinfo=timezone.utc)
+
+    assert local_day_bounds(date(2025, 1, 30)) == (
+        datetime(2025, 1, 30, 6, tzinfo=timezone.utc), datetime(2025, 1, 31, 6, tzinfo=timezone.utc)
+    )
+
+
+def test_with_schedule_times_handles_stops_events_and_menu_items(monkeypatch):
+    monkeypatch.setattr(schedule, "TRUCK_TIMEZONE", timezone.utc)
+    stop = with_schedule_times({"date": "2025-01-30", "start_time": "11:00", "end_time": "14:00"})
+    event = with_schedule_times({"date": "2025-02-05", "time": "19:00"})
+    item = {"name": "The Hodl Burger"}
+
+    assert stop["starts_at"] == datetime(2025, 1, 30, 11, tzinfo=timezone.utc)
+    assert event["starts_at"] == datetime(2025, 2, 5, 19, tzinfo=timezone.utc) and event["ends_at"] is None
+    assert with_schedule_times(item) is item
+
+
+def _entries(*hours):
+    return [SimpleNamespace(starts_at=datetime(2025, 1, 30, hour, tzinfo=timezone.utc)) for hour in hours]
+
+
+def test_merge_by_start():
+    merged = merge_by_start(_entries(9, 12, 18), _entries(10, 19))
+    assert [entry.starts_at.hour for entry in merged] == [9, 10, 12, 18, 19]
+
+
+def test_schedule_merges_stops_and_events(run_with_repositories):
+    import server
+
+    async def scenario(repos):
+        original = server.repos
+        server.repos = repos
+        try:
+            await repos.locations.insert_many([server.catalog_document(location) for location in [
+                {"id": "stop-1", "name": "Downtown", "address": "123 Main St", "date": "2025-01-30",
+                 "start_time": "11:00", "end_time": "14:00", "is_member_exclusive": False, "tier_required": "basic"},
+                {"id": "stop-2", "name": "Rooftop", "address": "456 Elite Tower", "date": "2025-02-01",
+                 "start_time": "18:00", "end_time": "22:00", "is_member_exclusive": True, "tier_required": "vip"},
+                {"id": "stop-3", "name": "Next month", "address": "789 Later Ave", "date": "2025-03-01",
+                 "start_time": "11:00", "end_time": "14:00", "is_member_exclusive": False, "tier_required": "basic"},
+            ]])
+            await repos.events.insert_one(server.catalog_document({
+                "id": "event-1", "title": "Chef's Table", "description": "", "date": "2025-01-30", "time": "12:00",
+                "location": "Private Kitchen Studio", "tier_required": "premium", "max_attendees": 12,
+            }))
+            start, end = datetime(2025, 1, 30, tzinfo=timezone.utc), datetime(2025, 2, 6, tzinfo=timezone.utc)
+            return [
+                [(entry.kind, entry.id) for entry in await server.schedule_between(start, end, tier)]
+                for tier in ("basic", "vip")
+            ]
+        finally:
+            server.repos = original
+
+    basic, vip = run_with_repositories(scenario)
+    assert basic == [("stop", "stop-1")]
+    assert vip == [("stop", "stop-1"), ("event", "event-1"), ("stop", "stop-2")]
@@ -0,0 +1,98 @@
+"""
+Seeding is keyed by content: re-seeding writes nothing and keeps ids, workers
+seeding at once insert each document once, and copies from before seed keys
+are adopted instead of duplicated.
+"""
+
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+
+def test_seeding_is_idempotent_and_keeps_ids(run_with_repositories):
+    from seeding import seed_collection
+
+    menu = [{"name": "Hodl Burger", "tier_required": "basic"}, {"name": "Mining Rig", "tier_required": "premium"}]
+
+    async def scenario(repos):
+        first = await seed_collection(repos.menu_items, menu)
+        ids = {item["name"]: item["id"] for item in await repos.menu_items.find({}, {"_id": 0}).to_list(None)}
+        again = await seed_collection(repos.menu_items, menu)
+        # Editing one sample replaces only that document
+        edited = await seed_collection(repos.menu_items, [menu[0], {**menu[1], "tier_required": "vip"}])
+        await repos.menu_items.insert_one({"id": "custom", "name": "Admin Special"})
+        after_edit = await repos.menu_items.find({}, {"_id": 0}).sort("name", 1).to_list(None)
+        return first, again, edited, ids, after_edit
+
+    first, again, edited, ids, after_edit = run_with_repositories(scenario)
+    assert first == {"inserted": 2, "deleted": 0}
+    assert again == {"inserted": 0, "deleted": 0}
+    assert edited == {"inserted": 1, "deleted": 1}
+    assert [item["name"] for item in after_edit] == ["Admin Special", "Hodl Burger", "Mining Rig"]
+    assert after_edit[1]["id"] == ids["Hodl Burger"]
+    assert after_edit[2]["tier_required"] == "vip"
+
+
+def test_concurrent_seeding_inserts_each_document_once(run_with_repositories):
+    from seeding import seed_collection
+
+    menu = [{"name": f"Burger {i}", "tier_required": "basic"} for i in range(20)]
+
+    async def scenario(repos):
+        results = await asyncio.gather(*(seed_collection(repos.menu_items, menu) for _ in range(3)))
+        stored = await repos.menu_items.count_documents({})
+        seeded = await repos.menu_items.find_one({}, {"_id": 0})
+        with pytest.raises(DuplicateKeyError):
+            await repos.menu_items.insert_one({"id": "copy", "seed_key": seeded["seed_key"]})
+        return results, stored
+
+    results, stored = run_with_repositories(scenario)
+    assert sum(result["inserted"] for result in results) == 20
+    assert stored == 20
+
+
+def test_seeding_adopts_legacy_copies(run_with_repositories):
+    from seeding import seed_collection
+
+    menu = [{"name": "Hodl Burger", "tier_required": "basic"}]
+
+    async def scenario(repos):
+        # Seeded twice before seed keys existed, plus an admin-made item that happens to repeat
+        await repos.menu_items.insert_many([{**menu[0], "id": f"legacy-{i}"} for i in range(2)])
+        await repos.menu_items.insert_many([{"id": f"custom-{i}", "name": "Admin Special"} for i in range(2)])
+        seeded = await seed_collection(repos.menu_items, menu)
+        remaining = await repos.menu_items.find({}, {"_id": 0, "id": 1, "seed_key": 1}).sort("id", 1).to_list(None)
+        return seeded, remaining
+
+    seeded, remaining = run_with_repositories(scenario)
+    assert seeded == {"inserted": 0, "deleted": 0}
+    assert [item["id"] for item in remaining] == ["custom-0", "custom-1", "legacy-0"]
+    assert "seed_key" in remaining[2]
+
+
+def test_dedupe_keeps_oldest_copy(run_with_repositories):
+    from seeding import content_key, dedupe_collection, seed_collection
+
+    event = {"title": "Chef's Table", "tier_required": "premium", "max_attendees": 12, "current_attendees": 3}
+
+    async def scenario(repos):
+        await repos.events.insert_many([{**event, "id": f"event-{i}"} for i in range(3)])
+        await repos.events.insert_one({"id": "other", "title": "Rooftop", "tier_required": "vip"})
+        deduped = await dedupe_collection(repos.events, [content_key(event)])
+        reseeded = await seed_collection(repos.events, [event])
+        remaining = await repos.events.find({}, {"_id": 0, "id": 1}).sort("id", 1).to_list(None)
+        return deduped, reseeded, [doc["id"] for doc in remaining]
+
+    deduped, reseeded, remaining = run_with_repositories(scenario)
+    assert deduped == {"kept": 2, "deleted": 2}
+    assert reseeded == {"inserted": 0, "deleted": 0}
+    assert remaining == ["event-0", "other"]
+
+
+def test_seed_route_requires_admin():
+    import server
+    from fastapi.testclient import TestClient
+
+    response = TestClient(server.app).post("/api/admin/seed-data")
+    assert response.status_code in (401, 403)
@@ -0,0 +1,116 @@
+"""
+Treasury amounts are Decimal128 in MongoDB and Decimal in Python, with no
+float round-trips: repeated funding stays exact and balances move server-side.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import bson
+from bson.decimal128 import Decimal128
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from rewards_treasury import TREASURY_CODEC_OPTIONS, RewardsTreasury, to_amount
+from tests.conftest import MONGO_URL
+
+
+def test_codec_round_trips_decimals_exactly():
+    document = {"amount": Decimal("0.1") + Decimal("0.2"), "count": 3}
+    raw = bson.encode(document, codec_options=TREASURY_CODEC_OPTIONS)
+
+    assert bson.decode(raw)["amount"] == Decimal128("0.3")
+    assert bson.decode(raw, codec_options=TREASURY_CODEC_OPTIONS) == {"amount": Decimal("0.3"), "count": 3}
+
+
+def test_to_amount_quantizes_floats_and_decimals():
+    assert to_amount(0.1) == Decimal("0.100000000")
+    assert to_amount(Decimal("1.0000000004")) == Decimal("1.000000000")
+
+
+class _Stakes:
+    def __init__(self, stakes):
+        self.stakes = stakes
+
+    def find(self, *args, **kwargs):
+        return self
+
+    async def to_list(self, length=None):
+        return self.stakes
+
+
+def test_reward_calculation_reads_string_times_and_skips_bad_stakes():
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    treasury = RewardsTreasury(AsyncIOMotorClient(MONGO_URL))
+    treasury.stakes_collection = _Stakes([
+        {"stake_id": "dated", "staker_wallet": "w1", "amount_staked": Decimal("1000000"), "created_at": week_ago},
+        {"stake_id": "string", "staker_wallet": "w2", "amount_staked": 1000000.0, "created_at": week_ago.isoformat()},
+        {"stake_id": "garbled", "staker_wallet": "w3", "amount_staked": 1000000.0, "created_at": "last tuesday"},
+    ])
+
+    result = asyncio.run(treasury.calculate_rewards_owed())
+
+    assert result["success"]
+    assert [reward["stake_id"] for reward in result["staker_rewards"]] == ["dated", "string"]
+    assert result["skipped_stakes"] == ["garbled"]
+
+
+def _fund_and_distribute(db_name):
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+        treasury = RewardsTreasury(client, db_name)
+        try:
+            await treasury.initialize_treasury(Decimal("1000000"))
+            for _ in range(10):
+                await treasury.add_funding(Decimal("0.1"), "test")
+            await treasury.stakes_collection.insert_one({
+                "stake_id": "stake-1",
+                "staker_wallet": "wallet-1",
+                "amount_staked": Decimal("10000000"),
+                "is_member": True,
+                "status": "active",
+                "created_at": datetime.now(timezone.utc) - timedelta(days=30),
+            })
+            result = await treasury.distribute_rewards()
+            ledger = await treasury.treasury_collection.find_one({"treasury_id": "main_treasury"})
+            stake = await treasury.stakes_collection.find_one({"stake_id": "stake-1"})
+            return result, ledger, stake
+        finally:
+            client.close()
+
+    return asyncio.run(run())
+
+
+def test_funding_and_distribution_stay_exact(mongo_client, scratch_db_name):
+    result, ledger, stake = _fund_and_distribute(scratch_db_name)
+
+    assert result["success"]
+    paid = stake["total_rewards_earned"]
+    assert isinstance(paid, Decimal) and paid > 0
+    assert ledger["total_funded"] == Decimal("1000001.000000000")
+    assert ledger["total_distributed"] == paid
+    assert ledger["available_balance"] == ledger["total_funded"] - paid
+
+    raw = mongo_client[scratch_db_name].treasury.find_one({"treasury_id": "main_treasury"})
+    assert isinstance(raw["available_balance"], Decimal128)
+
+
+def test_migration_converts_float_amounts(mongo_client, scratch_db_name):
+    from migrations import convert_float_amounts
+
+    mongo_client[scratch_db_name].stakes.insert_many([
+        {"stake_id": "s1", "amount_staked": 0.1, "total_rewards_earned": 12},
+        {"stake_id": "s2", "amount_staked": Decimal128("5.000000000")},
+    ])
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        try:
+            return await convert_float_amounts(client[scratch_db_name], {"stakes": ["amount_staked", "total_rewards_earned"]})
+        finally:
+            client.close()
+
+    assert asyncio.run(run()) == {"stakes": 1}
+    s1 = mongo_client[scratch_db_name].stakes.find_one({"stake_id": "s1"})
+    assert s1["amount_staked"] == Decimal128("0.100000000")
+    assert s1["total_rewards_earned"] == Decimal128("12.000000000")